@@ -4,7 +4,7 @@ this to have all of the correct functions. """
 import numpy as np
 
 from abc import ABC, abstractmethod
-from typing import Tuple, List, Union, Dict
+from typing import Tuple, List, Union, Dict, Optional
 
 
 class BaseEnvironment(ABC):
@@ -43,6 +43,14 @@ class BaseEnvironment(ABC):
         """ Maps each observation name to a numpy shape"""
         raise NotImplementedError
 
+    @property
+    def observation_dtypes(self) -> Optional[Dict[str, np.dtype]]:
+        """ OPTIONAL Maps each observation name to a numpy dtype.
+
+        If your observations always have the shapes from observation_shape, declaring their dtypes lets the server
+        send them as raw buffers instead of pickled arrays. Leave this as None otherwise. """
+        return None
+
     @abstractmethod
     def new_state(self, num_players: int = None) -> Tuple[object, List[int]]:
         """ Create a fresh state. This could return a fixed object or randomly initialized on, depending on the game.
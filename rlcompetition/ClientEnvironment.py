@@ -2,10 +2,12 @@ import dill
 import numpy as np
 
 from typing import List, Type, Optional, Dict, Tuple
-from spacetime import Dataframe
 
-from .data_model import Observation, ServerState, Player
+from .data_model import ServerState, Player
 from .FrameRateKeeper import FrameRateKeeper
+from .observation_schema import ObservationSchema
+from .state_delta import apply_delta
+from .transport import ClientTransport
 from .BaseEnvironment import BaseEnvironment
 
 import logging
@@ -14,29 +16,23 @@ logger = logging.getLogger(__name__)
 
 class ClientEnvironment:
     _TickRate = 60
+    _PollInterval = 0.5
 
     def __init__(self,
-                 dataframe: Dataframe,
+                 transport: ClientTransport,
                  dimensions: List[str],
-                 observation_class: Type[Observation],
-                 host: str,
                  server_environment: Optional[Type[BaseEnvironment]] = None,
-                 auth_key: str = ''):
+                 auth_key: str = '',
+                 poll_interval: Optional[float] = None):
 
-        self.player_df: Dataframe = dataframe
-        self.observation_df: Optional[Dataframe] = None
-
-        self._server_state: ServerState = self.player_df.read_all(ServerState)[0]
+        self.transport: ClientTransport = transport
+        self._server_state: ServerState = transport.server_state
 
         assert self._server_state.terminal is False, "Connecting to a server with no active game."
         assert self._server_state.server_no_longer_joinable is False, "Server is not accepting new connection."
 
         self._player: Optional[Player] = None
         self._dimensions: List[str] = dimensions
-        self._observation: Observation = None
-        self._observation_class: Type[Observation] = observation_class
-
-        self._host: str = host
         self._auth_key: str = auth_key
 
         self._server_environment: Optional[BaseEnvironment] = None
@@ -46,27 +42,68 @@ class ClientEnvironment:
         self.fr: FrameRateKeeper = FrameRateKeeper(self._TickRate)
         self.connected: bool = False
 
-    def pull_dataframe(self):
-        self.player_df.pull()
-        self.player_df.checkout()
+        # Event driven transports tell us when our turn has come, so we only pull every poll_interval seconds
+        # as a fallback
+        self.poll_interval: float = self._PollInterval if poll_interval is None else poll_interval
 
-        if self.observation_df is not None:
-            self.observation_df.pull()
-            self.observation_df.checkout()
+        # Serialized state rebuilt from the last snapshot and delta, and the state sequence it belongs to
+        self._serialized_state: bytes = b""
+        self._serialized_state_sequence: int = -1
+
+        # Instrumentation for the number of pulls we make while stepping
+        self.step_count: int = 0
+        self.step_pull_count: int = 0
+
+    @property
+    def pull_count(self) -> int:
+        return self.transport.pull_count
+
+    def pull_players(self):
+        self.transport.pull_players()
+
+    def pull_observations(self):
+        self.transport.pull_observations()
+
+    def pull_dataframe(self):
+        self.pull_players()
+        self.pull_observations()
 
     def push_dataframe(self):
-        self.player_df.commit()
-        self.player_df.push()
+        self.transport.push()
 
     def tick(self):
         return self.fr.tick()
 
+    def wait_for_update(self) -> bool:
+        """ Block until the server may have changed our player and pull the player dataframe.
+
+        Observations are not pulled here since they only change when our turn comes around.
+
+        Returns
+        -------
+        bool: Whether or not the current timeout has triggered.
+        """
+        if self.transport.event_driven:
+            self.transport.wait(self.poll_interval)
+            timed_out = self.fr.timed_out()
+        else:
+            timed_out = self.tick()
+
+        self.pull_players()
+        return timed_out
+
+    @property
+    def pulls_per_step(self) -> float:
+        """ Average number of dataframe pulls made while waiting for the server inside of step. """
+        return self.step_pull_count / max(self.step_count, 1)
+
     @property
     def observation(self) -> Dict[str, np.ndarray]:
-        if self._observation is None:
+        observation = self.transport.observation()
+        if observation is None:
             raise ConnectionError("Not connected to game server.")
 
-        return {dimension: getattr(self._observation, dimension) for dimension in self.dimensions}
+        return {dimension: observation[dimension] for dimension in self.dimensions}
 
     @property
     def terminal(self) -> bool:
@@ -91,7 +128,22 @@ class ClientEnvironment:
         """ Full server state for the game if the environment and the server support it. """
         if not self.server_environment.serializable():
             raise ValueError("Current Environment does not support full state for clients.")
-        return self.server_environment.deserialize_state(self._server_state.serialized_state)
+        return self.server_environment.deserialize_state(self.serialized_state)
+
+    @property
+    def serialized_state(self) -> bytes:
+        """ Serialized full state, rebuilt from the last snapshot and delta if the server sends delta updates. """
+        sequence = self._server_state.state_sequence
+        if sequence < 0:
+            return self._server_state.serialized_state
+
+        # Snapshot and delta always arrive together in the same server state version,
+        # so the delta is always relative to the snapshot we have.
+        if sequence != self._serialized_state_sequence:
+            self._serialized_state = apply_delta(self._server_state.state_snapshot, self._server_state.state_delta)
+            self._serialized_state_sequence = sequence
+
+        return self._serialized_state
 
     def connect(self, username: str, timeout: Optional[float] = None) -> int:
         """ Connect to the remote server and wait for the game to start.
@@ -111,8 +163,7 @@ class ClientEnvironment:
         # Add this player to the game.
         self.pull_dataframe()
         self._player: Player = Player(name=username, auth_key=self._auth_key)
-        self.player_df.add_one(Player, self._player)
-        self.push_dataframe()
+        self.transport.join(self._player)
 
         # Check to see if adding our Player object to the dataframe worked.
         self.pull_dataframe()
@@ -121,12 +172,8 @@ class ClientEnvironment:
             self.fr.start_timeout(timeout)
 
         while True:
-            if self.tick() and timeout:
-                self._player = None
-                raise ConnectionError("Timed out connecting to server.")
-
             # The server should remove our player object if it doesnt want us to connect.
-            if self.player_df.read_one(Player, self._player.pid) is None:
+            if self.transport.player is None:
                 self._player = None
                 raise ConnectionError("Server rejected adding your player.")
 
@@ -139,18 +186,18 @@ class ClientEnvironment:
             if self._player.number >= 0:
                 break
 
-            self.pull_dataframe()
+            if self.wait_for_update() and timeout:
+                self._player = None
+                raise ConnectionError("Timed out connecting to server.")
 
-        # Connect to observation dataframe, and get the initial observation.
-        assert self._player.observation_port > 0, "Server failed to create an observation dataframe."
-        self.observation_df = Dataframe("{}_observation_df".format(self._player.name),
-                                        [self._observation_class],
-                                        details=(self._host, self._player.observation_port))
+        # Start receiving observations, and ensure correct game
+        self._validate_observation_schema()
+        try:
+            self.transport.connect_observations()
+        except ValueError as e:
+            raise ConnectionError("Server sent observations that do not match its schema. {}".format(e))
 
-        # Receive the first observation and ensure correct game
-        self.pull_dataframe()
-        self._observation = self.observation_df.read_all(self._observation_class)[0]
-        assert all([hasattr(self._observation, dimension) for dimension in self.dimensions]), \
+        assert all([dimension in self.transport.observation() for dimension in self.dimensions]), \
             "Mismatch in game between server and client."
 
         # Let the server know that we are ready to start.
@@ -160,6 +207,13 @@ class ClientEnvironment:
         self.connected = True
         return self._player.number
 
+    def _validate_observation_schema(self):
+        """ Check the observation schema the server announced against our own copy of the environment. """
+        schema = self.transport.observation_schema
+        if schema is not None and self._server_environment is not None:
+            if ObservationSchema.from_environment(self._server_environment) != schema:
+                raise ConnectionError("Observation schema of the server does not match the local environment.")
+
     def wait_for_start(self, timeout: Optional[float] = None):
         """ Secondary name for to be clearer when starting game. """
         self.wait_for_turn(timeout)
@@ -186,11 +240,10 @@ class ClientEnvironment:
             if self.terminal:
                 raise ConnectionError("Server finished game while we were waiting.")
 
-            if self.tick() and timeout:
+            if self.wait_for_update() and timeout:
                 raise ConnectionError("Timed out waiting for a game.")
 
-            self.pull_dataframe()
-
+        self.pull_observations()
         return self.observation
 
     def valid_actions(self):
@@ -226,9 +279,13 @@ class ClientEnvironment:
             self._player.ready_for_action_to_be_taken = True
             self.push_dataframe()
 
+            pulls_before_step = self.pull_count
             while not self._player.turn or self._player.ready_for_action_to_be_taken:
-                self.tick()
-                self.pull_dataframe()
+                self.wait_for_update()
+            self.pull_observations()
+
+            self.step_count += 1
+            self.step_pull_count += self.pull_count - pulls_before_step
 
         reward = self._player.reward_from_last_turn
         terminal = self.terminal
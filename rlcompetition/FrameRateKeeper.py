@@ -30,6 +30,19 @@ class FrameRateKeeper:
         # See if the timeout has triggered
         return (self.frame_start_time - self.timeout_start_time) > self.timeout_time
 
+    def timed_out(self) -> bool:
+        """ Check the current timeout without waiting for a frame.
+
+        Returns
+        -------
+        bool: Whether or not we have timed out
+        """
+        return (time() - self.timeout_start_time) > self.timeout_time
+
+    def time_until_timeout(self) -> float:
+        """ Number of seconds left before the current timeout triggers. Infinite if there is no timeout. """
+        return self.timeout_time - (time() - self.timeout_start_time)
+
     def start_timeout(self, seconds: float):
         """ Initiate a new timeout. You can only have one active timeout at a time.
 
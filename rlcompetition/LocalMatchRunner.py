@@ -0,0 +1,107 @@
+""" In-process game runner for generating training data. Games are played directly against a BaseEnvironment
+without a match server, spacetime, or any client processes, using the same turn, reward, and winner semantics
+as the match server. """
+
+import numpy as np
+
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Type
+
+from .BaseEnvironment import BaseEnvironment
+from .rl_logging import get_logger
+
+logger = get_logger()
+
+# A policy receives the environment, the current full state, its player number, and its observation.
+# It returns an action string exactly like an agent would pass to ClientEnvironment.step
+Policy = Callable[[BaseEnvironment, object, int, Dict[str, np.ndarray]], str]
+
+
+class GameResult(NamedTuple):
+    winners: Optional[List[int]]
+    rankings: Dict[int, int]
+    total_rewards: List[float]
+    num_moves: int
+    final_state: object
+
+
+class LocalMatchRunner:
+    """ Plays complete games between Python policy callables.
+
+    Parameters
+    ----------
+    env_class: Type[BaseEnvironment]
+        The environment to play.
+    policies: List[Policy]
+        One policy for each player, in player number order.
+    config: str
+        Config string that will be passed into the environment constructor.
+    max_moves: int
+        Optional limit on the number of moves in a single game. Games that hit the limit end with no winners.
+    """
+
+    def __init__(self,
+                 env_class: Type[BaseEnvironment],
+                 policies: List[Policy],
+                 config: str = "",
+                 max_moves: Optional[int] = None):
+        self.env: BaseEnvironment = env_class(config)
+        self.policies: List[Policy] = list(policies)
+        self.max_moves: Optional[int] = max_moves
+
+        num_players = len(self.policies)
+        if not self.env.min_players <= num_players <= self.env.max_players:
+            raise ValueError("{} requires between {} and {} players, got {} policies.".format(
+                env_class.__name__, self.env.min_players, self.env.max_players, num_players))
+
+    @property
+    def num_players(self) -> int:
+        return len(self.policies)
+
+    def play_game(self) -> GameResult:
+        """ Play a single game from a fresh state until it is terminal. """
+        env = self.env
+        player_numbers = list(range(self.num_players))
+        total_rewards = [0.0 for _ in player_numbers]
+
+        state, player_turns = env.new_state(num_players=self.num_players)
+        terminal = False
+        winners = None
+        num_moves = 0
+
+        while not terminal:
+            if self.max_moves is not None and num_moves >= self.max_moves:
+                logger.info("Game reached the limit of {} moves without finishing.".format(self.max_moves))
+                winners = []
+                break
+
+            # Actions are gathered in player number order, just like the server does
+            current_players = [number for number in player_numbers if number in player_turns]
+            current_actions = []
+
+            for number in current_players:
+                observation = env.state_to_observation(state=state, player=number)
+                action = self.policies[number](env, state, number, observation)
+
+                if action == '' or env.is_valid_action(state=state, player=number, action=action):
+                    current_actions.append(action)
+                else:
+                    logger.info("Player #{}'s action of {} was invalid, passing empty string as action"
+                                .format(number, action))
+                    current_actions.append('')
+
+            state, player_turns, rewards, terminal, winners = (
+                env.next_state(state=state, players=player_turns, actions=current_actions)
+            )
+
+            for number, reward in zip(current_players, rewards):
+                total_rewards[number] += float(reward)
+
+            num_moves += 1
+
+        rankings = env.compute_ranking(state, player_numbers, winners if winners is not None else [])
+        return GameResult(winners, rankings, total_rewards, num_moves, state)
+
+    def run(self, num_games: int) -> Iterator[GameResult]:
+        """ Play a number of games back to back, yielding the result of each one as it finishes. """
+        for _ in range(num_games):
+            yield self.play_game()
@@ -6,8 +6,10 @@ from typing import Callable, Type, Optional
 from spacetime import Dataframe, Node
 
 from .data_model import ServerState, Player, Observation
+from .observation_schema import ObservationSchema
 from .BaseEnvironment import BaseEnvironment
 from .ClientEnvironment import ClientEnvironment
+from .transport import ClientTransport, SpacetimeClientTransport, ZmqClientTransport
 
 logger = logging.getLogger(__name__)
 
@@ -20,15 +22,28 @@ def client_app(dataframe: Dataframe,
                host: str,
                auth_key: str,
                *args, **kwargs):
+    """ Spacetime node function that runs an agent against the server node. """
+    transport = SpacetimeClientTransport(dataframe, observation_class, host)
+    run_client(transport, app, client_function, dimension_names, auth_key, *args, **kwargs)
 
-    client_env = app.client_environment(dataframe=dataframe,
+
+def run_client(transport: ClientTransport,
+               app: "RLApp",
+               client_function: Callable,
+               dimension_names: [str],
+               auth_key: str,
+               *args, **kwargs):
+    """ Run an agent over any transport. """
+    client_env = app.client_environment(transport=transport,
                                         dimensions=dimension_names,
-                                        observation_class=observation_class,
                                         server_environment=app.server_environment,
-                                        host=host,
-                                        auth_key=auth_key)
+                                        auth_key=auth_key,
+                                        poll_interval=app.poll_interval)
 
-    client_function(client_env, *args, **kwargs)
+    try:
+        client_function(client_env, *args, **kwargs)
+    finally:
+        transport.close()
 
 
 class RLApp:
@@ -38,15 +53,29 @@ class RLApp:
                  auth_key: str = '',
                  client_environment: Type[ClientEnvironment] = ClientEnvironment,
                  server_environment: Optional[Type[BaseEnvironment]] = None,
-                 time_out: int = 0):
+                 time_out: int = 0,
+                 poll_interval: Optional[float] = None,
+                 transport: str = "spacetime",
+                 match_id: str = ""):
+        if transport not in ("spacetime", "zmq"):
+            raise ValueError("Unknown transport {}, must be either spacetime or zmq.".format(transport))
+        if match_id and transport != "zmq":
+            raise ValueError("Matches on a shared match host can only be joined with the zmq transport.")
+
+        self.transport = transport
+        self.match_id = match_id
         self.client_environment = client_environment
         self.server_environment = server_environment
         self.host = host
         self.port = port
         self.auth_key = auth_key
         self.time_out = time_out
+        self.poll_interval = poll_interval
 
     def __call__(self, main_func: Callable):
+        if self.transport == "zmq":
+            return self._zmq_app(main_func)
+
         # Get the dimensions required for the player dataframe
         start_time = time()
 
@@ -75,8 +104,15 @@ class RLApp:
                 sleep(0.1)
                 continue
 
-        dimension_names: [str] = df.read_all(ServerState)[0].env_dimensions
-        observation_class = Observation(dimension_names)
+        server_state = df.read_all(ServerState)[0]
+        dimension_names: [str] = server_state.env_dimensions
+
+        # Typed observations have to be declared with the same schema as on the server
+        schema = None
+        if server_state.observation_schema:
+            schema = ObservationSchema.from_string(server_state.observation_schema)
+        observation_class = Observation(dimension_names, schema)
+        del server_state
         del df
 
         def app(*args, **kwargs):
@@ -87,6 +123,14 @@ class RLApp:
 
         return app
 
+    def _zmq_app(self, main_func: Callable):
+        def app(*args, **kwargs):
+            transport = ZmqClientTransport(self.host, self.port, self.match_id)
+            dimension_names = transport.server_state.env_dimensions
+            run_client(transport, self, main_func, dimension_names, self.auth_key, *args, **kwargs)
+
+        return app
+
 
 def create_rl_agent(agent_fn: Callable[[ClientEnvironment], None],
                     host: str,
@@ -94,8 +138,12 @@ def create_rl_agent(agent_fn: Callable[[ClientEnvironment], None],
                     auth_key: str = '',
                     client_environment: Type[ClientEnvironment] = ClientEnvironment,
                     server_environment: Optional[Type[BaseEnvironment]] = None,
-                    time_out: int = 0):
-    return RLApp(host, port, auth_key, client_environment, server_environment, time_out)(agent_fn)
+                    time_out: int = 0,
+                    poll_interval: Optional[float] = None,
+                    transport: str = "spacetime",
+                    match_id: str = ""):
+    return RLApp(host, port, auth_key, client_environment, server_environment, time_out, poll_interval,
+                 transport, match_id)(agent_fn)
 
 
 def launch_rl_agent(agent_fn: Callable[[ClientEnvironment], None],
@@ -105,8 +153,12 @@ def launch_rl_agent(agent_fn: Callable[[ClientEnvironment], None],
                     client_environment: Type[ClientEnvironment] = ClientEnvironment,
                     server_environment: Optional[Type[BaseEnvironment]] = None,
                     time_out: int = 0,
+                    poll_interval: Optional[float] = None,
+                    transport: str = "spacetime",
+                    match_id: str = "",
                     **kwargs):
-    return create_rl_agent(agent_fn, host, port, auth_key, client_environment, server_environment, time_out)(**kwargs)
+    return create_rl_agent(agent_fn, host, port, auth_key, client_environment, server_environment, time_out,
+                           poll_interval, transport, match_id)(**kwargs)
 
 
 
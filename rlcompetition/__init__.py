@@ -2,3 +2,4 @@ from .BaseEnvironment import BaseEnvironment
 from .ClientEnvironment import ClientEnvironment
 from .config import get_environment, available_environments
 from .RLApp import RLApp, create_rl_agent, launch_rl_agent
+from .LocalMatchRunner import LocalMatchRunner, GameResult
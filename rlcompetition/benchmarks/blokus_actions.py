@@ -0,0 +1,102 @@
+""" Compare Blokus string actions against integer actions and action masks.
+
+Plays random games, checks that valid_action_mask and player_perspective_valid_action_mask hold exactly the
+same actions as valid_actions and player_perspective_valid_actions, and then times random playouts that
+use each action format.
+
+Run with `python -m rlcompetition.benchmarks.blokus_actions`. """
+
+import argparse
+import random
+
+from time import perf_counter
+
+import numpy as np
+
+from ..envs.blokus.BlokusEnvironment import BlokusEnvironment, NO_ACTION, int_action_to_string, string_to_int_action
+
+
+def check_agreement(env, num_games):
+    num_positions = 0
+
+    for _ in range(num_games):
+        state, players = env.new_state()
+        terminal = False
+        while not terminal:
+            for player in range(4):
+                strings = [action for action in env.valid_actions(state, player) if action]
+                actions = np.flatnonzero(env.valid_action_mask(state, player))
+                if sorted(map(string_to_int_action, strings)) != actions.tolist():
+                    raise AssertionError("Masks disagree with valid_actions for player {}".format(player))
+                if sorted(map(int_action_to_string, actions)) != sorted(strings):
+                    raise AssertionError("Integer actions do not convert back to valid_actions for player {}".format(player))
+
+                player_strings = [action for action in env.player_perspective_valid_actions(state, player) if action]
+                player_actions = np.flatnonzero(env.player_perspective_valid_action_mask(state, player))
+                if sorted(map(string_to_int_action, player_strings)) != player_actions.tolist():
+                    raise AssertionError("Player perspective masks disagree for player {}".format(player))
+                for action in player_actions.tolist():
+                    real_action = env.convert_player_perspective_action_to_real_action(action, player)
+                    if env.convert_real_action_to_player_perspective_action(real_action, player) != action:
+                        raise AssertionError("Player perspective conversion is not reversible")
+
+                num_positions += 1
+
+            action = random.choice(env.valid_actions(state, players[0]))
+            if action and not env.is_valid_action(state, players[0], string_to_int_action(action)):
+                raise AssertionError("is_valid_action rejected a valid integer action")
+            state, players, _, terminal, _ = env.next_state(state, players, [string_to_int_action(action)])
+
+    return num_positions
+
+
+def string_playout(env):
+    state, players = env.new_state()
+    terminal = False
+    num_moves = 0
+    while not terminal:
+        action = random.choice(env.valid_actions(state, players[0]))
+        state, players, _, terminal, _ = env.next_state(state, players, [action])
+        num_moves += 1
+    return num_moves
+
+
+def integer_playout(env):
+    state, players = env.new_state()
+    terminal = False
+    num_moves = 0
+    while not terminal:
+        actions = np.flatnonzero(env.valid_action_mask(state, players[0]))
+        action = random.choice(actions) if len(actions) > 0 else NO_ACTION
+        state, players, _, terminal, _ = env.next_state(state, players, [action])
+        num_moves += 1
+    return num_moves
+
+
+def main():
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("--games", "-g", type=int, default=5,
+                        help="Number of random games to time for each action format.")
+    parser.add_argument("--check-games", "-c", type=int, default=1,
+                        help="Number of random games to check agreement on.")
+    parser.add_argument("--seed", "-s", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    env = BlokusEnvironment()
+
+    num_positions = check_agreement(env, args.check_games)
+    print("String and integer actions agree on {} positions".format(num_positions))
+
+    for name, playout in (("string", string_playout), ("integer", integer_playout)):
+        num_moves = 0
+        start = perf_counter()
+        for _ in range(args.games):
+            num_moves += playout(env)
+        elapsed = perf_counter() - start
+        print("{:>8} | games/sec: {:8.2f} | moves/sec: {:10.2f}".format(
+            name, args.games / elapsed, num_moves / elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+""" Compare the Blokus move generator against the original cell-by-cell implementation.
+
+Plays random games, checks that both generators report exactly the same moves in the same order
+on every position and that has_legal_move agrees with them, and reports how many moves per second
+each one generates.
+
+Run with `python -m rlcompetition.benchmarks.blokus_movegen`. """
+
+import argparse
+import random
+
+from collections import defaultdict
+from time import perf_counter
+
+from ..envs.blokus.BlokusEnvironment import BlokusEnvironment, PLAYER_TO_COLOR
+from ..envs.blokus import computation as comp
+from ..envs.blokus.board import ORIENTATIONS, PIECE_TYPES, PLAYER_DEFAULT_CORNERS
+
+
+def reference_valid_moves(board, round_count, player_color, player_pieces):
+    """ The original move generator, which checks every cell of every placement in Python. Every orientation and
+    shift of a piece is computed from its default offsets, so the result does not depend on the orientation table. """
+    if round_count == 0:
+        empty_corner_indexes = [PLAYER_DEFAULT_CORNERS[player_color - 1]]
+    else:
+        empty_corner_indexes = board.gather_empty_corner_indexes(player_color)
+
+    all_valid_moves = {}
+    for piece_type in player_pieces:
+        all_index_orientations = defaultdict(list)
+        for index in empty_corner_indexes:
+            for orientation in ORIENTATIONS:
+                shifted_offsets = comp.get_all_shifted_offsets(PIECE_TYPES[piece_type], orientation)
+                for shifted_id in comp.check_shifted(board.board_contents, player_color, index, orientation,
+                                                     shifted_offsets):
+                    all_index_orientations[index].append(orientation + str(shifted_id))
+        if len(all_index_orientations) > 0:
+            all_valid_moves[piece_type] = all_index_orientations
+
+    return all_valid_moves
+
+
+def flatten(all_valid_moves):
+    return [(piece_type, index, orientation)
+            for piece_type, index_orientations in all_valid_moves.items()
+            for index, orientations in index_orientations.items()
+            for orientation in orientations]
+
+
+def collect_positions(num_games):
+    """ Play random games and return every (board, round_count, player_color, pieces) that came up. """
+    env = BlokusEnvironment()
+    positions = []
+
+    for _ in range(num_games):
+        state, players = env.new_state()
+        terminal = False
+        while not terminal:
+            board, round_count, ais = state
+            for player in range(4):
+                positions.append((board, round_count, PLAYER_TO_COLOR[player], list(ais[player].current_pieces)))
+
+            action = random.choice(env.valid_actions(state, players[0]))
+            state, players, _, terminal, _ = env.next_state(state, players, [action])
+
+    return positions
+
+
+def time_generator(generator, positions):
+    num_moves = 0
+    start = perf_counter()
+    for board, round_count, color, pieces in positions:
+        num_moves += len(flatten(generator(board, round_count, color, pieces)))
+    return num_moves, perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("--games", "-g", type=int, default=2,
+                        help="Number of random games to collect positions from.")
+    parser.add_argument("--seed", "-s", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    positions = collect_positions(args.games)
+    print("Collected {} positions".format(len(positions)))
+
+    for board, round_count, color, pieces in positions:
+        expected = flatten(reference_valid_moves(board, round_count, color, pieces))
+        actual = flatten(board.get_all_valid_moves(round_count, color, pieces))
+        if actual != expected:
+            raise AssertionError("Move generators disagree for color {} in round {}:\n{}".format(
+                color, round_count, board.board_contents))
+        if board.has_legal_move(round_count, color, pieces) != (len(expected) > 0):
+            raise AssertionError("has_legal_move is wrong for color {} in round {}:\n{}".format(
+                color, round_count, board.board_contents))
+    print("Both generators and has_legal_move agree on every position")
+
+    for name, generator in (("reference", reference_valid_moves),
+                            ("current", lambda board, *args: board.get_all_valid_moves(*args))):
+        num_moves, elapsed = time_generator(generator, positions)
+        print("{:>10} | positions/sec: {:10.2f} | moves/sec: {:12.2f}".format(
+            name, len(positions) / elapsed, num_moves / elapsed))
+
+
+if __name__ == '__main__':
+    main()
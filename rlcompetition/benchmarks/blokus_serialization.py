@@ -0,0 +1,81 @@
+""" Compare the binary Blokus state serialization against pickling the state with dill.
+
+Plays random games, checks that every state survives a round trip with the same board, pieces, scores,
+round count, and valid moves, and then reports payload size and serialization speed for both formats.
+
+Run with `python -m rlcompetition.benchmarks.blokus_serialization`. """
+
+import argparse
+import random
+
+from time import perf_counter
+
+import dill
+import numpy as np
+
+from ..envs.blokus.BlokusEnvironment import BlokusEnvironment
+
+
+def collect_states(env, num_games):
+    states = []
+    for _ in range(num_games):
+        state, players = env.new_state()
+        terminal = False
+        while not terminal:
+            states.append(state)
+            action = random.choice(env.valid_actions(state, players[0]))
+            state, players, _, terminal, _ = env.next_state(state, players, [action])
+    return states
+
+
+def check_round_trip(env, state):
+    board, round_count, players = state
+    new_board, new_round_count, new_players = env.deserialize_state(env.serialize_state(state))
+
+    assert np.array_equal(board.board_contents, new_board.board_contents)
+    assert board.board_contents.dtype == new_board.board_contents.dtype
+    assert round_count == new_round_count
+    for player in range(4):
+        assert players[player].player_color == new_players[player].player_color
+        assert players[player].player_score == new_players[player].player_score
+        assert players[player].current_pieces == new_players[player].current_pieces
+        assert env.valid_actions(state, player) == env.valid_actions((new_board, new_round_count, new_players), player)
+
+
+def time_format(states, serialize, deserialize):
+    start = perf_counter()
+    payloads = [serialize(state) for state in states]
+    serialize_time = perf_counter() - start
+
+    start = perf_counter()
+    for payload in payloads:
+        deserialize(payload)
+    deserialize_time = perf_counter() - start
+
+    return np.mean([len(payload) for payload in payloads]), serialize_time, deserialize_time
+
+
+def main():
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("--games", "-g", type=int, default=2,
+                        help="Number of random games to collect states from.")
+    parser.add_argument("--seed", "-s", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    env = BlokusEnvironment()
+    states = collect_states(env, args.games)
+
+    for state in states:
+        check_round_trip(env, state)
+    print("{} states survive a round trip".format(len(states)))
+
+    for name, serialize, deserialize in (("dill", dill.dumps, dill.loads),
+                                         ("binary", env.serialize_state, env.deserialize_state)):
+        size, serialize_time, deserialize_time = time_format(states, serialize, deserialize)
+        print("{:>8} | bytes: {:8.1f} | serialize usec: {:8.2f} | deserialize usec: {:8.2f}".format(
+            name, size, serialize_time / len(states) * 1e6, deserialize_time / len(states) * 1e6))
+
+
+if __name__ == '__main__':
+    main()
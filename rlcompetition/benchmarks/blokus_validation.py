@@ -0,0 +1,103 @@
+""" Compare BlokusEnvironment.is_valid_action against full move enumeration.
+
+Plays random games and checks, on every position, that is_valid_action accepts every move from valid_actions
+and rejects everything else in a random sample of the whole integer action space, as well as malformed action
+strings. It then times single action validation against validating by enumerating every move.
+
+Run with `python -m rlcompetition.benchmarks.blokus_validation`. """
+
+import argparse
+import random
+
+from functools import partial
+from time import perf_counter
+
+import numpy as np
+
+from ..envs.blokus.BlokusEnvironment import (BlokusEnvironment, ACTION_SPACE_SIZE, NUM_CELLS, int_action_to_string,
+                                              string_to_int_action)
+
+# Client strings that do not parse as an action at all
+MALFORMED_ACTIONS = ["garbage", "monomino1;(x0, 0);north0", "monomino1;(0, 0)", "monomino1;(0, 0, 0);north0",
+                     "monomino1;(0, 0);north", "monomino1;(0, 0);up0", "tetromino9;(0, 0);north0", ";;"]
+
+
+def collect_states(env, num_games):
+    states = []
+    for _ in range(num_games):
+        state, players = env.new_state()
+        terminal = False
+        while not terminal:
+            states.append(state)
+            action = random.choice(env.valid_actions(state, players[0]))
+            state, players, _, terminal, _ = env.next_state(state, players, [action])
+    return states
+
+
+def check_agreement(env, states, samples):
+    num_checked = 0
+    for state in states:
+        for player in range(4):
+            valid_strings = set(env.valid_actions(state, player)) - {""}
+
+            # Every enumerated move, every piece, orientation, and shift at a few of the index cells they use,
+            # and a random sample of everything else, as integers and as strings
+            valid_actions = np.array([string_to_int_action(action) for action in valid_strings], dtype=np.int64)
+            cells = np.unique(valid_actions % NUM_CELLS)
+            cells = np.random.permutation(cells)[:3, None]
+            near_misses = (np.arange(0, ACTION_SPACE_SIZE, NUM_CELLS)[None, :] + cells).ravel()
+            actions = np.concatenate([valid_actions, near_misses,
+                                      np.random.randint(0, ACTION_SPACE_SIZE, size=samples)])
+            for action in actions.tolist():
+                action_string = int_action_to_string(action)
+                expected = action_string in valid_strings
+                if env.is_valid_action(state, player, action) != expected:
+                    raise AssertionError("is_valid_action({}) should be {}".format(action, expected))
+                if env.is_valid_action(state, player, action_string) != expected:
+                    raise AssertionError("is_valid_action({!r}) should be {}".format(action_string, expected))
+
+            for action_string in MALFORMED_ACTIONS:
+                if env.is_valid_action(state, player, action_string):
+                    raise AssertionError("is_valid_action({!r}) should be False".format(action_string))
+            num_checked += len(actions) + len(MALFORMED_ACTIONS)
+
+    return num_checked
+
+
+def enumerate_and_check(env, state, player, action):
+    return action in env.valid_actions(state, player)
+
+
+def main():
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("--games", "-g", type=int, default=1,
+                        help="Number of random games to collect states from.")
+    parser.add_argument("--samples", "-n", type=int, default=200,
+                        help="Number of random integer actions to check per state and player.")
+    parser.add_argument("--seed", "-s", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    np.random.seed(args.seed)
+    env = BlokusEnvironment()
+    states = collect_states(env, args.games)
+
+    num_checked = check_agreement(env, states, args.samples)
+    print("is_valid_action agrees with valid_actions on {} actions".format(num_checked))
+
+    # Validate one real move per state, like the match server does for every submitted action
+    submitted = []
+    for state in states:
+        player = random.randrange(4)
+        submitted.append((state, player, random.choice(env.valid_actions(state, player))))
+
+    for name, validate in (("enumerate", partial(enumerate_and_check, env)), ("direct", env.is_valid_action)):
+        start = perf_counter()
+        for state, player, action in submitted:
+            validate(state, player, action)
+        elapsed = perf_counter() - start
+        print("{:>10} | usec/check: {:10.2f}".format(name, elapsed / len(submitted) * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+""" Measure how many games per second the LocalMatchRunner can play for every available environment
+using uniformly random agents.
+
+Run with `python -m rlcompetition.benchmarks.local_match_throughput`. """
+
+import argparse
+
+from random import choice
+from time import perf_counter
+
+from ..config import ENVIRONMENT_CLASSES, get_environment
+from ..LocalMatchRunner import LocalMatchRunner
+
+
+def random_policy(env, state, player, observation):
+    return choice(list(env.valid_actions(state, player)))
+
+
+def main():
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("--environments", "-e", type=str, nargs="*", default=list(ENVIRONMENT_CLASSES.keys()),
+                        help="The environments to benchmark.")
+    parser.add_argument("--games", "-g", type=int, default=100,
+                        help="Number of games to play in each environment.")
+    args = parser.parse_args()
+
+    for environment in args.environments:
+        try:
+            env_class = get_environment(environment)
+        except ImportError as e:
+            print("{:>14} | skipped: {}".format(environment, e))
+            continue
+
+        num_players = env_class().min_players
+        runner = LocalMatchRunner(env_class, [random_policy] * num_players)
+
+        num_moves = 0
+        start = perf_counter()
+        for result in runner.run(args.games):
+            num_moves += result.num_moves
+        elapsed = perf_counter() - start
+
+        print("{:>14} | games/sec: {:10.2f} | moves/sec: {:10.2f}".format(
+            environment, args.games / elapsed, num_moves / elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+""" Run many simultaneous matches on a single ZmqMatchHost, with every match on the same port, and measure how
+long it takes to play all of them with uniformly random agents. The agents run as threads of a second process.
+
+With --workers, the matches are spread over a MatchWorkerPool instead, like the matchmaking server does.
+
+Run with `python -m rlcompetition.benchmarks.match_host_capacity -e tictactoe -g 1000`
+or `python -m rlcompetition.benchmarks.match_host_capacity -e blokus -g 50 -w 4`. """
+
+import argparse
+import multiprocessing as mp
+import zmq
+
+from queue import Empty
+from random import choice
+from threading import Thread, Event
+from time import perf_counter
+from typing import List, Tuple
+
+from ..match_server import run_match
+from ..config import get_environment, available_environments
+from ..ClientEnvironment import ClientEnvironment
+from ..transport import ZmqMatchHost, ZmqClientTransport
+from ..matchmaking.MatchWorkerPool import MatchWorkerPool
+
+
+def random_agent(environment: str, port: int, match_id: str, username: str, moves: List[int]):
+    transport = ZmqClientTransport("localhost", port, match_id)
+    env = ClientEnvironment(transport, list(transport.server_state.env_dimensions),
+                            server_environment=get_environment(environment))
+
+    try:
+        env.connect(username)
+        env.wait_for_turn()
+
+        while True:
+            _, _, terminal, _ = env.step(choice(env.valid_actions()))
+            moves.append(1)
+
+            if terminal:
+                break
+    finally:
+        transport.close()
+
+
+def run_agents(environment: str, num_players: int, matches: mp.Queue, results: mp.Queue):
+    addresses: List[Tuple[int, str]] = matches.get()
+
+    # Every agent has its own socket, which is more than a context allows by default
+    zmq.Context.instance().set(zmq.MAX_SOCKETS, len(addresses) * num_players + 64)
+
+    moves: List[int] = []
+    agents = [Thread(target=random_agent,
+                     args=(environment, port, match_id, "bench_{}_{}_{}".format(port, match_id, i), moves))
+              for port, match_id in addresses for i in range(num_players)]
+    for agent in agents:
+        agent.start()
+    for agent in agents:
+        agent.join()
+
+    results.put(len(moves))
+
+
+def main():
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("--environment", "-e", type=str, default="tictactoe",
+                        help="The name of the environment. Choices are: {}".format(available_environments()))
+    parser.add_argument("--port", "-p", type=int, default=0,
+                        help="Port to host the matches on. 0 picks a free port.")
+    parser.add_argument("--games", "-g", type=int, default=1000,
+                        help="Number of matches to run at the same time.")
+    parser.add_argument("--workers", "-w", type=int, default=0,
+                        help="Number of worker processes to spread the matches over. 0 hosts them all in this process.")
+    parser.add_argument("--start-timeout", "-s", type=float, default=5.0,
+                        help="Seconds a match waits for its players to be ready for the first move.")
+    parser.add_argument("--timeout", "-t", type=float, default=600.0,
+                        help="Seconds to wait for all matches to finish.")
+    args = parser.parse_args()
+
+    env_class = get_environment(args.environment)
+    num_players = env_class().min_players
+    match_args = {
+        "tick_rate": 60,
+        "realtime": False,
+        "observations_only": False,
+        "event_driven": True,
+        "start_timeout": args.start_timeout,
+        "config": ""
+    }
+
+    # The agents are forked before any host, worker or match thread exists, and learn their matches over a queue
+    ctx = mp.get_context('fork')
+    matches = ctx.Queue()
+    results = ctx.Queue()
+    agents = ctx.Process(target=run_agents, args=(args.environment, num_players, matches, results), daemon=True)
+    agents.start()
+
+    rankings: List[object] = []
+    all_finished = Event()
+
+    def match_finished(_, ranking):
+        rankings.append(ranking)
+        if len(rankings) == args.games:
+            all_finished.set()
+
+    if args.workers > 0:
+        host = MatchWorkerPool(env_class, args.port, args.workers, match_finished)
+    else:
+        host = ZmqMatchHost(args.port)
+        host.start()
+
+    try:
+        start = perf_counter()
+        if args.workers > 0:
+            addresses = [host.start_match(match_args, [], []) for _ in range(args.games)]
+        else:
+            hosted = [host.create_match() for _ in range(args.games)]
+            addresses = [(host.port, match.match_id) for match in hosted]
+            for match in hosted:
+                Thread(target=lambda match: match_finished(None, run_match(match, env_class, match_args)),
+                       args=(match,), daemon=True).start()
+        matches.put(addresses)
+
+        try:
+            moves = results.get(timeout=args.timeout)
+        except Empty:
+            raise RuntimeError("The agents did not finish within {} seconds, {} of {} matches ended.".format(
+                args.timeout, len(rankings), args.games))
+        all_finished.wait(timeout=max(args.timeout - (perf_counter() - start), 0.0))
+        elapsed = perf_counter() - start
+    finally:
+        host.close()
+        agents.join(timeout=5)
+
+    if len(rankings) < args.games:
+        raise RuntimeError("Only {} of {} matches ended within {} seconds.".format(
+            len(rankings), args.games, args.timeout))
+
+    finished = sum(isinstance(ranking, dict) for ranking in rankings)
+    print("{} | workers: {} | matches: {} of {} finished | {:.2f} s | {:.1f} matches/s | {:.1f} moves/s".format(
+        args.environment, args.workers, finished, args.games, elapsed, finished / elapsed, moves / elapsed
+    ))
+
+    if finished < args.games:
+        raise RuntimeError("{} of {} matches did not finish.".format(args.games - finished, args.games))
+
+
+if __name__ == '__main__':
+    main()
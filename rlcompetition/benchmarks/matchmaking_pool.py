@@ -0,0 +1,102 @@
+""" Simulate a busy matchmaking queue and compare skill bucketed matchmaking against first come, first served.
+
+The queue is kept topped up to a fixed number of waiting players, with ratings drawn around the TrueSkill default.
+Simulated time advances in fixed steps, and every step forms as many matches as it can. Reports how many matches
+are formed per second of computation, the TrueSkill match quality, and how long players wait in simulated time.
+
+Run with `python -m rlcompetition.benchmarks.matchmaking_pool -n 10000 -p 4`. """
+
+import argparse
+import numpy as np
+
+from itertools import count, islice
+from time import perf_counter
+from typing import List
+
+from trueskill import Rating, quality
+
+from ..matchmaking.MatchmakingPool import MatchmakingPool, QueuedPlayer
+
+
+class FifoPool(MatchmakingPool):
+    """ Matches players in the order they arrived, like the matchmaker used to. """
+
+    def form_match(self, now: float):
+        if len(self._queue) < self.players_per_game:
+            return None
+
+        players = list(islice(self._queue.values(), self.players_per_game))
+        for player in players:
+            self.remove(player.identity)
+        return players
+
+
+def simulate(pool: MatchmakingPool, queued: int, steps: int, step_time: float, seed: int):
+    rng = np.random.default_rng(seed)
+    identities = count()
+
+    def arrive(now: float):
+        while len(pool) < queued:
+            identity = next(identities).to_bytes(8, "little")
+            mu = rng.normal(25.0, 6.0)
+            sigma = rng.uniform(1.0, 25.0 / 3.0)
+            pool.add(QueuedPlayer(identity, None, "", None, mu, sigma, now))
+
+    arrive(0.0)
+
+    matches: List[List[QueuedPlayer]] = []
+    waits: List[float] = []
+    elapsed = 0.0
+    for step in range(1, steps + 1):
+        now = step * step_time
+        formed = len(matches)
+
+        start = perf_counter()
+        while True:
+            players = pool.form_match(now)
+            if players is None:
+                break
+            matches.append(players)
+        elapsed += perf_counter() - start
+
+        for players in matches[formed:]:
+            waits.extend(now - player.queued_at for player in players)
+        arrive(now)
+
+    # Only matchmaking itself counts towards the rate
+    qualities = [quality([(Rating(player.mu, player.sigma),) for player in players]) for players in matches]
+    return len(matches), elapsed, np.array(qualities), np.array(waits)
+
+
+def main():
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("--queued", "-n", type=int, default=10000,
+                        help="Number of players waiting in the queue at all times.")
+    parser.add_argument("--players", "-p", type=int, default=4,
+                        help="Number of players per match.")
+    parser.add_argument("--steps", "-s", type=int, default=50,
+                        help="Number of simulated time steps.")
+    parser.add_argument("--step-time", "-t", type=float, default=0.5,
+                        help="Simulated seconds between time steps.")
+    parser.add_argument("--skill-window", type=float, default=2.0,
+                        help="Initial skill window of the bucketed pool.")
+    parser.add_argument("--skill-window-growth", type=float, default=1.0,
+                        help="Skill window growth per second of waiting.")
+    args = parser.parse_args()
+
+    pools = (
+        ("fifo", FifoPool(args.players)),
+        ("bucketed", MatchmakingPool(args.players, args.skill_window, args.skill_window_growth)),
+    )
+
+    for name, pool in pools:
+        matches, elapsed, qualities, waits = simulate(pool, args.queued, args.steps, args.step_time, seed=0)
+        print("{:>8} | matches: {:7d} | {:9.0f} matches/s | quality mean {:.3f} p10 {:.3f} | "
+              "wait mean {:5.2f} s p95 {:5.2f} s".format(
+                  name, matches, matches / elapsed, qualities.mean(), np.percentile(qualities, 10),
+                  waits.mean(), np.percentile(waits, 95)
+              ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+""" Measure how the matchmaking server copes with many clients waiting in its queue at the same time.
+
+The matchmaking loop is not started, so every client stays queued. After each step, the peak memory and thread
+count of the server process are printed, which should stay flat as the queue grows.
+
+Run with `python -m rlcompetition.benchmarks.matchmaking_queue -n 10000`. """
+
+import argparse
+import asyncio
+import multiprocessing as mp
+import os
+import resource
+import tempfile
+import threading
+
+from time import perf_counter, sleep
+
+import grpc
+
+from ..config import get_environment
+from ..matchmaking.MatchmakingServer import MatchmakingThread, serve_grpc
+from ..matchmaking.grpc_gen.server_pb2 import QuickMatchRequest
+from ..matchmaking.grpc_gen.server_pb2_grpc import MatchmakerStub
+
+
+def run_server(port: int, statistics):
+    # Keep the ranking database of the benchmark away from the real one
+    os.chdir(tempfile.mkdtemp())
+    matchmaker = MatchmakingThread(starting_port=21450, hostname="localhost", max_simultaneous_games=1,
+                                   env_class=get_environment("tictactoe"), tick_rate=60, realtime=False,
+                                   observations_only=False, env_config_string="")
+
+    def answer_statistics():
+        while statistics.recv():
+            statistics.send((matchmaker.connection_queue.qsize(),
+                             resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                             threading.active_count()))
+
+    threading.Thread(target=answer_statistics, daemon=True).start()
+    asyncio.run(serve_grpc(matchmaker, "localhost", port))
+
+
+def server_statistics(statistics):
+    statistics.send(True)
+    return statistics.recv()
+
+
+async def queue_clients(port: int, steps, statistics):
+    channel = grpc.aio.insecure_channel("localhost:{}".format(port))
+    stub = MatchmakerStub(channel)
+    calls = []
+
+    queued, memory, threads = server_statistics(statistics)
+    print("{:>6} waiting | peak memory {:7.1f} MiB | {:3d} threads".format(queued, memory, threads))
+
+    for step in steps:
+        start = perf_counter()
+        while len(calls) < step:
+            calls.append(stub.GetMatch(QuickMatchRequest(username="bench{}".format(len(calls)), password=b"")))
+
+        # Wait for the server to have queued all of them
+        while server_statistics(statistics)[0] < step:
+            await asyncio.sleep(0.1)
+
+        queued, memory, threads = server_statistics(statistics)
+        print("{:>6} waiting | peak memory {:7.1f} MiB | {:3d} threads | {:6.2f} s to queue".format(
+            queued, memory, threads, perf_counter() - start
+        ))
+
+    for call in calls:
+        call.cancel()
+    await channel.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("--clients", "-n", type=int, default=10000,
+                        help="Number of clients to queue up.")
+    parser.add_argument("--port", "-p", type=int, default=50151,
+                        help="Port to start the matchmaking server on.")
+    args = parser.parse_args()
+
+    # The server has to be forked before this process starts any GRPC threads
+    statistics, server_statistics_connection = mp.Pipe()
+    server = mp.get_context("fork").Process(target=run_server, args=(args.port, server_statistics_connection),
+                                            daemon=True)
+    server.start()
+    sleep(1.0)
+
+    steps = sorted({min(args.clients, step) for step in (100, 1000, 2500, 5000, args.clients)})
+    asyncio.run(queue_clients(args.port, steps, statistics))
+    server.terminate()
+
+
+if __name__ == '__main__':
+    main()
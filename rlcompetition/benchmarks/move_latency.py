@@ -0,0 +1,114 @@
+""" Compare the per-move round trip time of the match server when polling at a fixed tick rate
+against the event driven mode.
+
+Run with `python -m rlcompetition.benchmarks.move_latency -e tictactoe`. """
+
+import argparse
+import multiprocessing as mp
+import numpy as np
+
+from random import choice
+from time import perf_counter, sleep
+from typing import List
+
+from spacetime import Node
+
+from ..match_server import server_app
+from ..data_model import ServerState, Player, Observation
+from ..observation_schema import ObservationSchema
+from ..config import get_environment, available_environments
+from ..ClientEnvironment import ClientEnvironment
+from ..RLApp import launch_rl_agent
+
+
+def run_server(environment: str, port: int, tick_rate: int, event_driven: bool):
+    env_class = get_environment(environment)
+    observation_type = Observation(env_class.observation_names(), ObservationSchema.from_environment(env_class()))
+    args = {
+        "tick_rate": tick_rate,
+        "port": port,
+        "realtime": False,
+        "observations_only": False,
+        "event_driven": event_driven,
+        "config": ""
+    }
+
+    app = Node(server_app, server_port=port, Types=[Player, ServerState])
+    app.start(env_class, observation_type, args)
+
+
+def timed_agent(env: ClientEnvironment, username: str, results: mp.Queue):
+    """ Random agent that records how long each step takes.
+
+    A step covers sending our action, the server executing it, the other players responding,
+    and the server handing the turn back to us. """
+    env.connect(username)
+    env.wait_for_turn()
+
+    step_times = []
+    while True:
+        action = choice(env.valid_actions())
+
+        start = perf_counter()
+        _, _, terminal, _ = env.step(action)
+        step_times.append(perf_counter() - start)
+
+        if terminal:
+            break
+
+    results.put(step_times)
+
+
+def run_agent(environment: str, port: int, username: str, results: mp.Queue):
+    launch_rl_agent(timed_agent, "localhost", port, server_environment=get_environment(environment), time_out=10,
+                    username=username, results=results)
+
+
+def benchmark(environment: str, port: int, tick_rate: int, event_driven: bool, num_games: int) -> List[float]:
+    ctx = mp.get_context('fork')
+    num_players = get_environment(environment)().min_players
+    step_times = []
+
+    for game in range(num_games):
+        results = ctx.Queue()
+        server = ctx.Process(target=run_server, args=(environment, port, tick_rate, event_driven))
+        server.start()
+        sleep(0.5)
+
+        agents = [ctx.Process(target=run_agent, args=(environment, port, "bench_{}_{}".format(game, i), results))
+                  for i in range(num_players)]
+        for agent in agents:
+            agent.start()
+
+        for _ in agents:
+            step_times.extend(results.get())
+
+        for agent in agents:
+            agent.join()
+        server.join()
+
+    return step_times
+
+
+def main():
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("--environment", "-e", type=str, default="tictactoe",
+                        help="The name of the environment. Choices are: {}".format(available_environments()))
+    parser.add_argument("--port", "-p", type=int, default=7777,
+                        help="Port to start the match servers on.")
+    parser.add_argument("--tick-rate", "-t", type=int, default=60,
+                        help="The max tick rate of the server and clients.")
+    parser.add_argument("--games", "-g", type=int, default=10,
+                        help="Number of games to play in each mode.")
+    args = parser.parse_args()
+
+    for event_driven in (False, True):
+        step_times = np.array(benchmark(args.environment, args.port, args.tick_rate, event_driven, args.games)) * 1000
+        print("{:>12} | steps: {:6d} | mean: {:7.2f} ms | median: {:7.2f} ms | p95: {:7.2f} ms".format(
+            "event driven" if event_driven else "fixed tick",
+            len(step_times), step_times.mean(), np.median(step_times), np.percentile(step_times, 95)
+        ))
+
+
+if __name__ == '__main__':
+    main()
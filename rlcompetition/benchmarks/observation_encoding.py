@@ -0,0 +1,97 @@
+""" Compare encoding observations as raw buffers with a schema against pickling the numpy arrays.
+
+Plays random games for every environment that declares observation dtypes, checks that every observation
+survives a round trip through its schema with the same values, dtypes, and shapes, and then reports the
+payload size and the encode and decode cost per observation for both formats.
+
+Run with `python -m rlcompetition.benchmarks.observation_encoding`. """
+
+import argparse
+import pickle
+
+from random import choice
+from time import perf_counter
+
+import numpy as np
+
+from ..config import ENVIRONMENT_CLASSES, get_environment
+from ..observation_schema import ObservationSchema
+
+
+def collect_observations(env, num_games):
+    observations = []
+    for _ in range(num_games):
+        state, players = env.new_state(num_players=env.min_players)
+        terminal = False
+        while not terminal:
+            observations.extend(env.state_to_observation(state, player) for player in range(env.min_players))
+            actions = [choice(list(env.valid_actions(state, player))) for player in players]
+            state, players, _, terminal, _ = env.next_state(state, players, actions)
+    return observations
+
+
+def check_round_trip(schema, observation):
+    encoded = schema.encode(observation)
+    schema.validate(encoded)
+    decoded = schema.decode(encoded)
+
+    for name, value in observation.items():
+        assert decoded[name].dtype == schema.dtypes[name]
+        assert decoded[name].shape == schema.shapes[name]
+        assert np.array_equal(decoded[name], value)
+
+
+def time_format(observations, encode, decode):
+    start = perf_counter()
+    payloads = [encode(observation) for observation in observations]
+    encode_time = perf_counter() - start
+
+    start = perf_counter()
+    for payload in payloads:
+        decode(payload)
+    decode_time = perf_counter() - start
+
+    size = np.mean([sum(len(value) for value in payload.values()) for payload in payloads])
+    return size, encode_time / len(observations), decode_time / len(observations)
+
+
+def main():
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("--environments", "-e", type=str, nargs="*", default=list(ENVIRONMENT_CLASSES.keys()),
+                        help="The environments to benchmark.")
+    parser.add_argument("--games", "-g", type=int, default=2,
+                        help="Number of random games to collect observations from.")
+    args = parser.parse_args()
+
+    # Observation dimensions are sent one by one, so both formats work per array
+    def pickle_encode(observation):
+        return {name: pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL) for name, value in observation.items()}
+
+    def pickle_decode(payload):
+        return {name: pickle.loads(value) for name, value in payload.items()}
+
+    for environment in args.environments:
+        try:
+            env = get_environment(environment)()
+        except ImportError as e:
+            print("{:>14} | skipped: {}".format(environment, e))
+            continue
+
+        schema = ObservationSchema.from_environment(env)
+        if schema is None:
+            print("{:>14} | skipped: no observation dtypes".format(environment))
+            continue
+
+        observations = collect_observations(env, args.games)
+        for observation in observations:
+            check_round_trip(schema, observation)
+
+        for name, encode, decode in (("pickle", pickle_encode, pickle_decode),
+                                     ("schema", schema.encode, schema.decode)):
+            size, encode_time, decode_time = time_format(observations, encode, decode)
+            print("{:>14} | {:>6} | bytes: {:8.1f} | encode usec: {:7.2f} | decode usec: {:7.2f}".format(
+                environment, name, size, encode_time * 1e6, decode_time * 1e6))
+
+
+if __name__ == '__main__':
+    main()
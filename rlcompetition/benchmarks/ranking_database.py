@@ -0,0 +1,88 @@
+""" Measure how fast the ranking database takes in match results while players keep logging in.
+
+A number of threads, standing in for the threads that run matches, report the results of random matches between
+registered users. At the same time another thread looks players up, like the gRPC handlers do when clients log in.
+Reports how many match results are written per second, how long the lookups take while that happens, and how
+many of them were answered by the user cache.
+
+Run with `python -m rlcompetition.benchmarks.ranking_database -u 10000 -m 20000 -c 10000`. """
+
+import argparse
+import numpy as np
+import os
+import tempfile
+
+from random import Random
+from threading import Thread, Event
+from time import perf_counter
+
+from ..matchmaking.RankingDatabase import RankingDatabase
+
+
+def report_matches(database: RankingDatabase, users: int, matches: int, players: int, seed: int):
+    rng = Random(seed)
+    for _ in range(matches):
+        usernames = rng.sample(range(users), players)
+        database.update_ranking({"user{}".format(user): rank for rank, user in enumerate(usernames)})
+
+
+def look_up_players(database: RankingDatabase, users: int, stop: Event, latencies: list):
+    rng = Random(-1)
+    while not stop.is_set():
+        start = perf_counter()
+        database.get("user{}".format(rng.randrange(users)))
+        latencies.append(perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("--users", "-u", type=int, default=10000,
+                        help="Number of registered users.")
+    parser.add_argument("--matches", "-m", type=int, default=20000,
+                        help="Number of match results to report.")
+    parser.add_argument("--players", "-p", type=int, default=4,
+                        help="Number of players per match.")
+    parser.add_argument("--threads", "-t", type=int, default=8,
+                        help="Number of threads reporting match results.")
+    parser.add_argument("--cache-size", "-c", type=int, default=10000,
+                        help="Most users to keep in the user cache. 0 sends every lookup to sqlite.")
+    args = parser.parse_args()
+
+    database = RankingDatabase(os.path.join(tempfile.mkdtemp(), "ranking.sqlite"), args.cache_size)
+    for user in range(args.users):
+        database.set("user{}".format(user), "")
+
+    stop = Event()
+    latencies = []
+    lookups = Thread(target=look_up_players, args=(database, args.users, stop, latencies))
+    lookups.start()
+
+    start = perf_counter()
+    reporters = [Thread(target=report_matches,
+                        args=(database, args.users, args.matches // args.threads, args.players, seed))
+                 for seed in range(args.threads)]
+    for reporter in reporters:
+        reporter.start()
+    for reporter in reporters:
+        reporter.join()
+    queued = perf_counter() - start
+
+    database.flush()
+    elapsed = perf_counter() - start
+
+    stop.set()
+    lookups.join()
+    statistics = database.cache_statistics()
+    database.close()
+
+    matches = args.matches // args.threads * args.threads
+    latencies = np.array(latencies) * 1000
+    print("matches: {} | queued in {:.2f} s | written in {:.2f} s | {:.0f} matches/s | "
+          "lookups: {} | p50 {:.4f} ms | p99 {:.4f} ms | cache hit rate {:.1%}".format(
+              matches, queued, elapsed, matches / elapsed,
+              len(latencies), np.percentile(latencies, 50), np.percentile(latencies, 99), statistics.hit_rate
+          ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+""" Measure how many bytes of serialized state the match server ships per move with and without delta updates.
+
+Plays random games for every available serializable environment, feeds every state through a
+StateDeltaEncoder exactly like the match server does, and checks that clients can rebuild every state
+from the snapshot and delta they would see.
+
+Run with `python -m rlcompetition.benchmarks.state_delta_bandwidth`. """
+
+import argparse
+
+from random import choice
+
+from ..config import ENVIRONMENT_CLASSES, get_environment
+from ..state_delta import StateDeltaEncoder, apply_delta
+
+
+def play_game(env):
+    """ Play a random game and return the serialized state after every move. """
+    state, players = env.new_state(num_players=env.min_players)
+    serialized_states = [env.serialize_state(state)]
+    terminal = False
+
+    while not terminal:
+        actions = [choice(list(env.valid_actions(state, player))) for player in players]
+        state, players, _, terminal, _ = env.next_state(state, players, actions)
+        serialized_states.append(env.serialize_state(state))
+
+    return serialized_states
+
+
+def main():
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("--environments", "-e", type=str, nargs="*", default=list(ENVIRONMENT_CLASSES.keys()),
+                        help="The environments to benchmark.")
+    parser.add_argument("--games", "-g", type=int, default=5,
+                        help="Number of games to play in each environment.")
+    parser.add_argument("--snapshot-interval", "-i", type=int, default=32,
+                        help="Maximum number of moves between full snapshots.")
+    args = parser.parse_args()
+
+    for environment in args.environments:
+        try:
+            env = get_environment(environment)()
+        except ImportError as e:
+            print("{:>14} | skipped: {}".format(environment, e))
+            continue
+
+        if not env.serializable():
+            print("{:>14} | skipped: not serializable".format(environment))
+            continue
+
+        full_bytes = 0
+        delta_bytes = 0
+        num_moves = 0
+        for _ in range(args.games):
+            encoder = StateDeltaEncoder(args.snapshot_interval)
+            for serialized_state in play_game(env):
+                if encoder.update(serialized_state):
+                    delta_bytes += len(encoder.snapshot)
+                delta_bytes += len(encoder.delta)
+                full_bytes += len(serialized_state)
+                num_moves += 1
+
+                if apply_delta(encoder.snapshot, encoder.delta) != serialized_state:
+                    raise AssertionError("Could not rebuild the state of {} from its delta".format(environment))
+
+        print("{:>14} | full bytes/move: {:10.1f} | delta bytes/move: {:10.1f} | ratio: {:6.2f}".format(
+            environment, full_bytes / num_moves, delta_bytes / num_moves, full_bytes / max(delta_bytes, 1)))
+
+
+if __name__ == '__main__':
+    main()
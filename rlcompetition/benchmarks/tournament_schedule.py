@@ -0,0 +1,91 @@
+""" Simulate a round robin tournament on the TournamentPool, and compare how long it takes against a lower bound.
+
+Agents ask for their next game as soon as their last one is over, and games take a random time around one
+simulated minute. No tournament can finish before every slot has been busy for its share of all games, nor
+before the agent with the most games has played all of them back to back. Reports the simulated length of the
+tournament against that bound, how busy the game slots were, and how long scheduling a game took.
+
+Run with `python -m rlcompetition.benchmarks.tournament_schedule -a 100 -s 50`. """
+
+import argparse
+import heapq
+import numpy as np
+import os
+import tempfile
+
+from collections import Counter
+from time import perf_counter
+from typing import NamedTuple
+
+from ..matchmaking.MatchmakingPool import QueuedPlayer
+from ..matchmaking.TournamentPool import TournamentPool
+
+
+class Request(NamedTuple):
+    username: str
+
+
+def simulate(pool: TournamentPool, slots: int, seed: int):
+    rng = np.random.default_rng(seed)
+
+    def arrive(agent: str, now: float):
+        if pool.accepts(agent) is None:
+            pool.add(QueuedPlayer(agent.encode(), Request(agent), "", None, 25.0, 25.0 / 3, now))
+
+    for agent in pool.agents:
+        arrive(agent, 0.0)
+
+    now = 0.0
+    busy = 0.0
+    running = []
+    scheduling = []
+    while not pool.finished:
+        while len(running) < slots:
+            start = perf_counter()
+            players = pool.form_match(now)
+            scheduling.append(perf_counter() - start)
+            if players is None:
+                break
+
+            duration = rng.uniform(0.5, 1.5)
+            busy += duration
+            heapq.heappush(running, (now + duration, [player.request.username for player in players]))
+
+        now, usernames = heapq.heappop(running)
+        pool.match_finished(usernames, {username: rank for rank, username in enumerate(usernames)})
+        for username in usernames:
+            arrive(username, now)
+
+    return now, busy, np.array(scheduling)
+
+
+def main():
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("--agents", "-a", type=int, default=100,
+                        help="Number of agents in the round robin.")
+    parser.add_argument("--players", "-p", type=int, default=2,
+                        help="Number of players per game.")
+    parser.add_argument("--games-per-pairing", "-g", type=int, default=1,
+                        help="Number of games every pairing plays.")
+    parser.add_argument("--slots", "-s", type=int, default=50,
+                        help="Number of games that may run at the same time.")
+    args = parser.parse_args()
+
+    agents = ["agent{}".format(agent) for agent in range(args.agents)]
+    pool = TournamentPool(args.players, agents, args.games_per_pairing,
+                          progress_log=os.path.join(tempfile.mkdtemp(), "tournament.progress"))
+
+    games = len(pool.games)
+    most_games = max(Counter(agent for players in pool.games for agent in players).values())
+    bound = max(games / args.slots, most_games)
+
+    length, busy, scheduling = simulate(pool, args.slots, seed=0)
+    print("games: {} | length {:.0f} min | lower bound {:.0f} min | {:.1%} of bound | slots busy {:.1%} | "
+          "scheduling p50 {:.3f} ms p99 {:.3f} ms".format(
+              games, length, bound, bound / length, busy / (length * args.slots),
+              np.percentile(scheduling, 50) * 1000, np.percentile(scheduling, 99) * 1000
+          ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+""" Compare how many moves per second a match server plays over the spacetime transport
+against the ZeroMQ transport, with uniformly random agents in separate processes.
+
+Both servers run in event driven mode, so the numbers only reflect the cost of moving
+state, observations and actions between the processes.
+
+Run with `python -m rlcompetition.benchmarks.transport_throughput -e tictactoe blokus`. """
+
+import argparse
+import multiprocessing as mp
+
+from queue import Empty
+from random import choice
+from time import time, sleep
+from typing import Tuple
+
+from spacetime import Node
+
+from ..match_server import server_app, run_match
+from ..data_model import ServerState, Player, Observation
+from ..observation_schema import ObservationSchema
+from ..config import get_environment, available_environments
+from ..ClientEnvironment import ClientEnvironment
+from ..RLApp import launch_rl_agent
+from ..transport import ZmqServerTransport
+
+TRANSPORTS = ("spacetime", "zmq")
+
+
+def run_server(environment: str, port: int, transport: str):
+    env_class = get_environment(environment)
+    args = {
+        "tick_rate": 1000,
+        "port": port,
+        "realtime": False,
+        "observations_only": False,
+        "event_driven": True,
+        "config": ""
+    }
+
+    if transport == "zmq":
+        run_match(ZmqServerTransport(port), env_class, args)
+        return
+
+    observation_type = Observation(env_class.observation_names(), ObservationSchema.from_environment(env_class()))
+    app = Node(server_app, server_port=port, Types=[Player, ServerState])
+    app.start(env_class, observation_type, args)
+
+
+def counting_agent(env: ClientEnvironment, username: str, results: mp.Queue):
+    """ Random agent that reports how many moves it made, and when its first and last one happened. """
+    env.connect(username)
+    env.wait_for_turn()
+
+    start = time()
+    moves = 0
+    while True:
+        _, _, terminal, _ = env.step(choice(env.valid_actions()))
+        moves += 1
+
+        if terminal:
+            break
+
+    results.put((moves, start, time()))
+
+
+def run_agent(environment: str, port: int, transport: str, username: str, results: mp.Queue):
+    launch_rl_agent(counting_agent, "localhost", port, server_environment=get_environment(environment),
+                    time_out=10, transport=transport, username=username, results=results)
+
+
+def benchmark(environment: str, port: int, transport: str, num_games: int) -> Tuple[int, float]:
+    """ Play a number of games and return the total number of moves and the time spent playing them. """
+    ctx = mp.get_context('fork')
+    num_players = get_environment(environment)().min_players
+    total_moves = 0
+    total_time = 0.0
+
+    for game in range(num_games):
+        results = ctx.Queue()
+        server = ctx.Process(target=run_server, args=(environment, port, transport))
+        server.start()
+        sleep(0.5)
+
+        agents = [ctx.Process(target=run_agent,
+                              args=(environment, port, transport, "bench_{}_{}".format(game, i), results))
+                  for i in range(num_players)]
+        for agent in agents:
+            agent.start()
+
+        try:
+            reports = [results.get(timeout=60) for _ in agents]
+        except Empty:
+            raise RuntimeError("Game {} over {} did not finish within 60 seconds.".format(game, transport))
+        finally:
+            for process in agents + [server]:
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+
+        total_moves += sum(moves for moves, _, _ in reports)
+        total_time += max(end for _, _, end in reports) - min(start for _, start, _ in reports)
+
+    return total_moves, total_time
+
+
+def main():
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("--environment", "-e", type=str, nargs="+", default=["tictactoe", "blokus"],
+                        help="The names of the environments. Choices are: {}".format(available_environments()))
+    parser.add_argument("--port", "-p", type=int, default=7777,
+                        help="Port to start the match servers on.")
+    parser.add_argument("--games", "-g", type=int, default=10,
+                        help="Number of games to play over each transport.")
+    args = parser.parse_args()
+
+    for environment in args.environment:
+        for transport in TRANSPORTS:
+            moves, elapsed = benchmark(environment, args.port, transport, args.games)
+            print("{:>12} | {:>9} | moves: {:6d} | {:9.1f} moves/s".format(
+                environment, transport, moves, moves / elapsed
+            ))
+
+
+if __name__ == '__main__':
+    main()
@@ -6,17 +6,26 @@ import numpy as np
 
 from rtypes import pcc_set
 from rtypes import dimension, primarykey
-from typing import List, Dict
+from typing import List, Dict, Optional
 
+from .observation_schema import ObservationSchema
 
-def Observation(observation_names: List[str]):
-    """ Creates a proper player class with the attributes necessary to transfer the observations. """
 
-    class Observation(_Observation):
-        pass
+def Observation(observation_names: List[str], schema: Optional[ObservationSchema] = None):
+    """ Creates a proper player class with the attributes necessary to transfer the observations.
+
+    With a schema, every observation is sent as a raw buffer with a small header instead of a pickled array. """
+
+    if schema is None:
+        class Observation(_Observation):
+            pass
+    else:
+        class Observation(_EncodedObservation):
+            pass
+        Observation.schema = schema
 
     for name in observation_names:
-        setattr(Observation, name, dimension(np.array))
+        setattr(Observation, name, dimension(np.array if schema is None else bytes))
 
     return pcc_set(Observation)
 
@@ -32,6 +41,14 @@ class _Observation:
         for key, value in observations.items():
             self.__setattr__(key, value)
 
+
+class _EncodedObservation(_Observation):
+    """ Base observation class for observations with a schema, see observation_schema.py. """
+    schema: ObservationSchema = None
+
+    def set_observation(self, observations: Dict[str, np.ndarray]):
+        super().set_observation(self.schema.encode(observations))
+
 @pcc_set
 class Player(object):
     pid = primarykey(int)
@@ -40,6 +57,7 @@ class Player(object):
     name = dimension(str)
     number = dimension(int)
     observation_port = dimension(int)
+    observation_segment = dimension(str)
 
     action = dimension(str)
     reward_from_last_turn = dimension(float)
@@ -64,10 +82,12 @@ class Player(object):
         self.winner = False
         self.ready_for_start = False
         self.observation_port = -1
+        self.observation_segment = ""  # Shared memory segment with our observations, see shared_observations.py
 
-    def finalize_player(self, number: int, observation_port: int):
+    def finalize_player(self, number: int, observation_port: int, observation_segment: str = ""):
         self.number = number
         self.observation_port = observation_port
+        self.observation_segment = observation_segment
 
 
 @pcc_set
@@ -76,17 +96,33 @@ class ServerState(object):
     env_class_name = dimension(str)
     env_config = dimension(str)
     env_dimensions = dimension(tuple)
+    observation_schema = dimension(str)
     terminal = dimension(bool)
     server_no_longer_joinable = dimension(bool)
-    winners = dimension(str)
+    winners = dimension(bytes)
     serialized_state = dimension(bytes)
+    wakeup_port = dimension(int)
+    notify_port = dimension(int)
+
+    # Delta updates of the serialized state, see state_delta.py. state_sequence stays -1 when they are disabled.
+    state_sequence = dimension(int)
+    snapshot_sequence = dimension(int)
+    state_snapshot = dimension(bytes)
+    state_delta = dimension(bytes)
 
-    def __init__(self, env_class_name, env_config, env_dimensions):
+    def __init__(self, env_class_name, env_config, env_dimensions, observation_schema: str = ""):
         self.oid = random.randint(0, sys.maxsize)
         self.env_class_name = env_class_name
         self.env_config = env_config
         self.env_dimensions = tuple(env_dimensions)
+        self.observation_schema = observation_schema  # Empty if observations are sent as pickled arrays
         self.terminal = False
         self.server_no_longer_joinable = False
-        self.winners = ""
+        self.winners = b""
         self.serialized_state = b""
+        self.wakeup_port = -1
+        self.notify_port = -1
+        self.state_sequence = -1
+        self.snapshot_sequence = -1
+        self.state_snapshot = b""
+        self.state_delta = b""
@@ -1,4 +1,3 @@
-from copy import deepcopy
 from typing import Tuple, List, Union, Dict
 
 import dill
@@ -6,6 +5,7 @@ import numpy as np
 from . import gui
 from .ai import AI
 from .board import Board, PIECE_TYPES, ORIENTATIONS, BOARD_TO_PLAYER_OBSERVATION_ROTATION_MATRICES, PLAYER_OBSERVATION_TO_BOARD_ROTATION_MATRICES
+from .board import PIECE_IDS, ORIENTATION_IDS, ORIENTATION_TABLE
 from rlcompetition.BaseEnvironment import BaseEnvironment
 
 PLAYER_TO_COLOR = {
@@ -24,6 +24,34 @@ COLOR_TO_PLAYER = {
 }
 
 PIECE_NAME_TO_INDEX = {piece_name: i for i, piece_name in enumerate(PIECE_TYPES.keys())}
+PIECE_NAMES = list(PIECE_TYPES.keys())
+
+# Integer actions enumerate piece x orientation x shift x index cell, with the index cell varying fastest
+BOARD_SIZE = 20
+NUM_CELLS = BOARD_SIZE * BOARD_SIZE
+NUM_SHIFTS = ORIENTATION_TABLE.shape[2]
+ACTION_SPACE_SIZE = len(PIECE_NAMES) * len(ORIENTATIONS) * NUM_SHIFTS * NUM_CELLS
+
+# Integer counterpart of the empty string action
+NO_ACTION = -1
+
+# Fixed layout of serialized states, decoded in place with np.frombuffer.
+# pieces holds one bit per piece type in PIECE_NAMES order for each player that still has that piece.
+# Bump SERIALIZATION_VERSION whenever the layout changes.
+SERIALIZATION_VERSION = 1
+SERIALIZED_STATE_DTYPE = np.dtype([("version", np.uint8),
+                                   ("board", np.uint8, (BOARD_SIZE, BOARD_SIZE)),
+                                   ("pieces", "<u4", (4,)),
+                                   ("scores", "<i4", (4,)),
+                                   ("round_count", "<i4")])
+
+# Piece names for every value of each byte of a piece mask, so a mask decodes with three lookups
+_PIECE_MASK_BYTES = [[[piece for i, piece in enumerate(PIECE_NAMES[8 * byte:8 * byte + 8]) if value >> i & 1]
+                      for value in range(256)]
+                     for byte in range((len(PIECE_NAMES) + 7) // 8)]
+
+# Protocol 2 and later pickles, which is what dill used to produce here, always start with this byte
+_PICKLE_PROTOCOL_BYTE = 0x80
 
 State = object
 
@@ -52,6 +80,30 @@ def _relative_player_id(current_player: int, absolute_player_num) -> int:
     return (absolute_player_num - current_player) % 4
 
 
+# _RELATIVE_COLOR_IDS[player, color] is the relative player id that player sees in a board cell of that color
+_RELATIVE_COLOR_IDS = np.array([[_relative_player_id(player, COLOR_TO_PLAYER[color]) for color in range(5)]
+                                for player in range(4)], dtype=np.int64)
+
+# _ROLLED_PLAYERS[player] reorders absolute player rows so that player comes first
+_ROLLED_PLAYERS = (np.arange(4)[None, :] + np.arange(4)[:, None]) % 4
+
+
+def _absolute_pieces_and_scores(players):
+    pieces = np.zeros((4, len(PIECE_NAMES)), dtype=np.uint8)
+    for p in players:
+        pieces[COLOR_TO_PLAYER[p.player_color], [PIECE_NAME_TO_INDEX[piece] for piece in p.current_pieces]] = 1
+
+    return pieces, np.array([p.player_score for p in players])
+
+
+def _player_observation(relative_board, pieces, score, player):
+    """ Rotate the board and roll the per player arrays so that player sees themselves as player 0. """
+    return {'board': np.ascontiguousarray(_rotate_board_for_player_perspective(board=relative_board, player=player)),
+            'pieces': pieces[_ROLLED_PLAYERS[player]],
+            'score': score[_ROLLED_PLAYERS[player]],
+            'player': np.array([player])}
+
+
 def action_to_string(piece_type: str, index: Tuple[int, int], orientation: str) -> str:
     """Convert a piece_type, index, and orientation into a formatted action string.
 
@@ -105,6 +157,95 @@ def string_to_action(action_str: str) -> Union[Tuple[str, Tuple[int, int], str],
     index = tuple(map(int, index.replace('(', '').replace(')', '').split(',')))
     return piece_type, index, orientation
 
+def _join_int_action(piece_id, orientation_id, shift_id, x, y):
+    return ((piece_id * len(ORIENTATIONS) + orientation_id) * NUM_SHIFTS + shift_id) * NUM_CELLS + y * BOARD_SIZE + x
+
+
+def _split_int_action(action):
+    rest, cell = divmod(action, NUM_CELLS)
+    rest, shift_id = divmod(rest, NUM_SHIFTS)
+    piece_id, orientation_id = divmod(rest, len(ORIENTATIONS))
+    y, x = divmod(cell, BOARD_SIZE)
+    return piece_id, orientation_id, shift_id, x, y
+
+
+def _rotate_int_actions(actions, rotation_matrix, orientation_step):
+    """ Rotate integer actions (or arrays of them) around the center of the board.
+    Works in doubled coordinates so that the half cell center stays an integer. """
+    piece_id, orientation_id, shift_id, x, y = _split_int_action(actions)
+    x, y = 2 * x - (BOARD_SIZE - 1), 2 * y - (BOARD_SIZE - 1)
+    new_x = (rotation_matrix[0, 0] * x + rotation_matrix[0, 1] * y + (BOARD_SIZE - 1)) // 2
+    new_y = (rotation_matrix[1, 0] * x + rotation_matrix[1, 1] * y + (BOARD_SIZE - 1)) // 2
+    orientation_id = (orientation_id + orientation_step) % len(ORIENTATIONS)
+    return _join_int_action(piece_id, orientation_id, shift_id, new_x, new_y)
+
+
+def action_to_int(piece_type: str, index: Tuple[int, int], orientation: str) -> int:
+    """Convert a piece_type, index, and orientation into an integer action.
+
+    Parameters
+    ----------
+    piece_type : str
+        The type of blokus piece to be placed in the action.
+    index : Tuple[int, int]
+        The location where the piece will be placed in the action.
+    orientation : str
+        The orientation in which the piece will be placed in the action, including its shift id.
+
+    Returns
+    -------
+    action : int
+        An integer in [0, ACTION_SPACE_SIZE)
+
+    See Also
+    --------
+    blokus.blokus_env.int_to_action
+    blokus.blokus_env.BlokusEnv.valid_action_mask
+    """
+    return _join_int_action(PIECE_IDS[piece_type], ORIENTATION_IDS[orientation[:-1]], int(orientation[-1]),
+                            int(index[0]), int(index[1]))
+
+
+def int_to_action(action: int) -> Union[Tuple[str, Tuple[int, int], str], None]:
+    """Convert an integer action into piece_type, index, and orientation.
+
+    Parameters
+    ----------
+    action : int
+        The action in integer format
+
+    Returns
+    -------
+    piece_type : str
+        The type of blokus piece to be placed in the action.
+    index : Tuple[int, int]
+        The location where the piece will be placed in the action.
+    orientation : str
+        The orientation in which the piece will be placed in the action, including its shift id.
+    """
+    if action == NO_ACTION:
+        return None
+
+    piece_id, orientation_id, shift_id, x, y = _split_int_action(int(action))
+    return PIECE_NAMES[piece_id], (x, y), ORIENTATIONS[orientation_id] + str(shift_id)
+
+
+def string_to_int_action(action_str: str) -> int:
+    """Convert a formatted action string into an integer action. The empty string becomes NO_ACTION."""
+    if action_str == '':
+        return NO_ACTION
+
+    return action_to_int(*string_to_action(action_str))
+
+
+def int_action_to_string(action: int) -> str:
+    """Convert an integer action into a formatted action string. NO_ACTION becomes the empty string."""
+    if action == NO_ACTION:
+        return ''
+
+    return action_to_string(*int_to_action(action))
+
+
 def start_gui():
     """Initialize graphical interface in order to render board.
 
@@ -212,6 +353,12 @@ class BlokusEnvironment(BaseEnvironment):
 
         return {"board": (20, 20), "pieces": (4, 21), "score": (4,), "player": (1,)}
 
+    @property
+    def observation_dtypes(self) -> Dict[str, np.dtype]:
+        """ Property holding the numpy dtypes for each value in an observation dictionary."""
+
+        return {"board": np.int64, "pieces": np.uint8, "score": np.int64, "player": np.int64}
+
     @staticmethod
     def observation_names():
         """ Get the names for each key in an observation dictionary.
@@ -303,7 +450,7 @@ class BlokusEnvironment(BaseEnvironment):
         return True
 
     @staticmethod
-    def serialize_state(state: object) -> bytearray:
+    def serialize_state(state: object) -> bytes:
         """ Serialize a game state and convert it to a bytearray to be saved or sent over a network.
 
         Parameters
@@ -313,11 +460,20 @@ class BlokusEnvironment(BaseEnvironment):
 
         Returns
         -------
-        serialized_state : bytearray
-            serialized state
+        serialized_state : bytes
+            serialized state in the fixed SERIALIZED_STATE_DTYPE layout
 
         """
-        return dill.dumps(state)
+        board, round_count, players = state
+
+        record = np.zeros((), dtype=SERIALIZED_STATE_DTYPE)
+        record["version"] = SERIALIZATION_VERSION
+        record["board"] = board.board_contents
+        record["pieces"] = [sum(1 << PIECE_NAME_TO_INDEX[piece] for piece in p.current_pieces) for p in players]
+        record["scores"] = [p.player_score for p in players]
+        record["round_count"] = round_count
+
+        return record.tobytes()
 
     @staticmethod
     def deserialize_state(serialized_state: bytearray) -> State:
@@ -333,8 +489,42 @@ class BlokusEnvironment(BaseEnvironment):
         deserialized_state : object
             deserialized state
 
+        Raises
+        ------
+        ValueError
+            If the serialized state was written with a different layout version.
+
         """
-        return dill.loads(serialized_state)
+        version = serialized_state[0]
+        if version == _PICKLE_PROTOCOL_BYTE:  # States saved before the binary format existed
+            board, round_count, players = dill.loads(serialized_state)
+
+            # These players were pickled before they tracked whether they are out of moves
+            for p in players:
+                p.__dict__.setdefault("out_of_moves", False)
+
+            return board, round_count, players
+        if version != SERIALIZATION_VERSION or len(serialized_state) != SERIALIZED_STATE_DTYPE.itemsize:
+            raise ValueError("Cannot read Blokus state of version {} and length {}, expected version {} and length {}"
+                             .format(version, len(serialized_state), SERIALIZATION_VERSION,
+                                     SERIALIZED_STATE_DTYPE.itemsize))
+
+        record = np.frombuffer(serialized_state, dtype=SERIALIZED_STATE_DTYPE, count=1)[0]
+
+        # The board masks are not stored, they are rebuilt from the board once the state is played on
+        board = Board()
+        board.board_contents = record["board"].astype(np.int64)
+        board.clear_masks()
+
+        players = []
+        for player, (score, pieces) in enumerate(zip(record["scores"].tolist(), record["pieces"].tolist())):
+            p = AI(board, PLAYER_TO_COLOR[player])
+            p.player_score = score
+            p.current_pieces = [piece for byte, names in enumerate(_PIECE_MASK_BYTES)
+                                for piece in names[pieces >> (8 * byte) & 0xFF]]
+            players.append(p)
+
+        return board, int(record["round_count"]), players
 
     def current_rewards(self, state: object) -> List[float]:
         """Returns current reward for each player (in absolute order, not reltive to any specific player
@@ -354,7 +544,7 @@ class BlokusEnvironment(BaseEnvironment):
 
         return [p.player_score for p in players]
 
-    def next_state(self, state: object, players: int, actions: str) \
+    def next_state(self, state: object, players: List[int], actions: List[Union[str, int]]) \
             -> Tuple[State, List[int], List[float], bool, Union[List[int], None]]:
         """ Perform a game step from a given state.
 
@@ -366,9 +556,10 @@ class BlokusEnvironment(BaseEnvironment):
         players : List[int]
             The players who's turn it is and are executing actions.
             For Blokus, only one player should ever be passed in this list at a time.
-        actions : List[str],
+        actions : List[Union[str, int]],
             The actions to be executed by the players who's turn it is.
             For Blokus, only one action should ever be passed in this list at a time.
+            Actions may be strings or integer actions from :py:func:`blokus.blokus_env.action_to_int`.
 
         Returns
         -------
@@ -409,19 +600,27 @@ class BlokusEnvironment(BaseEnvironment):
 
         board, round_count, players = state
 
-        players = deepcopy(players)
-        new_board = Board(board)
+        players = [p.copy() for p in players]
+        new_board = board.copy()
 
         color = PLAYER_TO_COLOR[player_num]
 
         current_player = players[player_num]
 
-        if len(action) > 0:
-            piece_type, index, orientation = string_to_action(action)
-            new_board.update_board(color, piece_type, index, orientation, round_count, True)
-            current_player.update_player(piece_type)
-
-        if not any(p.check_moves(board, round_count) for p in players):
+        placed_piece = False
+        if isinstance(action, str):
+            if len(action) > 0:
+                piece_type, index, orientation = string_to_action(action)
+                new_board.update_board(color, piece_type, index, orientation, round_count, True)
+                current_player.update_player(piece_type)
+                placed_piece = True
+        elif action != NO_ACTION:
+            piece_id, orientation_id, shift_id, x, y = _split_int_action(int(action))
+            new_board.place_move(color, piece_id, orientation_id, shift_id, (x, y))
+            current_player.update_player(PIECE_NAMES[piece_id])
+            placed_piece = True
+
+        if not self._any_player_has_moves(board, round_count, players, current_player if placed_piece else None):
             terminal = True
             max_score = 0
             scores = []
@@ -450,6 +649,23 @@ class BlokusEnvironment(BaseEnvironment):
 
         return (new_board, round_count, players), [new_player_num], [reward], terminal, winners
 
+    @staticmethod
+    def _any_player_has_moves(board: Board, round_count: int, players: List[AI], moved_player: Union[AI, None]) -> bool:
+        """ Checks the players in order and stops at the first one with a legal move on board.
+
+        Players found to have no moves are marked as out of moves so later turns skip them. Placed pieces never leave
+        the board, so a player without moves could only get one back by placing a piece, which they cannot do.
+        That does not hold in the first round, where every player starts from their default corner instead of
+        their own pieces, or for moved_player, who is checked against the board from before their own move.
+        """
+        for p in players:
+            if p.check_moves(board, round_count):
+                return True
+            if round_count > 0 and p is not moved_player:
+                p.out_of_moves = True
+
+        return False
+
     def valid_actions(self, state: object, player: int) -> List[str]:
         """ Valid actions for a specific state and player.
         If there are no valid actions, empty string is given to represent a no-op
@@ -550,22 +766,22 @@ class BlokusEnvironment(BaseEnvironment):
 
         return valid_moves
 
-    def convert_real_action_to_player_perspective_action(self, action: str, player: int) -> str:
+    def convert_real_action_to_player_perspective_action(self, action: Union[str, int], player: int) -> Union[str, int]:
         """ Converts a real action consumable by the actual environment to the corresponding player-perspective action
         that is in coordinance with the player's rotated observation of the board
 
 
         Parameters
         ----------
-        action: str
-            The real action.
+        action: Union[str, int]
+            The real action, either as a string or as an integer action.
         player : int
             The player to view this action from.
 
         Returns
         -------
-        player_action : str
-            The player-perspective action.
+        player_action : Union[str, int]
+            The player-perspective action, in the same format that was passed in.
 
         See Also
         --------
@@ -573,6 +789,11 @@ class BlokusEnvironment(BaseEnvironment):
             You have to convert a player-perspective action to a real action before passing it to the environment
         """
 
+        if not isinstance(action, str):
+            if action == NO_ACTION:
+                return NO_ACTION
+            return _rotate_int_actions(int(action), BOARD_TO_PLAYER_OBSERVATION_ROTATION_MATRICES[player], player * 2)
+
         if not action:
             return ""
 
@@ -588,22 +809,22 @@ class BlokusEnvironment(BaseEnvironment):
         return action_to_string(piece_type, index, orientation)
 
 
-    def convert_player_perspective_action_to_real_action(self, player_action: str, player: int) -> str:
+    def convert_player_perspective_action_to_real_action(self, player_action: Union[str, int], player: int) -> Union[str, int]:
         """ Converts a player-perspective action in coordinance with the player's rotated observation of the board
         to the corresponding real action consumable by the actual environment.
 
 
         Parameters
         ----------
-        player_action: str
-            The player-perspective action.
+        player_action: Union[str, int]
+            The player-perspective action, either as a string or as an integer action.
         player : int
             The player to view this action from.
 
         Returns
         -------
-        action : str
-            The real action corresponding to the player-perspective action
+        action : Union[str, int]
+            The real action corresponding to the player-perspective action, in the same format that was passed in.
 
         See Also
         --------
@@ -613,6 +834,12 @@ class BlokusEnvironment(BaseEnvironment):
 
         """
 
+        if not isinstance(player_action, str):
+            if player_action == NO_ACTION:
+                return NO_ACTION
+            return _rotate_int_actions(int(player_action), PLAYER_OBSERVATION_TO_BOARD_ROTATION_MATRICES[player],
+                                       -player * 2)
+
         if not player_action:
             return ""
 
@@ -664,7 +891,62 @@ class BlokusEnvironment(BaseEnvironment):
                                          player_color=PLAYER_TO_COLOR[player],
                                          player_pieces=current_player_object.current_pieces)
 
-    def is_valid_action(self, state: object, player: int, action: str) -> bool:
+    def valid_action_mask(self, state: object, player: int) -> np.ndarray:
+        """ Valid integer actions for a specific state and player as a boolean mask.
+
+        Parameters
+        ----------
+        state : object
+            The current state to execute a game step from.
+        player : int
+            The player for which valid actions will be returned.
+
+        Returns
+        -------
+        valid_action_mask : np.ndarray
+            Boolean array of shape (ACTION_SPACE_SIZE, ). valid_action_mask[action] is True
+            if the integer action is valid. If no entry is True, the player has to pass NO_ACTION.
+
+        See Also
+        --------
+        blokus.blokus_env.action_to_int
+        blokus.blokus_env.int_to_action
+        blokus.blokus_env.BlokusEnv.valid_actions
+            The same actions as strings
+
+        Notes
+        -----
+        This method does not keep track of who's turn it is. That is up to the user.
+        """
+        board, round_count, players = state
+        piece_ids, indexes, valid = board.get_valid_placements(round_count=round_count,
+                                                               player_color=PLAYER_TO_COLOR[player],
+                                                               player_pieces=players[player].current_pieces)
+
+        mask = np.zeros(ACTION_SPACE_SIZE, dtype=np.bool_)
+        piece_nums, index_nums, orientation_ids, shift_ids = np.nonzero(valid)
+        if len(piece_nums) > 0:
+            indexes = np.asarray(indexes, dtype=np.int64)[index_nums]
+            mask[_join_int_action(piece_ids[piece_nums], orientation_ids, shift_ids, indexes[:, 0], indexes[:, 1])] = True
+
+        return mask
+
+    def player_perspective_valid_action_mask(self, state: object, player: int) -> np.ndarray:
+        """ Same as :py:func:`blokus.blokus_env.BlokusEnv.valid_action_mask`, but with integer actions rotated
+        to match this player's perspective of the board.
+
+        See Also
+        --------
+        blokus.blokus_env.BlokusEnv.convert_player_perspective_action_to_real_action
+            You have to convert a player-perspective action to a real action before passing it to the environment
+        """
+        actions = np.flatnonzero(self.valid_action_mask(state=state, player=player))
+
+        mask = np.zeros(ACTION_SPACE_SIZE, dtype=np.bool_)
+        mask[_rotate_int_actions(actions, BOARD_TO_PLAYER_OBSERVATION_ROTATION_MATRICES[player], player * 2)] = True
+        return mask
+
+    def is_valid_action(self, state: object, player: int, action: Union[str, int]) -> bool:
         """ Returns True if an action is valid for a specific player and state.
 
         (Does not validate rotated player-perspective actions)
@@ -675,8 +957,8 @@ class BlokusEnvironment(BaseEnvironment):
             The current state to execute a game step from.
         player : int
             The player that would be executing the action.
-        action : str
-            The action in question
+        action : Union[str, int]
+            The action in question, either as a string or as an integer action
 
         Returns
         -------
@@ -700,23 +982,33 @@ class BlokusEnvironment(BaseEnvironment):
         this method returns true, regardless of who just executed their turn or who should be going now.
         """
 
-        if len(action) == 0:
-            return False
-
         board, round_count, players = state
-        piece_type, index, orientation = string_to_action(action)
         current_player = players[player]
-        all_valid_moves = current_player.collect_moves(board, round_count)
 
-        is_valid_move = False
-        try:
-            # print(all_valid_moves[piece_type][index])
-            if orientation in all_valid_moves[piece_type][index]:
-                is_valid_move = True
-        except KeyError:
-            pass
+        if isinstance(action, str):
+            if len(action) == 0:
+                return False
 
-        return is_valid_move
+            # Actions come straight from the clients, so they may not parse at all
+            try:
+                piece_type, index, orientation = string_to_action(action)
+            except ValueError:
+                return False
+
+            if (piece_type not in PIECE_IDS or orientation[:-1] not in ORIENTATION_IDS or not orientation[-1:].isdecimal()
+                    or len(index) != 2):
+                return False
+            piece_id, orientation_id, shift_id = PIECE_IDS[piece_type], ORIENTATION_IDS[orientation[:-1]], int(orientation[-1])
+        else:
+            if not 0 <= action < ACTION_SPACE_SIZE:
+                return False
+            piece_id, orientation_id, shift_id, x, y = _split_int_action(int(action))
+            piece_type, index = PIECE_NAMES[piece_id], (x, y)
+
+        if piece_type not in current_player.current_pieces:
+            return False
+
+        return bool(board.is_valid_placement(round_count, PLAYER_TO_COLOR[player], piece_id, orientation_id, shift_id, index))
 
     def state_to_observation(self, state: object, player: int) -> Dict[str, np.ndarray]:
         """ Convert the raw game state to a consumable observation for a specific player agent.
@@ -749,20 +1041,29 @@ class BlokusEnvironment(BaseEnvironment):
         and other players lose.
         """
 
-        pieces = np.zeros((4, 21), dtype=np.uint8)
         board, round_count, players = state
-        board = [[_relative_player_id(player, COLOR_TO_PLAYER[pos]) for pos in row] for row in board.board_contents]
-        rotated_board = _rotate_board_for_player_perspective(board=np.asarray(board), player=player)
+        pieces, score = _absolute_pieces_and_scores(players)
+        return _player_observation(np.take(_RELATIVE_COLOR_IDS[player], board.board_contents), pieces, score, player)
 
-        for p in players:
+    def state_to_observations_all(self, state: object) -> List[Dict[str, np.ndarray]]:
+        """ Convert the raw game state to observations for all four players at once.
 
-            color = p.player_color
-            rel_player_id = _relative_player_id(current_player=player,
-                                                absolute_player_num=COLOR_TO_PLAYER[color])
+        Parameters
+        ----------
+        state : object
+            The state to create observations for
 
-            for piece in p.current_pieces:
-                pieces[rel_player_id, PIECE_NAME_TO_INDEX[piece]] = 1
+        Returns
+        -------
+        observations : List[Dict[str, np.ndarray]]
+            observations[player] is the same as state_to_observation(state, player)
 
-        score = np.roll(np.array([p.player_score for p in players]), -player)
+        See Also
+        --------
+        blokus.blokus_env.BlokusEnv.state_to_observation
+        """
+        board, round_count, players = state
+        pieces, score = _absolute_pieces_and_scores(players)
+        boards = _RELATIVE_COLOR_IDS[:, board.board_contents]
 
-        return {'board': rotated_board, 'pieces': pieces, 'score': score, 'player': np.array([player])}
+        return [_player_observation(boards[player], pieces, score, player) for player in range(4)]
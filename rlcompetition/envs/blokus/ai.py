@@ -6,6 +6,8 @@ Summary:
 Keeps track of player score, inventory, and returns valid moves for that specific player.
 '''
 
+from copy import copy
+
 # Stores structure of all playable pieces
 # key: piece name
 # val: number of points associated with piece
@@ -27,6 +29,14 @@ class AI:
         self.player_score = 0
         self.player_color = color
         self.current_pieces = list(GAME_PIECE_VALUES.keys())  # Gives all piece names to player when game starts
+        self.out_of_moves = False  # Set once the player can never move again, so check_moves can skip the board
+
+    def copy(self):
+        ''' Returns an independent copy of the player without going through deepcopy
+        '''
+        new_player = copy(self)
+        new_player.current_pieces = list(self.current_pieces)
+        return new_player
 
     def collect_moves(self, board, round_count):
         ''' Collects all valid moves for this player from the current state of the board
@@ -36,10 +46,9 @@ class AI:
     def check_moves(self, board, round_count):
         ''' Checks whether player has at least one valid move before prompting player for a move.
         '''
-        self.all_valid_moves = board.get_all_valid_moves(round_count, self.player_color, self.current_pieces)
-        if len(list(self.all_valid_moves.keys())) == 0:  # If no valid moves available for this player, return FALSE
+        if self.out_of_moves:
             return False
-        return True
+        return board.has_legal_move(round_count, self.player_color, self.current_pieces)
 
     def update_player(self, piece_type):
         ''' Keeps track of player's inventory and score as piece type has been played
@@ -0,0 +1,47 @@
+'''
+Summary:
+Bitboard helpers for board.py's move generation.
+
+Every row of the 20 by 20 board is stored as a 20 bit mask (bit x set means column x), so a whole board is
+a (20,) uint64 array. The forbidden and corner cells of a player are computed with a few shifts and ORs,
+and computation.check_all_placements then reads the forbidden cells straight from the row masks.
+'''
+
+import numpy as np
+
+BOARD_SIZE = 20
+FULL_ROW = (1 << BOARD_SIZE) - 1
+
+ROW_BITS = np.left_shift(np.uint64(1), np.arange(BOARD_SIZE, dtype=np.uint64))
+
+
+def board_rows(cells):
+    ''' Converts a 20 by 20 boolean matrix into a row bitboard
+    '''
+    return np.bitwise_or.reduce(np.where(cells, ROW_BITS, np.uint64(0)), axis=1)
+
+
+def forbidden_rows(occupied, own):
+    ''' Cells a player may not cover: anything occupied, or sharing an edge with one of their own pieces
+    '''
+    forbidden = occupied | ((own << np.uint64(1)) & np.uint64(FULL_ROW)) | (own >> np.uint64(1))
+    forbidden[1:] |= own[:-1]
+    forbidden[:-1] |= own[1:]
+    return forbidden
+
+
+def corner_rows(forbidden, own):
+    ''' Cells that touch one of the player's pieces diagonally and are not forbidden
+    '''
+    diagonal = ((own << np.uint64(1)) & np.uint64(FULL_ROW)) | (own >> np.uint64(1))
+    corners = np.zeros_like(own)
+    corners[1:] |= diagonal[:-1]
+    corners[:-1] |= diagonal[1:]
+    return corners & ~forbidden & np.uint64(FULL_ROW)
+
+
+def rows_to_indexes(rows):
+    ''' Lists the set cells of a row bitboard as (x, y) tuples in row-major order
+    '''
+    ys, xs = np.nonzero((rows[:, None] & ROW_BITS[None, :]) != 0)
+    return list(zip(xs.tolist(), ys.tolist()))
@@ -13,10 +13,9 @@ COLOR ENCODINGS
 4 - Yellow
 '''
 
-from collections import defaultdict
-from copy import deepcopy
 import numpy as np
 from . import computation as comp
+from . import bitboard as bb
 
 # Stores structure of all playable pieces
 # key: piece name:
@@ -72,6 +71,14 @@ PLAYER_OBSERVATION_TO_BOARD_ROTATION_MATRICES = np.array([
      [1, 0]]
 ], dtype=np.int32)
 
+# Piece and orientation names to their ids in the orientation table
+PIECE_IDS = {piece_type: piece_id for piece_id, piece_type in enumerate(PIECE_TYPES)}
+ORIENTATION_IDS = {orientation: orientation_id for orientation_id, orientation in enumerate(ORIENTATIONS)}
+
+# Offsets of every cell for every piece, orientation, and shift, computed once instead of on every check
+ORIENTATION_TABLE, PIECE_SIZES = comp.build_orientation_table(list(PIECE_TYPES.values()), ORIENTATIONS)
+
+
 class Board:
     def __init__(self, copy_from_board=None):
         self.reset_board(copy_from_board)
@@ -80,27 +87,64 @@ class Board:
         ''' Creates empty 2-dimensional 20 by 20 numpy zeros array that represents a clean board
         '''
         if copy_from_board is not None:
-            self.board_contents = deepcopy(copy_from_board.board_contents)
+            self.board_contents = copy_from_board.board_contents.copy()
+            self.forbidden_rows = copy_from_board.forbidden_rows.copy()
+            self.corner_rows = copy_from_board.corner_rows.copy()
         else:
-            self.board_contents = np.zeros((20, 20), dtype=int)
+            self.board_contents = np.zeros((20, 20), dtype=np.int64)
+            self.forbidden_rows = np.zeros((4, bb.BOARD_SIZE), dtype=np.uint64)
+            self.corner_rows = np.zeros((4, bb.BOARD_SIZE), dtype=np.uint64)
+
+    def __getattr__(self, name):
+        ''' Rebuilds the masks dropped by clear_masks the first time anything reads them
+        '''
+        if name in ("forbidden_rows", "corner_rows"):
+            self.reset_masks()
+            return self.__dict__[name]
+        raise AttributeError(name)
+
+    def reset_masks(self):
+        ''' Rebuilds every player's forbidden and corner row bitboards from board_contents.
+            Only needed if board_contents was modified directly instead of through update_board.
+        '''
+        occupied = bb.board_rows(self.board_contents != 0)
+        self.forbidden_rows = np.zeros((4, bb.BOARD_SIZE), dtype=np.uint64)
+        self.corner_rows = np.zeros((4, bb.BOARD_SIZE), dtype=np.uint64)
+        for player in range(4):
+            own = bb.board_rows(self.board_contents == player + 1)
+            self.forbidden_rows[player] = bb.forbidden_rows(occupied, own)
+            self.corner_rows[player] = bb.corner_rows(self.forbidden_rows[player], own)
+
+    def clear_masks(self):
+        ''' Same as reset_masks, but only rebuilds the masks once move generation or placement needs them,
+            so boards that are only displayed or compared never pay for it.
+        '''
+        self.__dict__.pop("forbidden_rows", None)
+        self.__dict__.pop("corner_rows", None)
+
+    def copy(self):
+        ''' Returns an independent copy of the board without going through deepcopy
+        '''
+        return Board(self)
 
     def update_board(self, player_color, piece_type, index, piece_orientation, round_count, ai_game):
         ''' Takes index point and places piece_type on board
             index[0] = x coord
             index[1] = y coord
         '''
+        self.place_move(player_color, PIECE_IDS[piece_type], ORIENTATION_IDS[piece_orientation[:-1]], int(piece_orientation[-1]), index)  # Last character in piece orientation is the shift id
+
+    def place_move(self, player_color, piece_id, orientation_id, shift_id, index):
+        ''' Same as update_board, but takes ids into the orientation table instead of piece and orientation names
+        '''
         self.player_color = player_color
-        for offset in comp.shift_offsets(PIECE_TYPES[piece_type], int(piece_orientation[-1])):  # NEW: Shifts offset orientation according to last character in piece orientation
-            if offset[0] == 0 and offset[1] == 0:
-                self.place_piece(index[0] + offset[0], index[1] + offset[1])  # Orientation doesn't matter since (0, 0) is the reference point
-            else:
-                new_x, new_y = comp.rotate_piece(index, offset[0], offset[1], piece_orientation)
-                self.place_piece(new_x, new_y)
+        offsets = ORIENTATION_TABLE[piece_id, orientation_id, shift_id, :PIECE_SIZES[piece_id]]
+        comp.place_cells(self.board_contents, self.forbidden_rows, self.corner_rows, player_color, offsets + np.asarray(index, dtype=np.int64))
 
     def place_piece(self, x, y):
         ''' Places piece on board by filling board_contents with the current player color
         '''
-        self.board_contents[y][x] = self.player_color
+        comp.place_cells(self.board_contents, self.forbidden_rows, self.corner_rows, self.player_color, np.array([[x, y]], dtype=np.int64))
 
     # def gather_empty_board_corners(self, corners_coords):
     #     ''' Checks what corners are still available to play in the first round of the game
@@ -162,33 +206,98 @@ class Board:
                         orientation: string specifying the current orientation being checked
             RETURNS: List of all offset lists where a shift at that index and orientation is possible
         '''
-        shifted_offsets = comp.get_all_shifted_offsets(PIECE_TYPES[piece_type], orientation)
+        piece_id = PIECE_IDS[piece_type]
+        size = PIECE_SIZES[piece_id]
+        shifted_offsets = np.ascontiguousarray(ORIENTATION_TABLE[piece_id, ORIENTATION_IDS[orientation], :size, :size])
         valid_shift_offsets = comp.check_shifted(self.board_contents, player_color, index, orientation, shifted_offsets)
 
         return valid_shift_offsets
 
+    def get_valid_placements(self, round_count, player_color, player_pieces):
+        ''' Description: Checks every piece, index, orientation, and shift a player could play in one call.
+            Parameters:
+                round_count: int number of rounds played so far
+                player_color: int representing current player color
+                player_pieces: list of the piece names the player still has
+            Returns:
+                piece_ids: (K, ) int array with the ids of player_pieces
+                indexes: list of the (x, y) index cells that were checked
+                valid: (K, len(indexes), orientations, max shifts) boolean array of which placements are valid
+        '''
+        piece_ids, empty_corner_indexes = self._placement_candidates(round_count, player_color, player_pieces)
+
+        if len(empty_corner_indexes) == 0 or len(piece_ids) == 0:
+            valid = np.zeros((len(piece_ids), len(empty_corner_indexes)) + ORIENTATION_TABLE.shape[1:3], dtype=np.bool_)
+        else:
+            valid = comp.check_all_placements(self.forbidden_rows[player_color-1], np.array(empty_corner_indexes, dtype=np.int64),
+                                              piece_ids, ORIENTATION_TABLE, PIECE_SIZES)
+
+        return piece_ids, empty_corner_indexes, valid
+
+    def has_legal_move(self, round_count, player_color, player_pieces):
+        ''' Checks whether get_all_valid_moves would return any move, stopping at the first valid placement
+        '''
+        piece_ids, empty_corner_indexes = self._placement_candidates(round_count, player_color, player_pieces)
+        if len(empty_corner_indexes) == 0 or len(piece_ids) == 0:
+            return False
+
+        return comp.has_any_placement(self.forbidden_rows[player_color-1], np.array(empty_corner_indexes, dtype=np.int64),
+                                      piece_ids, ORIENTATION_TABLE, PIECE_SIZES)
+
+    def _placement_candidates(self, round_count, player_color, player_pieces):
+        ''' Returns the ids of the player's pieces and the index cells they may be placed at
+        '''
+        piece_ids = np.array([PIECE_IDS[piece_type] for piece_type in player_pieces], dtype=np.int64)
+
+        if round_count == 0:  # If still first round of game..
+            empty_corner_indexes = [PLAYER_DEFAULT_CORNERS[player_color-1]]
+        else:
+            empty_corner_indexes = bb.rows_to_indexes(self.corner_rows[player_color-1])  # Only the live frontier kept up to date by update_board
+
+        return piece_ids, empty_corner_indexes
+
+    def is_valid_placement(self, round_count, player_color, piece_id, orientation_id, shift_id, index):
+        ''' Description: Checks a single move without enumerating any others. The index must be the player's
+                         default corner in the first round, or one of their corner cells afterwards, and every
+                         cell of the piece must be on the board, empty, and not share an edge with their color.
+            Parameters:
+                round_count: int number of rounds played so far
+                player_color: int representing current player color
+                piece_id, orientation_id, shift_id: ids into the orientation table
+                index: int tuple (x, y) of the index cell
+            Returns:
+                bool indicating whether get_all_valid_moves would include this move
+        '''
+        x, y = index
+        if not (0 <= x < 20 and 0 <= y < 20) or not 0 <= shift_id < PIECE_SIZES[piece_id]:
+            return False
+
+        if round_count == 0:
+            if (x, y) != PLAYER_DEFAULT_CORNERS[player_color-1]:
+                return False
+        elif not (int(self.corner_rows[player_color-1, y]) >> x) & 1:
+            return False
+
+        offsets = ORIENTATION_TABLE[piece_id, orientation_id, shift_id, :PIECE_SIZES[piece_id]]
+        return comp.check_placement(self.forbidden_rows[player_color-1], offsets, x, y)
+
     def get_all_valid_moves(self, round_count, player_color, player_pieces):
         ''' Gathers all valid moves on the board that meet the following criteria:
             - Index of selected piece touches same-colored corner of a piece
             - Player piece does not fall outside of the board
             - Player piece does not overlap any of their pieces or other opponent pieces
             - May lay adjacent to another piece as long as its another color
+            Returns a dict of the form {piece_type: {index: [orientation + shift_id]}}
         '''
-        if round_count == 0:  # If still first round of game..
-            # empty_corner_indexes = self.gather_empty_board_corners([(0, 0), (19, 0), (0, 19), (19, 19)])
-            empty_corner_indexes = [PLAYER_DEFAULT_CORNERS[player_color-1]]
-        else:
-            empty_corner_indexes = self.gather_empty_corner_indexes(player_color)
+        _, empty_corner_indexes, valid = self.get_valid_placements(round_count, player_color, player_pieces)
 
+        # np.nonzero walks the placements in piece, index, orientation, shift order,
+        # which is the order moves have always been reported in.
         all_valid_moves = {}
-        for piece_type in player_pieces:                # Loop through all pieces the player currently has
-            all_index_orientations = defaultdict(list)  # Valid indexes with their valid orientations dict created for every piece
-            for index in empty_corner_indexes:          # Loop through all indexes where a piece can be placed
-                for orientation in ORIENTATIONS:        # Loop through all possible orientations at an unshifted index
-                    for shifted_id in self.check_orientation_shifts(player_color, piece_type, index, orientation):  # NEW: Loop through all shifted offsets of a particular orientation, if none valid, nothing gets added
-                        all_index_orientations[index].append(orientation + str(shifted_id))                         # NEW: shifted_id is the cell(s) in piece where a shift is possible
-            if len(list(all_index_orientations.keys())) > 0:  # If there are valid indexes for the piece type..
-                all_valid_moves[piece_type] = all_index_orientations
+        for piece_num, index_num, orientation_id, shift_id in zip(*(ids.tolist() for ids in np.nonzero(valid))):
+            all_index_orientations = all_valid_moves.setdefault(player_pieces[piece_num], {})
+            all_index_orientations.setdefault(empty_corner_indexes[index_num], []).append(
+                ORIENTATIONS[orientation_id] + str(shift_id))
 
         return all_valid_moves
 
@@ -244,3 +244,177 @@ def get_all_shifted_offsets(offsets, orientation):
         shifted_offsets[offset_id] = shift_offsets(orientation_offsets_to_shift, offset_id)
 
     return shifted_offsets
+
+
+#### PRECOMPUTED ORIENTATION TABLE ####
+def build_orientation_table(all_offsets, orientations):
+    ''' Description: Precomputes the board offsets of every cell for every piece, orientation, and shift
+                     so that rotate_piece and get_all_shifted_offsets never have to run during a game.
+        Parameters:
+            all_offsets: list of the default offset arrays of every piece, indexed by piece id
+            orientations: list of orientation strings, indexed by orientation id
+        Returns:
+            orientation_table: (pieces, orientations, max size, max size, 2) int64 array where
+                               orientation_table[piece_id, orientation_id, shift_id, :piece_sizes[piece_id]]
+                               are the (x, y) offsets of every cell of the piece from the index cell
+            piece_sizes: (pieces, ) int64 array with the number of cells of each piece, which is also
+                         the number of shifts it has
+    '''
+    piece_sizes = np.array([len(offsets) for offsets in all_offsets], dtype=np.int64)
+    max_size = piece_sizes.max()
+    orientation_table = np.zeros((len(all_offsets), len(orientations), max_size, max_size, 2), np.int64)
+
+    for piece_id, offsets in enumerate(all_offsets):
+        offsets = np.ascontiguousarray(offsets, dtype=np.int64)
+        for orientation_id, orientation in enumerate(orientations):
+            size = piece_sizes[piece_id]
+            orientation_table[piece_id, orientation_id, :size, :size] = get_all_shifted_offsets(offsets, orientation)
+
+    return orientation_table, piece_sizes
+
+
+@jit("boolean[:, :, :, ::1](uint64[::1], int64[:, ::1], int64[::1], int64[:, :, :, :, ::1], int64[::1])", nopython=True)
+def check_all_placements(forbidden_rows, indexes, piece_ids, orientation_table, piece_sizes):
+    ''' Description: Checks every shift of every orientation of every given piece at every index cell in one call.
+        Parameters:
+            forbidden_rows: row bitboard (bit x of row y set) of all cells the player may not cover
+            indexes: (A, 2) int array of the (x, y) index cells to place pieces at
+            piece_ids: (K, ) int array of the pieces to check
+            orientation_table: table built by build_orientation_table
+            piece_sizes: piece sizes built by build_orientation_table
+        Returns:
+            (K, A, orientations, max size) boolean array of which placements stay on the board and avoid
+            every forbidden cell. Shift ids past the size of a piece are always False.
+    '''
+    num_orientations = orientation_table.shape[1]
+    max_size = orientation_table.shape[2]
+    valid = np.zeros((len(piece_ids), len(indexes), num_orientations, max_size), np.bool_)
+    one = np.uint64(1)
+
+    for piece_num in range(len(piece_ids)):
+        piece_id = piece_ids[piece_num]
+        size = piece_sizes[piece_id]
+        for index_num in range(len(indexes)):
+            index_x = indexes[index_num, 0]
+            index_y = indexes[index_num, 1]
+            for orientation_id in range(num_orientations):
+                for shift_id in range(size):
+                    valid_placement = True
+                    for cell in range(size):
+                        x = index_x + orientation_table[piece_id, orientation_id, shift_id, cell, 0]
+                        y = index_y + orientation_table[piece_id, orientation_id, shift_id, cell, 1]
+                        if x < 0 or x >= 20 or y < 0 or y >= 20 or (forbidden_rows[y] >> np.uint64(x)) & one:
+                            valid_placement = False
+                            break
+                    valid[piece_num, index_num, orientation_id, shift_id] = valid_placement
+
+    return valid
+
+
+@jit("boolean(uint64[::1], int64[:, ::1], int64[::1], int64[:, :, :, :, ::1], int64[::1])", nopython=True)
+def has_any_placement(forbidden_rows, indexes, piece_ids, orientation_table, piece_sizes):
+    ''' Description: Same checks as check_all_placements, but stops at the first valid placement.
+        Parameters:
+            forbidden_rows: row bitboard (bit x of row y set) of all cells the player may not cover
+            indexes: (A, 2) int array of the (x, y) index cells to place pieces at
+            piece_ids: (K, ) int array of the pieces to check
+            orientation_table: table built by build_orientation_table
+            piece_sizes: piece sizes built by build_orientation_table
+        Returns:
+            bool indicating whether any of the pieces can be placed at any of the index cells
+    '''
+    one = np.uint64(1)
+    for piece_num in range(len(piece_ids)):
+        piece_id = piece_ids[piece_num]
+        size = piece_sizes[piece_id]
+        for index_num in range(len(indexes)):
+            index_x = indexes[index_num, 0]
+            index_y = indexes[index_num, 1]
+            for orientation_id in range(orientation_table.shape[1]):
+                for shift_id in range(size):
+                    valid_placement = True
+                    for cell in range(size):
+                        x = index_x + orientation_table[piece_id, orientation_id, shift_id, cell, 0]
+                        y = index_y + orientation_table[piece_id, orientation_id, shift_id, cell, 1]
+                        if x < 0 or x >= 20 or y < 0 or y >= 20 or (forbidden_rows[y] >> np.uint64(x)) & one:
+                            valid_placement = False
+                            break
+                    if valid_placement:
+                        return True
+
+    return False
+
+
+@jit("boolean(uint64[::1], int64[:, :], int64, int64)", nopython=True)
+def check_placement(forbidden_rows, offsets, index_x, index_y):
+    ''' Description: Checks a single placement, looking only at the cells the piece would cover.
+        Parameters:
+            forbidden_rows: row bitboard (bit x of row y set) of all cells the player may not cover
+            offsets: (N, 2) int array of the (x, y) offsets of every cell of the piece from the index cell
+            index_x: int x coord of the index cell
+            index_y: int y coord of the index cell
+        Returns:
+            bool indicating whether every cell stays on the board and avoids every forbidden cell
+    '''
+    one = np.uint64(1)
+    for cell in range(len(offsets)):
+        x = index_x + offsets[cell, 0]
+        y = index_y + offsets[cell, 1]
+        if x < 0 or x >= 20 or y < 0 or y >= 20 or (forbidden_rows[y] >> np.uint64(x)) & one:
+            return False
+    return True
+
+
+#### INCREMENTAL BOARD MASKS ####
+@jit("void(int64[:, ::1], uint64[:, ::1], uint64[:, ::1], int64, int64[:, ::1])", nopython=True)
+def place_cells(board_contents, forbidden_rows, corner_rows, player_color, cells):
+    ''' Description: Places cells of one color on the board and updates every player's forbidden and corner
+                     row bitboards around them, so they never have to be rebuilt from the whole board.
+        Parameters:
+            board_contents: 20 by 20 numpy matrix representing the current state of the board
+            forbidden_rows: (4, 20) row bitboards of the cells each player may not cover
+            corner_rows: (4, 20) row bitboards of the empty cells touching each player's pieces diagonally
+            player_color: int representing the color being placed
+            cells: (N, 2) int array of the (x, y) cells to fill
+    '''
+    for cell in range(len(cells)):
+        if cells[cell, 0] < 0 or cells[cell, 0] >= 20 or cells[cell, 1] < 0 or cells[cell, 1] >= 20:
+            raise IndexError("Piece does not fit on the board")
+
+    player = player_color - 1
+    one = np.uint64(1)
+    for cell in range(len(cells)):
+        x = cells[cell, 0]
+        y = cells[cell, 1]
+        board_contents[y, x] = player_color
+
+        bit = one << np.uint64(x)
+        for other in range(forbidden_rows.shape[0]):  # Occupied cells are forbidden for everyone
+            forbidden_rows[other, y] |= bit
+
+        # Cells sharing an edge with the piece are forbidden for its own color
+        sides = bit
+        if x > 0:
+            sides |= bit >> one
+        if x < 19:
+            sides |= bit << one
+        forbidden_rows[player, y] |= sides
+        if y > 0:
+            forbidden_rows[player, y - 1] |= bit
+        if y < 19:
+            forbidden_rows[player, y + 1] |= bit
+
+        # Cells touching the piece diagonally become corners for its own color
+        diagonals = np.uint64(0)
+        if x > 0:
+            diagonals |= bit >> one
+        if x < 19:
+            diagonals |= bit << one
+        if y > 0:
+            corner_rows[player, y - 1] |= diagonals
+        if y < 19:
+            corner_rows[player, y + 1] |= diagonals
+
+    for other in range(corner_rows.shape[0]):
+        for y in range(20):
+            corner_rows[other, y] &= ~forbidden_rows[other, y]
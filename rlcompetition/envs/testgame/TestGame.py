@@ -20,8 +20,12 @@ class TestGame(BaseEnvironment):
         return ['state']
 
     @property
-    def observation_shape(self):
-        return {"state", [1]}
+    def observation_shape(self) -> Dict[str, tuple]:
+        return {"state": (1,)}
+
+    @property
+    def observation_dtypes(self) -> Dict[str, np.dtype]:
+        return {"state": np.int64}
 
     def new_state(self, num_players: int = 1):
         return np.random.randint(0, 100, (1,)), [0]
@@ -125,6 +125,12 @@ class TicTacToe2PlayerEnv(BaseEnvironment):
 
         return {"board": (3, 3)}
 
+    @property
+    def observation_dtypes(self) -> Dict[str, np.dtype]:
+        """ Property holding the numpy dtypes for each value in an observation dictionary."""
+
+        return {"board": np.int8}
+
     @staticmethod
     def observation_names():
         """ Get the names for each key in an observation dictionary.
@@ -347,14 +353,14 @@ class TicTacToe2PlayerEnv(BaseEnvironment):
             valid_actions.append("")
         return valid_actions
 
-    def is_valid_action(self, state: object, player_num: int, action: str) -> bool:
+    def is_valid_action(self, state: object, player: int, action: str) -> bool:
         """ Returns True if an action is valid for a specific player and state.
 
         Parameters
         ----------
         state : object
             The current state to execute a game step from.
-        player_num : int
+        player : int
             The player that would be executing the action.
         action : str
             The action in question
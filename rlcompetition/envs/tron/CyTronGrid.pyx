@@ -5,6 +5,27 @@ cpdef void next_state_inplace(long[:, ::1] board,
                               long[::1] directions,
                               long[::1] deaths,
                               const long[::1] actions):
+    _next_state(board, heads, directions, deaths, actions)
+
+
+cpdef void next_state_batch_inplace(long[:, :, ::1] boards,
+                                    long[:, ::1] heads,
+                                    long[:, ::1] directions,
+                                    long[:, ::1] deaths,
+                                    const long[:, ::1] actions):
+    """ Step a batch of games stacked along the first axis of every array. """
+    cdef long B = boards.shape[0]
+    cdef long b
+
+    for b in range(B):
+        _next_state(boards[b], heads[b], directions[b], deaths[b], actions[b])
+
+
+cdef inline void _next_state(long[:, ::1] board,
+                             long[::1] heads,
+                             long[::1] directions,
+                             long[::1] deaths,
+                             const long[::1] actions):
     cdef long N = board.shape[0]
     cdef long num_players = heads.shape[0]
 
@@ -71,9 +92,18 @@ cpdef void relative_player_inplace(long[:, ::1] board, const long num_players, c
                 board[i, j] = ((board[i, j] - player + num_players) % num_players) + 1
 
 
-
-
-
-
-
-
+cpdef void relative_player_batch(const long[:, :, ::1] boards, long[:, :, :, ::1] observations, const long num_players):
+    """ Fill observations[b, p] with board b as seen by player p, for every game and every player at once. """
+    cdef long B = boards.shape[0]
+    cdef long N = boards.shape[1]
+    cdef long b, p, i, j, cell
+
+    for b in range(B):
+        for p in range(num_players):
+            for i in range(N):
+                for j in range(N):
+                    cell = boards[b, i, j]
+                    if cell > 0:
+                        observations[b, p, i, j] = ((cell - (p + 1) + num_players) % num_players) + 1
+                    else:
+                        observations[b, p, i, j] = cell
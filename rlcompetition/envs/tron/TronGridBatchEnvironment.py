@@ -0,0 +1,132 @@
+import numpy as np
+from typing import Dict, Tuple, Optional
+
+from .TronGridEnvironment import ParseTronGridConfig
+from .CyTronGrid import next_state_batch_inplace, relative_player_batch
+
+
+class TronGridBatchEnvironment:
+    """ Vectorized Tron for training. Holds a batch of games stacked along the first axis, steps all of them
+    in a single Cython call, and automatically resets games as soon as they finish.
+
+    Parameters
+    ----------
+    batch_size : int
+        Number of simultaneous games.
+    config : str
+        Same config string as TronGridEnvironment. Only fully observable games are supported.
+    seed : int
+        Optional seed for the starting positions.
+    """
+
+    # Integer actions index into TronGridEnvironment.move_array: forward, right, left
+    ACTION_TO_TURN = np.array([0, 1, -1], dtype=np.int64)
+
+    def __init__(self, batch_size: int, config: str = "", seed: Optional[int] = None):
+        board_size, num_players, observation_window, remove_on_death = ParseTronGridConfig(config)
+        if observation_window >= 0:
+            raise ValueError("Batched Tron only supports fully observable games.")
+
+        self.batch_size = batch_size
+        self.N = board_size
+        self.num_players = num_players
+        self.random = np.random.RandomState(seed)
+
+        self.boards = np.zeros((batch_size, board_size, board_size), dtype=np.int64)
+        self.heads = np.zeros((batch_size, num_players), dtype=np.int64)
+        self.directions = np.zeros((batch_size, num_players), dtype=np.int64)
+        self.deaths = np.zeros((batch_size, num_players), dtype=np.int64)
+
+        # Row p holds the player order as seen by player p, i.e. themselves first
+        self._rolled_idx = (np.arange(num_players)[None, :] + np.arange(num_players)[:, None]) % num_players
+
+        self.reset()
+
+    @property
+    def state(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """ The stacked (boards, heads, directions, deaths) of every game. """
+        return self.boards, self.heads, self.directions, self.deaths
+
+    def reset(self, mask: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+        """ Start new games.
+
+        Parameters
+        ----------
+        mask : np.ndarray
+            Optional boolean array of shape (B, ) selecting which games to reset. Resets every game by default.
+
+        Returns
+        -------
+        observations : Dict[str, np.ndarray]
+            See :py:func:`observations`.
+        """
+        games = np.arange(self.batch_size) if mask is None else np.flatnonzero(mask)
+        self._reset_games(games)
+        return self.observations()
+
+    def _reset_games(self, games: np.ndarray):
+        num_games = len(games)
+        if num_games == 0:
+            return
+
+        # Distinct random starting cells for every player of every game
+        heads = np.argsort(self.random.random_sample((num_games, self.N * self.N)), axis=1)[:, :self.num_players]
+
+        self.boards[games] = 0
+        self.heads[games] = heads
+        self.directions[games] = self.random.randint(0, 4, size=(num_games, self.num_players))
+        self.deaths[games] = 0
+
+        self.boards.reshape(self.batch_size, -1)[games[:, None], heads] = np.arange(1, self.num_players + 1)
+
+    def observations(self) -> Dict[str, np.ndarray]:
+        """ Observations for every player of every game, in the same format as
+        TronGridEnvironment.state_to_observation with two extra leading axes.
+
+        Returns
+        -------
+        observations : Dict[str, np.ndarray]
+            board has shape (B, P, N, N), heads, directions, and deaths have shape (B, P, P).
+            observations[name][b, p] is what player p sees in game b.
+        """
+        boards = np.empty((self.batch_size, self.num_players, self.N, self.N), dtype=np.int64)
+        relative_player_batch(self.boards, boards, self.num_players)
+
+        return {
+            "board": boards,
+            "heads": self.heads[:, self._rolled_idx],
+            "directions": self.directions[:, self._rolled_idx],
+            "deaths": self.deaths[:, self._rolled_idx]
+        }
+
+    def step(self, actions: np.ndarray) -> Tuple[Dict[str, np.ndarray], np.ndarray, np.ndarray, np.ndarray]:
+        """ Perform one move in every game. Finished games are reset before returning.
+
+        Parameters
+        ----------
+        actions : np.ndarray
+            Integer array of shape (B, P) with indices into ['forward', 'right', 'left'].
+            Actions of dead players are ignored.
+
+        Returns
+        -------
+        observations : Dict[str, np.ndarray]
+            Observations after the move. Games that just finished already show their new starting position.
+        rewards : np.ndarray
+            Float array of shape (B, P). 1 for every player still alive and -1 for every dead player.
+        terminals : np.ndarray
+            Boolean array of shape (B, ) marking the games that finished on this move.
+        winners : np.ndarray
+            Boolean array of shape (B, P) marking the surviving player of every finished game.
+        """
+        turns = self.ACTION_TO_TURN[actions]
+        next_state_batch_inplace(self.boards, self.heads, self.directions, self.deaths, turns)
+
+        dead = self.deaths > 0
+        rewards = np.where(dead, -1.0, 1.0)
+        terminals = dead.sum(axis=1) >= self.num_players - 1
+        winners = terminals[:, None] & ~dead
+
+        self._reset_games(np.flatnonzero(terminals))
+
+        return self.observations(), rewards, terminals, winners
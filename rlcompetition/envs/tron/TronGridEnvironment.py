@@ -1,5 +1,5 @@
 import numpy as np
-from typing import Dict, Tuple, List, Union
+from typing import Dict, Tuple, List, Union, Optional
 from dill import dumps, loads
 from time import time
 
@@ -95,6 +95,14 @@ class TronGridEnvironment(BaseEnvironment):
             "deaths": (self.num_players, )
         }
 
+    @property
+    def observation_dtypes(self) -> Optional[Dict[str, np.dtype]]:
+        # Partially observable boards are cut out around the head and do not have a fixed shape yet
+        if not self.fully_observable:
+            return None
+
+        return {"board": np.int64, "heads": np.int64, "directions": np.int64, "deaths": np.int64}
+
     def new_state(self, num_players: int = None) -> Tuple[object, List[int]]:
         num_players = self.num_players if num_players is None else num_players
         assert num_players == self.num_players, "Do not change the number of players from the game configuration."
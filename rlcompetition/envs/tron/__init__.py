@@ -1,2 +1,3 @@
 from .TronGridEnvironment import TronGridEnvironment
 from .TronGridClientEnvironment import TronGridClientEnvironment
+from .TronGridBatchEnvironment import TronGridBatchEnvironment
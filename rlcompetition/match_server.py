@@ -5,14 +5,17 @@ import dill
 import argparse
 
 from multiprocessing import Event
-from typing import Type, Dict, List, NamedTuple
+from typing import Type, Dict, List, NamedTuple, Optional
 from time import sleep
 
 from spacetime import Node, Dataframe
 
 from .data_model import ServerState, Player, _Observation, Observation
+from .observation_schema import ObservationSchema
 from .rl_logging import init_logging, get_logger
 from .FrameRateKeeper import FrameRateKeeper
+from .state_delta import StateDeltaEncoder
+from .transport import ServerTransport, SpacetimeServerTransport, ZmqServerTransport
 from .BaseEnvironment import BaseEnvironment
 from .config import get_environment, ENVIRONMENT_CLASSES
 from .util import log_params
@@ -28,38 +31,92 @@ class Timeout(NamedTuple):
     end: float = 10.0
 
 
+# In event driven mode, how long the server will sleep without any wakeups before checking the dataframe anyway.
+# This catches changes that do not come with a wakeup, such as players dropping out.
+EVENT_DRIVEN_FALLBACK_INTERVAL = 1.0
+
+
 def server_app(dataframe: Dataframe,
                env_class: Type[BaseEnvironment],
                observation_type: Type,
                args: dict,
                whitelist: list = None,
                ready_event: Event = None):
-    timeout = Timeout()
+    """ Spacetime node function that runs a single match on the node's dataframe. """
+
+    # In event driven mode, the server sleeps until a client tells it that new data has been pushed
+    # instead of checking the dataframe at a fixed rate. Realtime games always keep the fixed tick.
+    # The server also tells the clients when their turn has come so that they do not have to poll either.
+    # Agents on the same host can read their observations straight out of shared memory instead of
+    # pulling an observation dataframe, which skips serializing the arrays and the socket round trip.
+    transport = SpacetimeServerTransport(dataframe,
+                                         observation_type,
+                                         event_driven=args.get("event_driven", False) and not args["realtime"],
+                                         shared_memory_observations=args.get("shared_memory_observations", False))
+
+    return run_match(transport, env_class, args, whitelist, ready_event)
+
+
+def run_match(transport: ServerTransport,
+              env_class: Type[BaseEnvironment],
+              args: dict,
+              whitelist: list = None,
+              ready_event: Event = None):
+    """ Run a single match over any transport.
+
+    Returns
+    -------
+    The ranking of every player by name once the game is over, or an error code if it could not be played.
+    """
+    timeout = Timeout(start=args.get("start_timeout", Timeout().start))
 
     fr: FrameRateKeeper = FrameRateKeeper(max_frame_rate=args['tick_rate'])
 
-    # Keep track of each player and their associated observations
-    observation_dataframes: Dict[int, Dataframe] = {}
-    observations: Dict[int, _Observation] = {}
+    # Keep track of each player
     players: Dict[int, Player] = {}
 
-    # Function to help push all observations
-    def push_observations():
-        for df in observation_dataframes.values():
-            df.commit()
-
-    # Add the server state to the master dataframe
+    # Add the server state to the transport
     server_state = ServerState(env_class.__name__, args["config"], env_class.observation_names())
-    dataframe.add_one(ServerState, server_state)
-    dataframe.commit()
+    transport.start(server_state)
+
+    # Optionally send the true state as deltas against a periodic full snapshot instead of in full every move
+    delta_encoder: Optional[StateDeltaEncoder] = None
+    if args.get("delta_snapshot_interval", 0) > 0:
+        delta_encoder = StateDeltaEncoder(args["delta_snapshot_interval"])
+
+    # Function to update the true state for the clients, if enabled
+    def publish_state(state):
+        if args["observations_only"] or not env.serializable():
+            return
+
+        serialized_state = env.serialize_state(state)
+        if delta_encoder is None:
+            server_state.serialized_state = serialized_state
+            return
+
+        if delta_encoder.update(serialized_state):
+            server_state.state_snapshot = delta_encoder.snapshot
+            server_state.snapshot_sequence = delta_encoder.snapshot_sequence
+        server_state.state_delta = delta_encoder.delta
+        server_state.state_sequence = delta_encoder.sequence
+
+    # Function to wait until there may be new data from the players
+    def wait_for_update() -> bool:
+        if args["realtime"] or not transport.event_driven:
+            return fr.tick()
+
+        transport.wait(min(fr.time_until_timeout(), EVENT_DRIVEN_FALLBACK_INTERVAL))
+        return fr.timed_out()
 
     # Function to help clean up server if it ever needs to shutdown
     def close_server(message: str):
         server_state.terminal = True
         logger.error(message)
-        dataframe.commit()
+        transport.commit()
         sleep(5)
 
+        transport.close()
+
     # Create the environment and start the server
     env: BaseEnvironment = env_class(args["config"])
 
@@ -79,40 +136,38 @@ def server_app(dataframe: Dataframe,
     # -----------------------------------------------------------------------------------------------
     fr.start_timeout(timeout.connect)
     while len(players) < env.min_players:
-        if fr.tick():
+        if wait_for_update():
             close_server("Game could not find enough players. Shutting down game server.")
             return 1
 
-        dataframe.sync()
-        new_players: Dict[int, Player] = dict((p.pid, p) for p in dataframe.read_all(Player))
+        transport.commit()
+        transport.receive()
+        new_players: Dict[int, Player] = transport.players()
 
         # Any players that have connected by have not been acknowledged yet
+        rejected_players = []
         for new_id in new_players.keys() - players.keys():
             name = new_players[new_id].name
             auth_key = new_players[new_id].authentication_key
 
             if whitelist_used and auth_key not in whitelist_connected:
                 logger.info("Player tried to join with invalid authentication_key: {}".format(name))
-                dataframe.delete_one(Player, new_id)
+                transport.reject_player(new_id)
                 del new_players[new_id]
+                rejected_players.append(new_id)
                 continue
 
             if whitelist_used and whitelist_connected[auth_key]:
                 logger.info("Player tried to join twice with the same authentication_key: {}".format(name))
-                dataframe.delete_one(Player, new_id)
+                transport.reject_player(new_id)
                 del new_players[new_id]
+                rejected_players.append(new_id)
                 continue
 
             logger.info("New player joined with name: {}".format(name))
 
-            # Create new observation dataframe for the new player
-            obs_df = Dataframe("{}_observation".format(name), [observation_type])
-            obs = observation_type(new_id)
-            obs_df.add_one(observation_type, obs)
-
-            # Add the dataframes to the database
-            observation_dataframes[new_id] = obs_df
-            observations[new_id] = obs
+            # Create the observation storage for the new player
+            transport.add_observation(new_players[new_id])
             whitelist_connected[auth_key] = True
 
         # If any players that we have added before have dropped out
@@ -122,11 +177,14 @@ def server_app(dataframe: Dataframe,
             auth_key = players[remove_id].authentication_key
             whitelist_connected[auth_key] = False
 
-            del observations[remove_id]
-            del observation_dataframes[remove_id]
+            transport.remove_observation(remove_id)
 
         players = new_players
 
+        if rejected_players:
+            transport.commit()
+            transport.notify(rejected_players)
+
     # -----------------------------------------------------------------------------------------------
     # Create all of the player data and wait for the game to begin
     # -----------------------------------------------------------------------------------------------
@@ -135,32 +193,32 @@ def server_app(dataframe: Dataframe,
 
     # Create the initial state for the environment and push it if enabled
     state, player_turns = env.new_state(num_players=len(players))
-    if not args["observations_only"] and env.serializable():
-        server_state.serialized_state = env.serialize_state(state)
+    publish_state(state)
 
     # Set up each player
     for i, (pid, player) in enumerate(players.items()):
         # Add the initial observation to each player
-        observations[pid].set_observation(env.state_to_observation(state=state, player=i))
+        transport.set_observation(pid, env.state_to_observation(state=state, player=i))
 
-        # Finalize each player by giving it a player number and a port for the dataframe
-        player.finalize_player(number=i, observation_port=observation_dataframes[pid].details[1])
+        # Finalize each player by giving it a player number and whatever it needs to receive observations
+        transport.finalize_player(player, number=i)
         if i in player_turns:
             player.turn = True
 
     # Push all of the results to the player
     players_by_number: Dict[int, Player] = dict((p.number, p) for p in players.values())
-    push_observations()
-    dataframe.sync()
+    transport.commit()
+    transport.receive()
+    transport.notify(players.keys())
 
     # Wait for all players to be ready
     fr.start_timeout(timeout.start)
     while not all(player.ready_for_start for player in players.values()):
-        if fr.tick():
+        if wait_for_update():
             close_server("Players have dropped out between entering the game and starting the game.")
             return 2
 
-        dataframe.checkout()
+        transport.receive()
 
     # -----------------------------------------------------------------------------------------------
     # Primary game loop
@@ -168,20 +226,24 @@ def server_app(dataframe: Dataframe,
     logger.info("Game started...")
     terminal = False
     winners = None
-    dataframe.commit()
+    transport.commit()
 
     fr.start_timeout(timeout.move)
     while not terminal:
-        # Wait for a frame to tick
-        move_timeout = fr.tick()
-
-        # Get new data
-        dataframe.checkout()
-
         # Get the player dataframes of the players who's turn it is right now
         current_players: List[Player] = [p for p in players.values() if p.number in player_turns]
         current_actions: List[str] = []
 
+        # Wait for a frame to tick, or for a player to push their action in event driven mode.
+        # Actions that arrived while we were busy with the last move have already been received,
+        # so waiting for them to wake us up would only run into the fallback interval.
+        already_ready = (transport.event_driven and not args['realtime'] and
+                         all(p.ready_for_action_to_be_taken for p in current_players))
+        move_timeout = fr.timed_out() if already_ready else wait_for_update()
+
+        # Get new data
+        transport.receive()
+
         ready = args['realtime'] or move_timeout or all(p.ready_for_action_to_be_taken for p in current_players)
         if not ready:
             continue
@@ -203,8 +265,7 @@ def server_app(dataframe: Dataframe,
         )
 
         # Update true state if enabled
-        if not args["observations_only"] and env.serializable():
-            server_state.serialized_state = env.serialize_state(state)
+        publish_state(state)
 
         # Update the player data from the previous move.
         for player, reward in zip(current_players, rewards):
@@ -215,10 +276,14 @@ def server_app(dataframe: Dataframe,
         # Tell the new players that its their turn and provide observation
         for player_number in player_turns:
             player = players_by_number[player_number]
-            observations[player.pid].set_observation(env.state_to_observation(state=state, player=player_number))
+            transport.set_observation(player.pid, env.state_to_observation(state=state, player=player_number))
             player.turn = True
 
         if terminal:
+            # Draws may come without any winners
+            if winners is None:
+                winners = []
+
             server_state.terminal = True
             server_state.winners = dill.dumps(winners)
 
@@ -226,8 +291,8 @@ def server_app(dataframe: Dataframe,
                 players_by_number[player_number].winner = True
             logger.info("Player: {} won the game.".format(winners))
 
-        push_observations()
-        dataframe.commit()
+        transport.commit()
+        transport.notify(players.keys() if terminal else (players_by_number[number].pid for number in player_turns))
         fr.start_timeout(timeout.move)
 
     # -----------------------------------------------------------------------------------------------
@@ -236,8 +301,9 @@ def server_app(dataframe: Dataframe,
     for player in players.values():
         player.turn = True
 
-    dataframe.commit()
-    dataframe.push()
+    transport.commit()
+    transport.flush()
+    transport.notify(players.keys())
 
     # TODO| The code below attempts to ensure that the players have the final state of the game before the server quits.
     # TODO| However, an error is thrown when players disconnect during the checkout. If this snippet was removed,
@@ -246,8 +312,10 @@ def server_app(dataframe: Dataframe,
     # TODO| It would also be great if we could instead properly confirm that recipients got a message.
     fr.start_timeout(timeout.end)
     for player in players.values():
-        while not player.acknowledges_game_over and not fr.tick():
-            dataframe.checkout()
+        while not player.acknowledges_game_over and not wait_for_update():
+            transport.receive()
+
+    transport.close()
 
     rankings = env.compute_ranking(state, list(range(len(players))), winners)
     ranking_dict = {players_by_number[number].name: ranking for number, ranking in rankings.items()}
@@ -271,9 +339,21 @@ if __name__ == '__main__':
                         help="The max tick rate that the server will run on.")
     parser.add_argument("--realtime", "-r", action="store_true",
                         help="With this flag on, the server will not wait for all of the clients to respond.")
+    parser.add_argument("--event-driven", "-e", action="store_true",
+                        help="With this flag on, the server will wake up as soon as clients push new data instead of "
+                             "polling at the tick rate. Ignored for realtime games.")
     parser.add_argument("--observations-only", '-f', action='store_true',
                         help="With this flag on, the server will not push the true state of the game to the clients "
                              "along with observations")
+    parser.add_argument("--delta-snapshot-interval", "-d", type=int, default=0,
+                        help="Send the true state as byte deltas against a full snapshot that is resent at least "
+                             "every this many moves. 0 sends the full state after every move.")
+    parser.add_argument("--transport", type=str, default="spacetime", choices=["spacetime", "zmq"],
+                        help="How players, observations, and the server state are exchanged with the clients. "
+                             "Clients have to use the same transport.")
+    parser.add_argument("--shared-memory-observations", "-m", action="store_true",
+                        help="With this flag on, observations are written to shared memory instead of being pushed "
+                             "through observation dataframes. Only works if all agents run on the same host.")
 
     args = parser.parse_args()
     log_params(args)
@@ -286,9 +366,14 @@ if __name__ == '__main__':
             ENVIRONMENT_CLASSES.keys()
         ))
 
-    observation_type: Type[_Observation] = Observation(env_class.observation_names())
+    observation_type: Type[_Observation] = Observation(env_class.observation_names(),
+                                                       ObservationSchema.from_environment(env_class(args.config)))
 
     while True:
+        if args.transport == "zmq":
+            run_match(ZmqServerTransport(args.port), env_class, vars(args))
+            continue
+
         app = Node(server_app,
                    server_port=args.port,
                    Types=[Player, ServerState])
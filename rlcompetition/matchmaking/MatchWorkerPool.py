@@ -0,0 +1,229 @@
+""" Pool of worker processes that host the matches of a matchmaking server, so that CPU heavy games do not all
+share the GIL of the matchmaker with each other and with the gRPC handlers.
+
+Every worker runs a ZmqMatchHost on its own port and plays each of its matches in a thread. New matches go to
+the worker with the fewest running matches. Workers talk to the matchmaker over a pipe:
+
+    matchmaker -> worker    ("start", key, match_server_args, whitelist)
+                            ("stop",)
+    worker -> matchmaker    ("ready", port)
+                            ("started", key, match_id)
+                            ("finished", key, rankings)
+
+A worker that stops, for whatever reason, gets no new matches, and the matches it was running end without
+rankings. """
+
+import multiprocessing as mp
+
+from multiprocessing.connection import Connection, wait
+from queue import Queue
+from threading import Thread, Event, Lock
+from typing import Callable, Dict, List, Tuple, Type
+
+from ..match_server import run_match
+from ..BaseEnvironment import BaseEnvironment
+from ..transport import ZmqMatchHost, HostedMatchTransport
+from ..rl_logging import get_logger
+
+logger = get_logger()
+
+
+def _run_worker(connection: Connection, env_class: Type[BaseEnvironment], port: int):
+    """ Main function of a worker process. """
+    host = ZmqMatchHost(port)
+    host.start()
+
+    # Match threads report their results through the same pipe
+    send_lock = Lock()
+
+    def send(message: Tuple):
+        with send_lock:
+            connection.send(message)
+
+    def play(key: int, match: HostedMatchTransport, match_server_args: Dict, whitelist: List[str], ready: Event):
+        rankings = None
+        try:
+            rankings = run_match(match, env_class, match_server_args, whitelist, ready)
+        finally:
+            # A match that crashed still has to release its players
+            ready.set()
+            send(("finished", key, rankings))
+
+    send(("ready", host.port))
+
+    while True:
+        try:
+            message = connection.recv()
+        except EOFError:
+            # The matchmaker is gone
+            break
+
+        if message[0] == "stop":
+            break
+
+        _, key, match_server_args, whitelist = message
+        match = host.create_match()
+        ready = Event()
+        Thread(target=play, args=(key, match, match_server_args, whitelist, ready), daemon=True).start()
+
+        # Players may only be told about the match once it accepts them
+        ready.wait()
+        send(("started", key, match.match_id))
+
+    host.close()
+
+
+class MatchWorkerPool:
+    """ Worker processes that host matches.
+
+    Parameters
+    ----------
+    env_class : Type[BaseEnvironment]
+        Environment of every match.
+    starting_port : int
+        Worker i hosts its matches on port starting_port + i. With 0, every worker picks a random free port.
+    num_workers : int
+        Number of worker processes.
+    on_finished : Callable[[List[str], object], None]
+        Called with the usernames of the players and the rankings returned by run_match once a match is over.
+        Matches that are lost along with their worker are reported with None as their rankings.
+        Runs in the thread of the pool that listens to the workers.
+    """
+
+    # How long close waits for a worker to stop before terminating it, in seconds
+    _StopTimeout = 5.0
+
+    def __init__(self,
+                 env_class: Type[BaseEnvironment],
+                 starting_port: int,
+                 num_workers: int,
+                 on_finished: Callable[[List[str], object], None]):
+        self.on_finished = on_finished
+
+        # Workers are spawned rather than forked, since the matchmaker may already be running gRPC threads
+        ctx = mp.get_context("spawn")
+        self._connections: List[Connection] = []
+        self._processes: List[mp.Process] = []
+        for worker in range(num_workers):
+            connection, worker_connection = ctx.Pipe()
+            port = starting_port + worker if starting_port > 0 else 0
+            process = ctx.Process(target=_run_worker, args=(worker_connection, env_class, port), daemon=True)
+            process.start()
+            self._connections.append(connection)
+            self._processes.append(process)
+
+        self.ports: List[int] = [connection.recv()[1] for connection in self._connections]
+
+        # Number of matches running on each worker, and which workers are still running
+        self.loads: List[int] = [0] * num_workers
+        self.running: List[bool] = [True] * num_workers
+
+        self._lock = Lock()
+        self._closing = False
+        self._next_key = 0
+        self._matches: Dict[int, Tuple[int, List[str]]] = {}
+        self._started: Dict[int, Queue] = {}
+
+        self._listener = Thread(target=self._listen, daemon=True)
+        self._listener.start()
+
+    def start_match(self, match_server_args: Dict, usernames: List[str], whitelist: List[str]) -> Tuple[int, str]:
+        """ Start a match on the least loaded worker and wait until players can join it.
+
+        Returns
+        -------
+        The port of the worker and the id of the match.
+
+        Raises
+        ------
+        RuntimeError
+            If no worker is running, or the worker stopped before the match accepted players.
+            The match has then already been reported to on_finished.
+        """
+        with self._lock:
+            workers = [worker for worker, running in enumerate(self.running) if running]
+            if workers:
+                worker = min(workers, key=self.loads.__getitem__)
+                self.loads[worker] += 1
+
+                key = self._next_key
+                self._next_key += 1
+                self._matches[key] = (worker, usernames)
+                started = self._started[key] = Queue(maxsize=1)
+
+                try:
+                    self._connections[worker].send(("start", key, match_server_args, whitelist))
+                except OSError:
+                    pass  # The listener fails the match as soon as it sees that the worker has stopped
+
+        if not workers:
+            self.on_finished(usernames, None)
+            raise RuntimeError("No match workers are running.")
+
+        match_id = started.get()
+        if match_id is None:
+            raise RuntimeError("Match worker {} stopped before the match started.".format(worker))
+
+        return self.ports[worker], match_id
+
+    def _listen(self):
+        connections = {connection: worker for worker, connection in enumerate(self._connections)}
+
+        while connections:
+            for connection in wait(list(connections)):
+                try:
+                    message = connection.recv()
+                except (EOFError, OSError):
+                    worker = connections.pop(connection)
+                    if not self._closing:
+                        logger.error("Match worker {} has stopped.".format(worker))
+                    self._worker_stopped(worker)
+                    continue
+
+                if message[0] == "started":
+                    _, key, match_id = message
+                    with self._lock:
+                        started = self._started.pop(key)
+                    started.put(match_id)
+
+                elif message[0] == "finished":
+                    _, key, rankings = message
+                    with self._lock:
+                        worker, usernames = self._matches.pop(key)
+                        self.loads[worker] -= 1
+                    self.on_finished(usernames, rankings)
+
+    def _worker_stopped(self, worker: int):
+        """ Take a worker out of placement and fail every match it was running or about to start. """
+        with self._lock:
+            self.running[worker] = False
+            self.loads[worker] = 0
+
+            keys = [key for key, (match_worker, _) in self._matches.items() if match_worker == worker]
+            lost = [self._matches.pop(key)[1] for key in keys]
+            pending = [self._started.pop(key) for key in keys if key in self._started]
+
+        for started in pending:
+            started.put(None)
+
+        for usernames in lost:
+            self.on_finished(usernames, None)
+
+    def close(self):
+        """ Stop all workers. Matches that are still running are reported to on_finished without rankings. """
+        with self._lock:
+            self._closing = True
+            for worker, connection in enumerate(self._connections):
+                if self.running[worker]:
+                    try:
+                        connection.send(("stop",))
+                    except OSError:
+                        pass
+
+        for process in self._processes:
+            process.join(timeout=self._StopTimeout)
+            if process.is_alive():
+                process.terminate()
+
+        # Every pipe is closed now, so the listener ends once it has reported the last matches
+        self._listener.join()
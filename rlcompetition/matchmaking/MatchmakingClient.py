@@ -12,6 +12,7 @@ class GameResponse(NamedTuple):
     username: str
     token: str
     ranking: float
+    match_id: str = ""
 
 
 def hash_password(username: str, password: str):
@@ -47,6 +48,11 @@ def request_game(hostname: str, port: int, username: str, password: str = "") ->
             Your username again to verify.
         token: str
             Authentication string you will need to provide to connect to the match server
+        ranking: float
+            Your current ranking.
+        match_id: str
+            Id of your match if the server hosts all of its matches on the same port.
+            Connect to it with the zmq transport and this match id.
     """
     username = username.lower()
 
@@ -57,5 +63,7 @@ def request_game(hostname: str, port: int, username: str, password: str = "") ->
     if response.server == "FAIL":
         raise ConnectionError("Could not connect to matchmaking server. Error message: {}".format(response.response))
 
-    _, port = response.server.split(":")
-    return GameResponse(hostname, int(port), username, response.auth_key, response.ranking)
+    # Hosted matches are given as host:port/match_id
+    address, _, match_id = response.server.partition("/")
+    _, port = address.split(":")
+    return GameResponse(hostname, int(port), username, response.auth_key, response.ranking, match_id)
@@ -0,0 +1,129 @@
+""" Queue of players waiting for a match, grouped by skill.
+
+Players are kept in buckets of similar TrueSkill mean, and in the order they arrived. Matches are formed around
+the player who has waited the longest, with the closest players in rating found by walking outward through the
+neighbouring buckets. Every player has a skill window that widens the longer they wait, so that nobody is stuck
+in the queue when there are no players of their level around. Adding, removing, and forming a match only touch
+the buckets within the window, never the whole queue. """
+
+from collections import OrderedDict
+from math import floor
+from typing import Any, Dict, List, NamedTuple, Optional
+
+
+class QueuedPlayer(NamedTuple):
+    identity: bytes
+    request: Any
+    auth_key: str
+    assignment: Any
+    mu: float
+    sigma: float
+    queued_at: float
+
+
+class MatchmakingPool:
+    """ Players waiting for a match, bucketed by rating.
+
+    Parameters
+    ----------
+    players_per_game : int
+        Number of players in every match.
+    skill_window : float
+        How far apart in TrueSkill mean the players of a match may be, for players who just arrived.
+    skill_window_growth : float
+        How much the skill window of a player widens for every second they wait.
+    bucket_width : float
+        Range of TrueSkill means that share a bucket.
+    max_anchors : int
+        How many of the longest waiting players to try to build a match around, before giving up until
+        more players arrive or the skill windows have widened.
+    """
+
+    def __init__(self,
+                 players_per_game: int,
+                 skill_window: float = 2.0,
+                 skill_window_growth: float = 1.0,
+                 bucket_width: float = 1.0,
+                 max_anchors: int = 16):
+        self.players_per_game = players_per_game
+        self.skill_window = skill_window
+        self.skill_window_growth = skill_window_growth
+        self.bucket_width = bucket_width
+        self.max_anchors = max_anchors
+
+        # Every player is in the arrival queue and in the bucket of their rating
+        self._queue: "OrderedDict[bytes, QueuedPlayer]" = OrderedDict()
+        self._buckets: Dict[int, "OrderedDict[bytes, QueuedPlayer]"] = {}
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def __contains__(self, identity: bytes) -> bool:
+        return identity in self._queue
+
+    def _bucket(self, mu: float) -> int:
+        return floor(mu / self.bucket_width)
+
+    def add(self, player: QueuedPlayer):
+        self._queue[player.identity] = player
+        self._buckets.setdefault(self._bucket(player.mu), OrderedDict())[player.identity] = player
+
+    def remove(self, identity: bytes) -> Optional[QueuedPlayer]:
+        """ Remove a player from the pool, and return them if they were waiting. """
+        player = self._queue.pop(identity, None)
+        if player is None:
+            return None
+
+        bucket_index = self._bucket(player.mu)
+        bucket = self._buckets[bucket_index]
+        del bucket[identity]
+        if not bucket:
+            del self._buckets[bucket_index]
+
+        return player
+
+    def window(self, player: QueuedPlayer, now: float) -> float:
+        return self.skill_window + self.skill_window_growth * max(now - player.queued_at, 0.0)
+
+    def _opponents(self, anchor: QueuedPlayer, window: float) -> List[QueuedPlayer]:
+        """ Up to players_per_game - 1 players within the window of the anchor, the closest buckets first. """
+        needed = self.players_per_game - 1
+        opponents = []
+        if needed == 0:
+            return opponents
+
+        center = self._bucket(anchor.mu)
+        lowest = max(self._bucket(anchor.mu - window), min(self._buckets))
+        highest = min(self._bucket(anchor.mu + window), max(self._buckets))
+
+        for distance in range(max(center - lowest, highest - center) + 1):
+            for bucket_index in ((center,) if distance == 0 else (center - distance, center + distance)):
+                bucket = self._buckets.get(bucket_index)
+                if bucket is None:
+                    continue
+
+                for player in bucket.values():
+                    if player is not anchor and abs(player.mu - anchor.mu) <= window:
+                        opponents.append(player)
+                        if len(opponents) == needed:
+                            return opponents
+
+        return opponents
+
+    def form_match(self, now: float) -> Optional[List[QueuedPlayer]]:
+        """ Take the players of a new match out of the pool, or None if no match can be formed yet. """
+        if len(self._queue) < self.players_per_game:
+            return None
+
+        for tried, anchor in enumerate(self._queue.values()):
+            if tried == self.max_anchors:
+                break
+
+            opponents = self._opponents(anchor, self.window(anchor, now))
+            if len(opponents) == self.players_per_game - 1:
+                players = [anchor] + opponents
+                for player in players:
+                    self.remove(player.identity)
+                return players
+
+        return None
@@ -1,33 +1,45 @@
-import time
+import asyncio
 import secrets
 import grpc
 import argparse
-import zmq
 
 from queue import Queue, Empty
-from concurrent import futures
-from threading import Thread, Semaphore
-from multiprocessing import Event
-from typing import Type, Dict, List
-from collections import OrderedDict
+from threading import Thread, Semaphore, Event
+from multiprocessing import Event as ProcessEvent
+from time import time
+from typing import Callable, Type, Dict, List, Optional
 from spacetime import Node
 
-from ..match_server import server_app
+from ..match_server import server_app, run_match
 from ..data_model import ServerState, Player, Observation
+from ..observation_schema import ObservationSchema
 from ..config import get_environment, available_environments
 from ..BaseEnvironment import BaseEnvironment
-from ..util import is_port_in_use
+from ..transport import ServerTransport, ZmqMatchHost
 from ..rl_logging import init_logging, get_logger
 
 from .grpc_gen.server_pb2 import QuickMatchReply, QuickMatchRequest
 from .grpc_gen.server_pb2_grpc import MatchmakerServicer, add_MatchmakerServicer_to_server
 from .RankingDatabase import RankingDatabase
+from .MatchWorkerPool import MatchWorkerPool
+from .MatchmakingPool import MatchmakingPool, QueuedPlayer
+from .TournamentPool import TournamentPool
 
 
 logger = get_logger()
 
+# How many calls GRPC holds on to before the event loop gets to them. The defaults cancel calls
+# once a few thousand players try to queue up at the same time, such as after a restart.
+MAX_PENDING_REQUESTS = 100000
 
-def match_server_args_factory(tick_rate: int, realtime: bool, observations_only: bool, env_config_string: str):
+
+def match_server_args_factory(tick_rate: int,
+                              realtime: bool,
+                              observations_only: bool,
+                              env_config_string: str,
+                              event_driven: bool = False,
+                              delta_snapshot_interval: int = 0,
+                              shared_memory_observations: bool = False):
     """ Helper factory to make a argument dictionary for servers with varying ports """
 
     def match_server_args(port):
@@ -36,6 +48,9 @@ def match_server_args_factory(tick_rate: int, realtime: bool, observations_only:
             "port": port,
             "realtime": realtime,
             "observations_only": observations_only,
+            "event_driven": event_driven,
+            "delta_snapshot_interval": delta_snapshot_interval,
+            "shared_memory_observations": shared_memory_observations,
             "config": env_config_string
         }
         return arg_dict
@@ -44,134 +59,132 @@ def match_server_args_factory(tick_rate: int, realtime: bool, observations_only:
 
 
 class MatchMakingHandler(MatchmakerServicer):
-    """ GRPC connection handler.
+    """ Asynchronous GRPC connection handler.
+
+        Clients will connect to the server and call this function to request a match. A waiting client only holds
+        a future on the event loop, which the matchmaking thread resolves once they have been assigned a game. """
+
+    def __init__(self, matchmaker: "MatchmakingThread"):
+        self.matchmaker = matchmaker
+
+    async def GetMatch(self, request, context):
+        loop = asyncio.get_running_loop()
 
-        Clients will connect to the server and call this function to request a match. """
+        # Logging in goes through the database, so it is kept off the event loop
+        failure = await loop.run_in_executor(None, self.matchmaker.login, request)
+        if failure is not None:
+            return failure
 
-    def GetMatch(self, request, context):
         # Unique identity for this connection
         identity = request.username.encode() + secrets.token_bytes(8)
 
-        # Prepare ZeroMQ connection to get added to the queue
-        zmq_context = zmq.Context()
-        with zmq_context.socket(zmq.REQ) as socket:
-            socket.connect("ipc://matchmaker_requests.ipc")
-
-            # Wait until we are added to the queue
-            socket.send_multipart((identity, request.SerializeToString()))
-            status, response = socket.recv_multipart()
-            if status == b"FAIL":
-                return QuickMatchReply.FromString(response)
-
-        # Setup new socket to communicate with matchmaking master
-        with zmq_context.socket(zmq.DEALER) as socket:
-            socket.setsockopt(zmq.IDENTITY, identity)
-            socket.connect("ipc://matchmaker_responses.ipc")
-
-            # Wait until a game has been assigned
-            # Check every once in a while to see if the client is still alive
-            while True:
-                if not socket.poll(timeout=500):
-                    if not context.is_active():
-                        socket.send(request.username.encode())
-                        return None
-                else:
-                    break
+        # Wait until a game has been assigned. If the client hangs up first, the call gets cancelled.
+        assignment = loop.create_future()
+        self.matchmaker.enqueue(identity, request, assignment)
+        try:
+            return await assignment
+        except asyncio.CancelledError:
+            self.matchmaker.leave(identity, request.username)
+            raise
 
-            response = QuickMatchReply.FromString(socket.recv(flags=zmq.NOBLOCK))
-            return response
+
+def _resolve(assignment: asyncio.Future, response: QuickMatchReply):
+    if not assignment.done():
+        assignment.set_result(response)
 
 
 class MatchProcessJanitor(Thread):
     """ Simple thread to manage the lifetime of a game server. Will start the game server and
-        close it when the game is finished and release any resources it was holding. """
+        close it when the game is finished and release any resources it was holding.
+
+        Given a transport, the game runs right in this thread instead of in its own server node, which binds a free
+        port. Once ready is set, port is the port that players connect to, unless failed is set because the game
+        stopped before it accepted players. """
+
+    # How often to check that a server node is still alive while waiting for it to accept players, in seconds
+    _ReadyPoll = 0.5
 
     def __init__(self,
                  match_limit: Semaphore,
-                 ports_to_use_queue: Queue,
                  database: RankingDatabase,
                  env_class: Type[BaseEnvironment],
                  match_server_args: Dict,
                  player_list: List,
-                 whitelist: List = None):
+                 whitelist: List = None,
+                 transport: Optional[ServerTransport] = None,
+                 on_finished: Optional[Callable[[List[str], object], None]] = None):
         super().__init__()
         self.match_limit = match_limit
         self.match_server_args = match_server_args
         self.env_class = env_class
-        self.ports_to_use_queue = ports_to_use_queue
         self.database = database
         self.player_list = player_list
         self.whitelist = whitelist
+        self.transport = transport
+        self.on_finished = on_finished
+        self.port: Optional[int] = None
         self.ready = Event()
+        self.failed = False
 
     def run(self) -> None:
-        port = self.match_server_args['port']
-        observation_type = Observation(self.env_class.observation_names())
-
-        # App blocks until the server has ended
-        app = Node(server_app, server_port=port, Types=[Player, ServerState])
-        rankings = app.start(self.env_class, observation_type, self.match_server_args, self.whitelist, self.ready)
-        del app
-
-        # Update player information
-        if isinstance(rankings, dict):
-            self.database.update_ranking(rankings)
-
-        for user in self.player_list:
-            self.database.logoff(user)
-
-        # Cleanup
-        self.ports_to_use_queue.put(port)
-        self.match_limit.release()
-
-
-class MatchmakingLoginThread(Thread):
-    def __init__(self, connection_queue: Queue, database: RankingDatabase):
-        super().__init__()
-
-        self.queue: Queue = connection_queue
-        self.database: RankingDatabase = database
-        self.daemon = True
-
-        context = zmq.Context()
-        self.socket = context.socket(zmq.REP)
-        self.socket.bind("ipc://matchmaker_requests.ipc")
-        print("Matchmaker Connector thread listening...")
+        rankings = None
+        try:
+            if self.transport is not None:
+                self.port = self.match_server_args['port']
+                rankings = run_match(self.transport, self.env_class, self.match_server_args, self.whitelist,
+                                     self.ready)
+            else:
+                env = self.env_class(self.match_server_args["config"])
+                observation_type = Observation(self.env_class.observation_names(),
+                                               ObservationSchema.from_environment(env))
+
+                # The node binds a free port, which is known as soon as it has started
+                app = Node(server_app, server_port=0, Types=[Player, ServerState])
+                match_ready = ProcessEvent()
+                app.start_async(self.env_class, observation_type, self.match_server_args, self.whitelist,
+                                match_ready)
+                _, self.port = app.details
+
+                # Wait for the game to accept players, unless it stops before it ever does
+                while not match_ready.wait(self._ReadyPoll) and app.is_alive():
+                    pass
+
+                if match_ready.is_set():
+                    self.ready.set()
+
+                    # Blocks until the server has ended
+                    rankings = app.join()
+                else:
+                    # A node that died never sends back a return value, so there is nothing to join on
+                    logger.error("Match server on port {} stopped before it accepted players.".format(self.port))
+                del app
 
-    def __del__(self):
-        self.socket.close()
+        finally:
+            # Players are only sent to the server if it ever accepted them
+            self.failed = not self.ready.is_set()
+            self.ready.set()
 
-    def run(self):
-        while True:
-            identity, serialized_request = self.socket.recv_multipart()
-            request = QuickMatchRequest.FromString(serialized_request)
+            # Update player information
+            if isinstance(rankings, dict):
+                self.database.update_ranking(rankings)
 
-            # Login user and handle any errors
-            username, password = request.username, request.password
-            login_result = self.database.login(username, password)
+            if self.on_finished is not None:
+                self.on_finished(self.player_list, rankings)
 
-            if login_result == RankingDatabase.LoginResult.NoUser:
-                self.database.set(username, password)
-                self.database.login(username, password)
+            for user in self.player_list:
+                self.database.logoff(user)
 
-            elif login_result == RankingDatabase.LoginResult.LoginDuplicate:
-                response = QuickMatchReply(username=username, server="FAIL", auth_key="FAIL", ranking=0.0,
-                                           response="Failed to login: Cannot login twice at the same time.")
-                self.socket.send_multipart((b"FAIL", response.SerializeToString()))
-                continue
+            # Cleanup
+            self.match_limit.release()
 
-            elif login_result == RankingDatabase.LoginResult.LoginFail:
-                response = QuickMatchReply(username=username, server="FAIL", auth_key="FAIL", ranking=0.0,
-                                           response="Failed to login: Wrong password.")
-                self.socket.send_multipart((b"FAIL", response.SerializeToString()))
-                continue
 
-            # Add request to the queue and generate a token for them
-            self.queue.put((identity, request, secrets.token_hex(32)))
-            self.socket.send_multipart((b"SUCCESS", b""))
+class MatchmakingThread(Thread):
 
+    # How often the pool is checked for new matches when no new players arrive, in seconds
+    _PoolInterval = 0.5
 
-class MatchmakingThread(Thread):
+    # How often the statistics of the user cache are logged, in seconds
+    _StatisticsInterval = 60.0
 
     def __init__(self,
                  starting_port,
@@ -181,18 +194,23 @@ class MatchmakingThread(Thread):
                  tick_rate,
                  realtime,
                  observations_only,
-                 env_config_string):
+                 env_config_string,
+                 event_driven=False,
+                 delta_snapshot_interval=0,
+                 shared_memory_observations=False,
+                 host_matches=False,
+                 num_workers=0,
+                 skill_window=2.0,
+                 skill_window_growth=1.0,
+                 user_cache_size=10000,
+                 tournament=None,
+                 tournament_log=None):
         super().__init__()
 
         self.players_per_game = env_class(env_config_string).min_players
         self.env_class = env_class
         self.hostname = hostname
         self.daemon = True
-
-        # Prepare our context and sockets
-        context = zmq.Context()
-        self.socket = context.socket(zmq.ROUTER)
-        self.socket.bind("ipc://matchmaker_responses.ipc")
         logger.info("Matchmaker thread running")
 
         # Semaphore for tracking the total number of games running
@@ -202,99 +220,217 @@ class MatchmakingThread(Thread):
         self.create_match_server_args = match_server_args_factory(tick_rate=tick_rate,
                                                                   realtime=realtime,
                                                                   observations_only=observations_only,
-                                                                  env_config_string=env_config_string)
-
-        # Keep track of the ports we can use and iterate through them as we start new servers
-        self.ports_to_use = Queue()
-        max_port = starting_port + 2 * max_simultaneous_games
-        for port in range(starting_port, max_port):
-            if not is_port_in_use(port):
-                self.ports_to_use.put(port)
-            else:
-                logger.warn("Skipping port {}, already in use.".format(port))
-
-        if self.ports_to_use.qsize() < max_simultaneous_games:
-            raise OSError("Port range {} through {} does not have enough unallocated ports "
-                          "to hold {} simultaneous games".format(starting_port, max_port, max_simultaneous_games))
-
-        self.database = RankingDatabase("test.sqlite")
-
+                                                                  env_config_string=env_config_string,
+                                                                  event_driven=event_driven,
+                                                                  delta_snapshot_interval=delta_snapshot_interval,
+                                                                  shared_memory_observations=shared_memory_observations)
+
+        # Hosted matches all share the starting port and are routed by their match id. They either run in this
+        # process, or are spread over worker processes that each take a port from the starting port onward.
+        # Otherwise, every game starts its own server on a free port.
+        self.match_host: Optional[ZmqMatchHost] = None
+        self.worker_pool: Optional[MatchWorkerPool] = None
+        if num_workers > 0:
+            self.worker_pool = MatchWorkerPool(env_class, starting_port, num_workers, self.match_finished)
+        elif host_matches:
+            self.match_host = ZmqMatchHost(starting_port)
+
+        self.database = RankingDatabase("test.sqlite", cache_size=user_cache_size)
+
+        # Players waiting for a match, grouped by their rating. In a tournament, players wait for their next
+        # scheduled game instead.
+        self.tournament: Optional[TournamentPool] = None
+        if tournament is not None:
+            self.tournament = TournamentPool.from_file(self.players_per_game, tournament, tournament_log)
+            self.pool = self.tournament
+        else:
+            self.pool = MatchmakingPool(self.players_per_game, skill_window, skill_window_growth)
+
+        # Requests from clients who have logged in, and from clients who have hung up while waiting
         self.connection_queue = Queue()
-        self.connection_thread = MatchmakingLoginThread(self.connection_queue, self.database)
+        self.quit_queue = Queue()
 
     def start(self) -> None:
+        if self.match_host is not None:
+            self.match_host.start()
         super().start()
-        self.connection_thread.start()
 
-    def select_players(self, requests):
-        players = []
-        for _ in range(self.players_per_game):
-            identity, (request, auth) = requests.popitem(last=False)
-            players.append((identity, request, auth))
-        return players
+    def login(self, request: QuickMatchRequest) -> Optional[QuickMatchReply]:
+        """ Login the user of a request, or create them if they are new.
+
+        Returns
+        -------
+        The reply to send back if the login failed, None otherwise.
+        """
+        username, password = request.username, request.password
+
+        if self.tournament is not None:
+            rejection = self.tournament.accepts(username)
+            if rejection is not None:
+                return QuickMatchReply(username=username, server="FAIL", auth_key="FAIL", ranking=0.0,
+                                       response="Failed to login: {}".format(rejection))
+
+        login_result = self.database.login(username, password)
+
+        if login_result == RankingDatabase.LoginResult.NoUser:
+            self.database.set(username, password)
+            self.database.login(username, password)
+
+        elif login_result == RankingDatabase.LoginResult.LoginDuplicate:
+            return QuickMatchReply(username=username, server="FAIL", auth_key="FAIL", ranking=0.0,
+                                   response="Failed to login: Cannot login twice at the same time.")
+
+        elif login_result == RankingDatabase.LoginResult.LoginFail:
+            return QuickMatchReply(username=username, server="FAIL", auth_key="FAIL", ranking=0.0,
+                                   response="Failed to login: Wrong password.")
+
+        return None
+
+    def enqueue(self, identity: bytes, request: QuickMatchRequest, assignment: asyncio.Future):
+        """ Add a logged in client to the queue. The future gets their reply once they have been given a game. """
+        self.connection_queue.put((identity, request, secrets.token_hex(32), assignment))
+
+    def leave(self, identity: bytes, username: str):
+        """ Remove a client who stopped waiting from the queue. """
+        self.quit_queue.put((identity, username))
+
+    def match_finished(self, usernames: List[str], rankings):
+        """ Record the results of a match that ran on the worker pool. """
+        if isinstance(rankings, dict):
+            self.database.update_ranking(rankings)
+
+        self.tournament_finished(usernames, rankings)
+
+        for user in usernames:
+            self.database.logoff(user)
+
+        self.match_limit.release()
+
+    def tournament_finished(self, usernames: List[str], rankings):
+        """ Record the result of a game in the tournament, if one is running. """
+        if self.tournament is not None:
+            # A resumed tournament skips every game in its log, so the rating update has to be written first
+            if isinstance(rankings, dict):
+                self.database.flush()
+            self.tournament.match_finished(usernames, rankings)
+
+    def start_game(self, new_players: List[QueuedPlayer]):
+        """ Start a game server for the players of a new match and send them its coordinates. """
+        whitelist = [player.auth_key for player in new_players]
+        usernames = [player.request.username for player in new_players]
+
+        # Create the game server
+        if self.worker_pool is not None:
+            try:
+                match_port, match_id = self.worker_pool.start_match(self.create_match_server_args(port=0),
+                                                                    usernames, whitelist)
+            except RuntimeError as error:
+                # The pool has already logged the players off through match_finished
+                logger.error("Could not start a game for {}: {}".format(usernames, error))
+                self.fail_players(new_players, "Failed to start a game: {}".format(error))
+                return
+
+            match_server = '{}:{}/{}'.format(self.hostname, match_port, match_id)
+        else:
+            match_transport = None
+            match_port = 0
+            if self.match_host is not None:
+                match_transport = self.match_host.create_match()
+                match_port = self.match_host.port
+
+            match_server_args = self.create_match_server_args(port=match_port)
+            match_janitor = MatchProcessJanitor(match_limit=self.match_limit,
+                                                database=self.database,
+                                                env_class=self.env_class,
+                                                match_server_args=match_server_args,
+                                                player_list=usernames,
+                                                whitelist=whitelist,
+                                                transport=match_transport,
+                                                on_finished=self.tournament_finished)
+            match_janitor.start()
+            match_janitor.ready.wait()
+
+            if match_janitor.failed:
+                # The janitor has already logged the players off
+                self.fail_players(new_players, "Failed to start a game: the match server stopped.")
+                return
+
+            if match_transport is not None:
+                match_server = '{}:{}/{}'.format(self.hostname, match_janitor.port, match_transport.match_id)
+            else:
+                match_server = '{}:{}'.format(self.hostname, match_janitor.port)
+
+        # Send each player their assigned server.
+        for player in new_players:
+            response = QuickMatchReply(username=player.request.username,
+                                       server=match_server,
+                                       auth_key=player.auth_key,
+                                       ranking=player.mu,
+                                       response="")
+
+            player.assignment.get_loop().call_soon_threadsafe(_resolve, player.assignment, response)
+
+    def fail_players(self, players: List[QueuedPlayer], message: str):
+        """ Tell players who were taken out of the queue that they will not get a game. """
+        for player in players:
+            response = QuickMatchReply(username=player.request.username, server="FAIL", auth_key="FAIL",
+                                       ranking=0.0, response=message)
+            player.assignment.get_loop().call_soon_threadsafe(_resolve, player.assignment, response)
+
+    def log_statistics(self):
+        statistics = self.database.cache_statistics()
+        logger.info("User cache: {} of {} users | hit rate {:.1%} | {} hits, {} misses, {} evictions".format(
+            statistics.size, statistics.capacity, statistics.hit_rate,
+            statistics.hits, statistics.misses, statistics.evictions
+        ))
 
     def run(self) -> None:
-        requests = OrderedDict()
+        last_statistics = time()
 
         while True:
-            # Wait for any new requests, and always recheck request queue after 5 seconds
-            # This will be useful if we have a robust matchmaking system with rankings
+            if time() - last_statistics >= self._StatisticsInterval:
+                self.log_statistics()
+                last_statistics = time()
+
+            # Wait for any new requests. Skill windows widen while players wait, so the pool is checked again
+            # every once in a while even if nobody new has arrived.
+            arrivals = []
             try:
-                identity, request, authorization = self.connection_queue.get(timeout=5.0)
-                requests[identity] = (request, authorization)
+                arrivals.append(self.connection_queue.get(timeout=self._PoolInterval))
             except Empty:
                 pass
-            else:
-                while not self.connection_queue.empty():
-                    identity, request, authorization = self.connection_queue.get()
-                    requests[identity] = (request, authorization)
-
-            # Check if any clients have disconnected
-            while True:
-                try:
-                    quitting_identity, quitting_username = self.socket.recv_multipart(flags=zmq.NOBLOCK)
-                except zmq.ZMQError:
-                    break
-                else:
+            while not self.connection_queue.empty():
+                arrivals.append(self.connection_queue.get())
+
+            # Add the new players to the pool along with their current rating
+            if arrivals:
+                ratings = self.database.get_multi(*(request.username for _, request, _, _ in arrivals))
+                ratings = {name: (mu, sigma) for name, _, mu, sigma in ratings}
+
+                now = time()
+                for identity, request, authorization, assignment in arrivals:
+                    mu, sigma = ratings[request.username]
+                    self.pool.add(QueuedPlayer(identity, request, authorization, assignment, mu, sigma, now))
+
+            # Check if any clients have disconnected. Clients that hung up right as they were given a game
+            # are already out of the queue, and will be logged off once that game is over.
+            while not self.quit_queue.empty():
+                quitting_identity, quitting_username = self.quit_queue.get()
+                if self.pool.remove(quitting_identity) is not None:
                     logger.debug("{} has quit the matchmaking queue unexpectedly.".format(quitting_identity))
-                    self.database.logoff(quitting_username.decode())
-                    requests.pop(quitting_identity, 0)
+                    self.database.logoff(quitting_username)
 
-            # Once we have enough players for a game, start a game server and send the coordinates
-            if len(requests) >= self.players_per_game:
+            # Start a game for every match the pool can form
+            while len(self.pool) >= self.players_per_game:
                 # Limit the number of games so we dont overload server
                 self.match_limit.acquire()
 
-                # Select Players using arbitrary method
-                new_players = self.select_players(requests)
-                whitelist = [player[2] for player in new_players]
-                usernames = [player[1].username for player in new_players]
-
-                # Create the game server
-                match_port = self.ports_to_use.get()
-                match_server_args = self.create_match_server_args(port=match_port)
-                match_janitor = MatchProcessJanitor(match_limit=self.match_limit,
-                                                    ports_to_use_queue=self.ports_to_use,
-                                                    database=self.database,
-                                                    env_class=self.env_class,
-                                                    match_server_args=match_server_args,
-                                                    player_list=usernames,
-                                                    whitelist=whitelist)
-                match_janitor.start()
-
-                database_entries = self.database.get_multi(*usernames)
-                database_entries = {name: ranking for name, _, ranking, _ in database_entries}
-                match_janitor.ready.wait()
-
-                # Send each player their assigned server.
-                for identity, request, auth_key in new_players:
-                    response = QuickMatchReply(username=request.username,
-                                               server='{}:{}'.format(self.hostname, match_port),
-                                               auth_key=auth_key,
-                                               ranking=database_entries[request.username],
-                                               response="")
-
-                    self.socket.send_multipart((identity, response.SerializeToString()))
+                new_players = self.pool.form_match(time())
+                if new_players is None:
+                    self.match_limit.release()
+                    break
+
+                self.start_game(new_players)
 
 
 def serve(args):
@@ -307,22 +443,44 @@ def serve(args):
         tick_rate=args['tick_rate'],
         realtime=args['realtime'],
         observations_only=args['observations_only'],
-        env_config_string=args['config']
+        env_config_string=args['config'],
+        event_driven=args['event_driven'],
+        delta_snapshot_interval=args['delta_snapshot_interval'],
+        shared_memory_observations=args['shared_memory_observations'],
+        host_matches=args['host_matches'],
+        num_workers=args['workers'],
+        skill_window=args['skill_window'],
+        skill_window_growth=args['skill_window_growth'],
+        user_cache_size=args['user_cache_size'],
+        tournament=args['tournament'],
+        tournament_log=args['tournament_log']
     )
     matchmaker_thread.start()
 
-    # Start the GRPC callback server
-    server = grpc.server(futures.ThreadPoolExecutor())
-    add_MatchmakerServicer_to_server(MatchMakingHandler(), server)
-    server.add_insecure_port('[::]:{}'.format(args['matchmaking_port']))
-    server.start()
-    logger.info("Matchmaking server listening on grpc://{}:{}...".format(args['hostname'], args['matchmaking_port']))
     try:
-        one_day = 3600 * 24
-        while True:
-            time.sleep(one_day)
+        asyncio.run(serve_grpc(matchmaker_thread, args['hostname'], args['matchmaking_port']))
     except KeyboardInterrupt:
-        server.stop(0)
+        pass
+    finally:
+        # Matches still running on the workers are reported first, then every queued result is written out
+        if matchmaker_thread.worker_pool is not None:
+            matchmaker_thread.worker_pool.close()
+        matchmaker_thread.database.close()
+
+
+async def serve_grpc(matchmaker: MatchmakingThread, hostname: str, port: int):
+    """ Run the GRPC callback server on the current event loop until it is cancelled. """
+    server = grpc.aio.server(options=[("grpc.server.max_pending_requests", MAX_PENDING_REQUESTS),
+                                      ("grpc.server.max_pending_requests_hard_limit", MAX_PENDING_REQUESTS)])
+    add_MatchmakerServicer_to_server(MatchMakingHandler(matchmaker), server)
+    server.add_insecure_port('[::]:{}'.format(port))
+    await server.start()
+    logger.info("Matchmaking server listening on grpc://{}:{}...".format(hostname, port))
+
+    try:
+        await server.wait_for_termination()
+    finally:
+        await server.stop(0)
 
 
 def start_matchmaking_server(environment: str = 'test',
@@ -333,7 +491,17 @@ def start_matchmaking_server(environment: str = 'test',
                              tick_rate: int = 60,
                              realtime: bool = False,
                              observations_only: bool = False,
-                             config: str = ''):
+                             config: str = '',
+                             event_driven: bool = False,
+                             delta_snapshot_interval: int = 0,
+                             shared_memory_observations: bool = False,
+                             host_matches: bool = False,
+                             workers: int = 0,
+                             skill_window: float = 2.0,
+                             skill_window_growth: float = 1.0,
+                             user_cache_size: int = 10000,
+                             tournament: Optional[str] = None,
+                             tournament_log: Optional[str] = None):
     serve(locals())
 
 
@@ -346,8 +514,8 @@ def main():
     parser.add_argument("--matchmaking-port", type=int, default=50051,
                         help="Port to start matchmaking server on.")
     parser.add_argument("--game-port", type=int, default=21450,
-                        help="Port to start game servers on. Will use a range starting at this port to this port"
-                             "plus the number of games.")
+                        help="Port to host the games on with --host-matches, or the first port of the workers with "
+                             "--workers. 0 picks free ports. Otherwise, every game server binds a free port.")
     parser.add_argument("--max-games", "-m", type=int, default=1,
                         help="Number of games to run in parallel on this server.")
     parser.add_argument("--tick-rate", "-t", type=int, default=60,
@@ -359,6 +527,35 @@ def main():
                              "along with observations")
     parser.add_argument("--config", '-c', type=str, default="",
                         help="Config string that will be passed into the environment constructor.")
+    parser.add_argument("--event-driven", action="store_true",
+                        help="With this flag on, game servers will wake up as soon as clients push new data instead "
+                             "of polling at the tick rate. Ignored for realtime games.")
+    parser.add_argument("--delta-snapshot-interval", type=int, default=0,
+                        help="Send the true state as byte deltas against a full snapshot that is resent at least "
+                             "every this many moves. 0 sends the full state after every move.")
+    parser.add_argument("--shared-memory-observations", action="store_true",
+                        help="With this flag on, game servers write observations to shared memory instead of pushing "
+                             "them through observation dataframes. Only works if all agents run on this host.")
+    parser.add_argument("--host-matches", action="store_true",
+                        help="With this flag on, every game runs inside this process and shares the game port, "
+                             "instead of starting a server per game. Agents have to connect with the zmq transport "
+                             "and the match id they are given.")
+    parser.add_argument("--workers", "-w", type=int, default=0,
+                        help="Host the games on this many worker processes instead of in this process, each on its "
+                             "own port counting up from the game port. New games go to the least loaded worker. "
+                             "Implies --host-matches.")
+    parser.add_argument("--skill-window", type=float, default=2.0,
+                        help="How far apart in TrueSkill mean the players of a match may be when they start waiting.")
+    parser.add_argument("--skill-window-growth", type=float, default=1.0,
+                        help="How much the skill window of a player widens for every second they wait.")
+    parser.add_argument("--user-cache-size", type=int, default=10000,
+                        help="Most users to keep in memory in front of the ranking database.")
+    parser.add_argument("--tournament", type=str, default=None,
+                        help="Json file of a tournament to run instead of matching players by skill. Only the agents "
+                             "of the tournament are let in, and they are given the games they still have to play.")
+    parser.add_argument("--tournament-log", type=str, default=None,
+                        help="Where to record the progress of the tournament, and resume it from. Defaults to the "
+                             "tournament file with .progress added.")
 
     command_line_args = parser.parse_args()
 
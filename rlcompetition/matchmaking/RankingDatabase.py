@@ -1,9 +1,15 @@
 from enum import Enum
-from threading import Lock
+from pathlib import Path
+from queue import Queue
+from threading import Lock, Thread, Event, local
 from sqlite3 import connect as connect_database
 from trueskill import Rating, rate
-from typing import Dict
-from collections import ChainMap
+from typing import Dict, List, Tuple
+
+from .UserCache import UserCache, UserRecord, CacheStatistics
+from ..rl_logging import get_logger
+
+logger = get_logger()
 
 
 class LoginResult(Enum):
@@ -14,42 +20,118 @@ class LoginResult(Enum):
 
 
 class RankingDatabase:
+    """ Users and their TrueSkill ratings, stored in an sqlite database.
+
+    All writes are made by a single writer thread. Match results are queued and applied in the background, so
+    finishing a match never waits on the disk. Whatever has queued up while the writer was busy is written
+    together in one transaction. Lookups go through a cache of the most recently used users first, and otherwise
+    use read-only connections of their own, one per thread, which never wait on the writer.
+
+    Parameters
+    ----------
+    database_file : str
+        Path to the sqlite database. It is created if it does not exist yet.
+    cache_size : int
+        Most users to keep in memory.
+    """
     LoginResult = LoginResult
 
-    def __init__(self, database_file: str):
-        self.filepath: str = database_file
-        self.__db = connect_database(database_file, check_same_thread=False)
-        self.__db_lock = Lock()
-        self.__logged_in = set()
+    # Most queued writes that are applied in one transaction
+    _MaxBatch = 1024
 
-        cursor = self.__db.cursor()
-        tables = cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='userz'")
-        if len(tables.fetchall()) == 0:
-            cursor.execute("CREATE TABLE userz (username text, password text, mu real, sigma real)")
-            self.__db.commit()
+    # How often flush checks that the writer is still running, in seconds
+    _FlushPoll = 1.0
 
-    def __del__(self):
-        self.__db.close()
+    # Version of the database layout, kept in the user_version of the database
+    _SchemaVersion = 1
 
-    def get(self, username: str) -> (str, str, float, float):
-        cursor = self.__db.cursor()
-        with self.__db_lock:
-            result = cursor.execute("SELECT * FROM userz WHERE username=?", (username.lower(), ))
-            return result.fetchone()
+    def __init__(self, database_file: str, cache_size: int = 10000):
+        self.filepath: str = database_file
+        self.__logged_in = set()
+        self.__logged_in_lock = Lock()
 
-    def get_multi(self, *args) -> [(str, str, float, float)]:
-        cursor = self.__db.cursor()
-        with self.__db_lock:
-            query = "SELECT * FROM userz WHERE username IN ({})".format(', '.join('?' for _ in args))
-            result = cursor.execute(query, [name.lower() for name in args])
-            return result.fetchall()
+        self.__db = connect_database(database_file, check_same_thread=False)
+        self.__db.execute("PRAGMA journal_mode=WAL")
+        # With WAL, a crash may lose the last transactions but never corrupts the database
+        self.__db.execute("PRAGMA synchronous=NORMAL")
+        self.__migrate()
+
+        self.__readers = local()
+        self.__cache = UserCache(cache_size)
+
+        # Queued writes, each is either ("user", username, password), ("rate", match_ranking),
+        # ("flush", event) or None to stop the writer
+        self.__writes = Queue()
+        self.__writer = Thread(target=self.__write_loop, daemon=True)
+        self.__writer.start()
+
+    def __migrate(self):
+        """ Bring the layout of the database up to date. """
+        version = self.__db.execute("PRAGMA user_version").fetchone()[0]
+        if version == self._SchemaVersion:
+            return
+
+        # Version 0 had no key. If a user was ever added twice, the first one registered is kept.
+        self.__db.execute("BEGIN")
+        self.__db.execute("CREATE TABLE userz_new "
+                          "(username text PRIMARY KEY, password text, mu real, sigma real)")
+        tables = self.__db.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='userz'")
+        if len(tables.fetchall()) > 0:
+            self.__db.execute("INSERT OR IGNORE INTO userz_new SELECT * FROM userz ORDER BY rowid")
+            self.__db.execute("DROP TABLE userz")
+        self.__db.execute("ALTER TABLE userz_new RENAME TO userz")
+
+        self.__db.execute("PRAGMA user_version={}".format(self._SchemaVersion))
+        self.__db.commit()
+
+    def __reader(self):
+        """ Read-only connection of the calling thread. """
+        connection = getattr(self.__readers, "connection", None)
+        if connection is None:
+            connection = connect_database(Path(self.filepath).resolve().as_uri() + "?mode=ro", uri=True)
+            self.__readers.connection = connection
+        return connection
+
+    def close(self) -> None:
+        """ Write everything that was queued so far and stop the writer. """
+        if self.__writer.is_alive():
+            self.__writes.put(None)
+            self.__writer.join()
+            self.__db.close()
+
+    def flush(self) -> None:
+        """ Wait until everything that was queued so far has been written, or the database has been closed. """
+        written = Event()
+        self.__writes.put(("flush", written))
+        while not written.wait(self._FlushPoll):
+            if not self.__writer.is_alive():
+                return
+
+    def cache_statistics(self) -> CacheStatistics:
+        return self.__cache.statistics()
+
+    def get(self, username: str) -> UserRecord:
+        result = self.get_multi(username)
+        return result[0] if result else None
+
+    def get_multi(self, *args) -> [UserRecord]:
+        usernames = [name.lower() for name in args]
+        version = self.__cache.version
+        found, missing = self.__cache.get_multi(usernames)
+
+        if missing:
+            query = "SELECT * FROM userz WHERE username IN ({})".format(', '.join('?' for _ in missing))
+            records = self.__reader().execute(query, missing).fetchall()
+            self.__cache.fill(records, version)
+            found.update((record[0], record) for record in records)
+
+        return [found[name] for name in usernames if name in found]
 
     def set(self, username: str, password: str) -> None:
-        cursor = self.__db.cursor()
-        with self.__db_lock:
-            # Default values for ranking and ranking confidence from trueskill
-            cursor.execute("INSERT INTO userz VALUES (?, ?, ?, ?)", (username.lower(), password, 25, 25 / 3))
-            self.__db.commit()
+        self.__writes.put(("user", username.lower(), password))
+
+        # The new user has to be there by the time they log in
+        self.flush()
 
     def login(self, username: str, password: str) -> LoginResult:
         entry = self.get(username)
@@ -60,33 +142,80 @@ class RankingDatabase:
         if entry[1] != password:
             return LoginResult.LoginFail
 
-        if username in self.__logged_in:
-            return LoginResult.LoginDuplicate
-
-        with self.__db_lock:
+        with self.__logged_in_lock:
+            if username in self.__logged_in:
+                return LoginResult.LoginDuplicate
             self.__logged_in.add(username)
 
         return LoginResult.LoginSuccess
 
     def logoff(self, username: str) -> None:
-        with self.__db_lock:
+        with self.__logged_in_lock:
             self.__logged_in.remove(username)
 
     def update_ranking(self, match_ranking: Dict[str, int]):
+        """ Queue the results of a match. The ratings of the players are updated in the background. """
         # Transform the usernames to be lowercase for compatibility with database
-        match_ranking = {key.lower(): value for key, value in match_ranking.items()}
-
-        # Get the current trueskill ratings for each player
-        entries = self.get_multi(*match_ranking.keys())
-        old_trueskill_rankings = [{str(name): Rating(mu=mu, sigma=sigma)} for name, _, mu, sigma in entries]
-        ordered_match_rankings = [match_ranking[name] for name, _, _, _ in entries]
-
-        # Update rankings using trueskill algorithm
-        new_trueskill_rankings = rate(old_trueskill_rankings, ordered_match_rankings)
-
-        # Update database with new rankings
-        cursor = self.__db.cursor()
-        with self.__db_lock:
-            for name, rating in ChainMap(*new_trueskill_rankings).items():
-                cursor.execute("UPDATE userz SET mu=?, sigma=? WHERE username=?", (rating.mu, rating.sigma, name))
-            self.__db.commit()
+        self.__writes.put(("rate", {key.lower(): value for key, value in match_ranking.items()}))
+
+    def __write_loop(self):
+        while True:
+            # Wait for a write, then take whatever else has queued up in the meantime
+            batch = [self.__writes.get()]
+            while len(batch) < self._MaxBatch and not self.__writes.empty():
+                batch.append(self.__writes.get())
+
+            try:
+                self.__write_batch([write for write in batch if write is not None])
+            except Exception:
+                logger.exception("Failed to write {} queued changes to the ranking database.".format(len(batch)))
+                self.__db.rollback()
+            finally:
+                for write in batch:
+                    if write is not None and write[0] == "flush":
+                        write[1].set()
+
+            if None in batch:
+                return
+
+    def __write_batch(self, batch: List[Tuple]):
+        # Default values for ranking and ranking confidence from trueskill
+        new_users = [(username, password, 25, 25 / 3) for kind, username, password in
+                     (write for write in batch if write[0] == "user")]
+        matches = [write[1] for write in batch if write[0] == "rate"]
+        updated_records: List[UserRecord] = []
+
+        if new_users:
+            self.__db.executemany("INSERT OR IGNORE INTO userz VALUES (?, ?, ?, ?)", new_users)
+
+        if matches:
+            # Current trueskill ratings of everyone who played, updated match by match in the order they finished
+            names = list({name for match_ranking in matches for name in match_ranking})
+            query = "SELECT * FROM userz WHERE username IN ({})".format(', '.join('?' for _ in names))
+            records = {record[0]: record for record in self.__db.execute(query, names)}
+            ratings: Dict[str, Rating] = {name: Rating(mu=mu, sigma=sigma) for name, _, mu, sigma in records.values()}
+            updated = set()
+
+            for match_ranking in matches:
+                # Players that are not in the database are left out of the match, like they always were
+                players = [name for name in match_ranking if name in ratings]
+                if not players:
+                    continue
+
+                # Update rankings using trueskill algorithm
+                new_ratings = rate([{name: ratings[name]} for name in players],
+                                   [match_ranking[name] for name in players])
+                for new_rating in new_ratings:
+                    ratings.update(new_rating)
+                updated.update(players)
+
+            # Update database with new rankings
+            updated_records = [(name, records[name][1], ratings[name].mu, ratings[name].sigma) for name in updated]
+            self.__db.executemany("UPDATE userz SET mu=?, sigma=? WHERE username=?",
+                                  [(mu, sigma, name) for name, _, mu, sigma in updated_records])
+
+        self.__db.commit()
+
+        # Readers may only see the new ratings once they are in the database
+        if updated_records:
+            self.__cache.put(updated_records)
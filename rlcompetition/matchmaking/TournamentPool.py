@@ -0,0 +1,206 @@
+""" Queue of players for a tournament, where every game to play is known in advance.
+
+A tournament is given as a json file:
+
+    {
+        "agents": ["alice", "bob", "carol"],
+        "games_per_pairing": 10,
+        "pairings": [["alice", "bob"], ["alice", "carol"]]
+    }
+
+Without pairings, every combination of agents plays, a round robin. Agents take part by requesting games from
+the matchmaking server like always, and are given the next game they still have to play with other agents that are
+waiting. Agents with the most games left go first, since they decide how long the tournament takes.
+
+Every finished game is appended to a progress log, one json line per game. A tournament that is started again with
+the same log skips the games that were already played. Games that did not finish are played again. """
+
+import json
+import os
+
+from collections import OrderedDict
+from itertools import combinations
+from threading import Lock
+from typing import Dict, FrozenSet, List, Optional, Sequence, Set, Tuple
+
+from .MatchmakingPool import QueuedPlayer
+from ..rl_logging import get_logger
+
+logger = get_logger()
+
+
+class TournamentPool:
+    """ Players waiting for their next tournament game.
+
+    Parameters
+    ----------
+    players_per_game : int
+        Number of players in every game.
+    agents : Sequence[str]
+        Usernames of the agents in the tournament.
+    games_per_pairing : int
+        How many games every pairing plays.
+    pairings : Sequence[Sequence[str]], optional
+        Agents that play each other. Every combination of players_per_game agents by default.
+    progress_log : str, optional
+        File to record finished games in, and to resume from.
+    """
+
+    def __init__(self,
+                 players_per_game: int,
+                 agents: Sequence[str],
+                 games_per_pairing: int = 1,
+                 pairings: Optional[Sequence[Sequence[str]]] = None,
+                 progress_log: Optional[str] = None):
+        self.players_per_game = players_per_game
+        self.agents = [agent.lower() for agent in agents]
+
+        if pairings is None:
+            pairings = combinations(self.agents, players_per_game)
+
+        self.games: List[Tuple[str, ...]] = []
+        for pairing in pairings:
+            pairing = tuple(agent.lower() for agent in pairing)
+            if len(pairing) != players_per_game or len(set(pairing)) != players_per_game:
+                raise ValueError("Pairing {} does not have {} different agents.".format(pairing, players_per_game))
+            if any(agent not in self.agents for agent in pairing):
+                raise ValueError("Pairing {} has agents that are not in the tournament.".format(pairing))
+            self.games.extend([pairing] * games_per_pairing)
+
+        # Games that are left to play for every agent, and games that are being played by their players
+        self._remaining: Dict[str, Set[int]] = {agent: set() for agent in self.agents}
+        self._running: Dict[FrozenSet[str], int] = {}
+
+        finished = self._read_progress(progress_log) if progress_log is not None else set()
+        for game, players in enumerate(self.games):
+            if game not in finished:
+                for agent in players:
+                    self._remaining[agent].add(game)
+        self.played = len(finished)
+
+        self._progress_log = open(progress_log, "a") if progress_log is not None else None
+
+        # Waiting players by identity, and the identity of every waiting agent
+        self._queue: "OrderedDict[bytes, QueuedPlayer]" = OrderedDict()
+        self._waiting: Dict[str, bytes] = {}
+
+        # Games finish on other threads
+        self._lock = Lock()
+
+        logger.info("Tournament of {} agents: {} of {} games played.".format(
+            len(self.agents), self.played, len(self.games)))
+
+    @classmethod
+    def from_file(cls, players_per_game: int, tournament_file: str, progress_log: Optional[str] = None):
+        """ Load a tournament from a json file. The progress log defaults to the file name with .progress added. """
+        with open(tournament_file) as file:
+            tournament = json.load(file)
+
+        if progress_log is None:
+            progress_log = tournament_file + ".progress"
+
+        return cls(players_per_game,
+                   tournament["agents"],
+                   tournament.get("games_per_pairing", 1),
+                   tournament.get("pairings"),
+                   progress_log)
+
+    def _read_progress(self, progress_log: str) -> Set[int]:
+        finished = set()
+        if not os.path.exists(progress_log):
+            return finished
+
+        with open(progress_log) as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # The last line may be cut off by a crash
+                    continue
+
+                game = entry["game"]
+                if game >= len(self.games) or list(self.games[game]) != entry["players"]:
+                    raise ValueError("Progress log {} belongs to a different tournament.".format(progress_log))
+                finished.add(game)
+
+        return finished
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def __contains__(self, identity: bytes) -> bool:
+        return identity in self._queue
+
+    @property
+    def finished(self) -> bool:
+        return self.played == len(self.games)
+
+    def accepts(self, username: str) -> Optional[str]:
+        """ Why an agent cannot play in the tournament, or None if they can. """
+        with self._lock:
+            remaining = self._remaining.get(username.lower())
+            if remaining is None:
+                return "Not entered in the tournament."
+            if not remaining:
+                return "No games left to play in the tournament."
+            return None
+
+    def add(self, player: QueuedPlayer):
+        self._queue[player.identity] = player
+        self._waiting[player.request.username.lower()] = player.identity
+
+    def remove(self, identity: bytes) -> Optional[QueuedPlayer]:
+        """ Remove a player from the pool, and return them if they were waiting. """
+        player = self._queue.pop(identity, None)
+        if player is not None:
+            del self._waiting[player.request.username.lower()]
+        return player
+
+    def form_match(self, now: float) -> Optional[List[QueuedPlayer]]:
+        """ Take the players of the next game out of the pool, or None if no waiting agents have a game left. """
+        with self._lock:
+            # The agents with the most games left are the ones to keep busy
+            by_remaining = sorted(self._waiting, key=lambda agent: len(self._remaining[agent]), reverse=True)
+
+            for anchor in by_remaining:
+                best_game, best_remaining = None, -1
+                for game in self._remaining[anchor]:
+                    players = self.games[game]
+                    if all(agent in self._waiting for agent in players):
+                        remaining = sum(len(self._remaining[agent]) for agent in players)
+                        if remaining > best_remaining:
+                            best_game, best_remaining = game, remaining
+
+                if best_game is not None:
+                    players = self.games[best_game]
+                    for agent in players:
+                        self._remaining[agent].discard(best_game)
+                    self._running[frozenset(players)] = best_game
+                    return [self.remove(self._waiting[agent]) for agent in players]
+
+        return None
+
+    def match_finished(self, usernames: List[str], rankings):
+        """ Record the result of a tournament game. Games that did not finish are put back to be played again. """
+        players = [username.lower() for username in usernames]
+        with self._lock:
+            game = self._running.pop(frozenset(players), None)
+            if game is None:
+                return
+
+            if not isinstance(rankings, dict):
+                logger.warning("Tournament game {} between {} did not finish, it will be played again.".format(
+                    game, ", ".join(players)))
+                for agent in self.games[game]:
+                    self._remaining[agent].add(game)
+                return
+
+            self.played += 1
+            if self._progress_log is not None:
+                entry = {"game": game, "players": list(self.games[game]), "rankings": rankings}
+                self._progress_log.write(json.dumps(entry) + "\n")
+                self._progress_log.flush()
+
+        logger.info("Tournament: {} of {} games played.".format(self.played, len(self.games)))
+        if self.finished:
+            logger.info("Tournament finished.")
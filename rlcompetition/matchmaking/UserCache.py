@@ -0,0 +1,103 @@
+""" Bounded cache of user records, evicting the least recently used ones. """
+
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# Username, password, mu, sigma
+UserRecord = Tuple[str, bytes, float, float]
+
+
+class CacheStatistics(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+    capacity: int
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups > 0 else 0.0
+
+
+class UserCache:
+    """ Least recently used cache of user records, safe to use from any thread.
+
+    Records read from the database are added with fill, and records that were just written with put. A read may
+    race with a write of the same user, so fill only adds records if nothing has been put since the read started,
+    as told by the version it is given.
+
+    Parameters
+    ----------
+    capacity : int
+        Most records to keep. With 0, nothing is cached.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+
+        self._records: "OrderedDict[str, UserRecord]" = OrderedDict()
+        self._lock = Lock()
+
+        # Number of times records have been put into the cache
+        self.version = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def get_multi(self, usernames: Iterable[str]) -> Tuple[Dict[str, UserRecord], List[str]]:
+        """ Look up users in the cache.
+
+        Returns
+        -------
+        The records that were cached, by username, and the usernames that were not.
+        """
+        found = {}
+        missing = []
+        with self._lock:
+            for username in usernames:
+                record = self._records.get(username)
+                if record is None:
+                    missing.append(username)
+                else:
+                    self._records.move_to_end(username)
+                    found[username] = record
+
+            self.hits += len(found)
+            self.misses += len(missing)
+
+        return found, missing
+
+    def get(self, username: str) -> Optional[UserRecord]:
+        found, _ = self.get_multi((username, ))
+        return found.get(username)
+
+    def fill(self, records: Iterable[UserRecord], version: int):
+        """ Add records read from the database, unless anything was put after the read started at version. """
+        with self._lock:
+            if version == self.version:
+                self._add(records)
+
+    def put(self, records: Iterable[UserRecord]):
+        """ Add or replace records that were written to the database. """
+        with self._lock:
+            self.version += 1
+            self._add(records)
+
+    def _add(self, records: Iterable[UserRecord]):
+        for record in records:
+            self._records[record[0]] = record
+            self._records.move_to_end(record[0])
+
+        while len(self._records) > self.capacity:
+            self._records.popitem(last=False)
+            self.evictions += 1
+
+    def statistics(self) -> CacheStatistics:
+        with self._lock:
+            return CacheStatistics(self.hits, self.misses, self.evictions, len(self._records), self.capacity)
@@ -0,0 +1,117 @@
+""" Lightweight ZeroMQ side-channels used to wake up the game loops instead of polling at a fixed rate.
+
+The spacetime dataframes remain the source of truth for all of the game data. These sockets only carry
+empty "something changed" messages so that the receiver knows it is worth checking out a new version. """
+
+import zmq
+
+
+class WakeupListener:
+    """ Server side of the wakeup channel. Clients ping this socket right after pushing new data. """
+
+    def __init__(self):
+        self.socket = zmq.Context.instance().socket(zmq.PULL)
+        self.socket.setsockopt(zmq.LINGER, 0)
+        self.port: int = self.socket.bind_to_random_port("tcp://*")
+
+    def wait(self, timeout: float) -> bool:
+        """ Block until at least one client has pinged us or the timeout expires.
+
+        Parameters
+        ----------
+        timeout: float
+            Maximum number of seconds to wait.
+
+        Returns
+        -------
+        bool: Whether or not a client woke us up.
+        """
+        if not self.socket.poll(timeout=int(max(timeout, 0.0) * 1000)):
+            return False
+
+        # Drain every pending wakeup so that a burst of pushes only causes a single checkout
+        while True:
+            try:
+                self.socket.recv(flags=zmq.NOBLOCK)
+            except zmq.Again:
+                return True
+
+    def close(self):
+        self.socket.close()
+
+
+class WakeupSender:
+    """ Client side of the wakeup channel. """
+
+    def __init__(self, host: str, port: int):
+        self.socket = zmq.Context.instance().socket(zmq.PUSH)
+        self.socket.setsockopt(zmq.LINGER, 0)
+        self.socket.connect("tcp://{}:{}".format(host, port))
+
+    def notify(self):
+        """ Tell the server that we have pushed new data. Never blocks, the server falls back to polling anyway. """
+        try:
+            self.socket.send(b"", flags=zmq.NOBLOCK)
+        except zmq.Again:
+            pass
+
+    def close(self):
+        self.socket.close()
+
+
+def _topic(pid: int) -> bytes:
+    # Fixed width topics so that a subscription to one player can never prefix-match another player's id
+    return pid.to_bytes(8, "big")
+
+
+class TurnPublisher:
+    """ Server side of the turn notification channel. Tells specific players that their data has changed. """
+
+    def __init__(self):
+        self.socket = zmq.Context.instance().socket(zmq.PUB)
+        self.socket.setsockopt(zmq.LINGER, 0)
+        self.port: int = self.socket.bind_to_random_port("tcp://*")
+
+    def notify(self, pids):
+        """ Wake up every player in the given iterable of player ids. Call this after committing the change. """
+        for pid in pids:
+            self.socket.send(_topic(pid))
+
+    def close(self):
+        self.socket.close()
+
+
+class TurnSubscriber:
+    """ Client side of the turn notification channel. """
+
+    def __init__(self, host: str, port: int):
+        self.socket = zmq.Context.instance().socket(zmq.SUB)
+        self.socket.setsockopt(zmq.LINGER, 0)
+        self.socket.connect("tcp://{}:{}".format(host, port))
+
+    def subscribe(self, pid: int):
+        self.socket.setsockopt(zmq.SUBSCRIBE, _topic(pid))
+
+    def wait(self, timeout: float) -> bool:
+        """ Block until the server notifies us or the timeout expires.
+
+        Parameters
+        ----------
+        timeout: float
+            Maximum number of seconds to wait.
+
+        Returns
+        -------
+        bool: Whether or not the server notified us.
+        """
+        if not self.socket.poll(timeout=int(max(timeout, 0.0) * 1000)):
+            return False
+
+        while True:
+            try:
+                self.socket.recv(flags=zmq.NOBLOCK)
+            except zmq.Again:
+                return True
+
+    def close(self):
+        self.socket.close()
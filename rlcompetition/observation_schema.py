@@ -0,0 +1,143 @@
+""" Fixed shape, typed observation schemas.
+
+Environments that declare observation dtypes next to their observation shapes get their observations sent as
+raw contiguous buffers instead of pickled numpy objects. Every buffer starts with a small header holding the
+dtype and shape of the array, padded so that the data itself starts on an aligned offset. Since the schema is
+fixed for the whole game, clients check the headers once when they connect and afterwards decode observations
+straight from the known offsets. """
+
+import json
+
+import numpy as np
+
+from typing import Dict, Optional, Tuple
+
+from .BaseEnvironment import BaseEnvironment
+
+# Array data starts at a multiple of this many bytes into every encoded buffer
+_HEADER_ALIGNMENT = 16
+
+
+def encode_header(dtype: np.dtype, shape: Tuple[int, ...]) -> bytes:
+    """ Header for an encoded array: ndim (u1), length of the dtype string (u1), the dtype string,
+    every dimension (<u4), and zero padding up to the alignment. """
+    dtype_string = np.dtype(dtype).str.encode()
+    header = bytes((len(shape), len(dtype_string))) + dtype_string + np.array(shape, dtype="<u4").tobytes()
+    return header + bytes(-len(header) % _HEADER_ALIGNMENT)
+
+
+def decode_header(buffer: bytes) -> Tuple[np.dtype, Tuple[int, ...], int]:
+    """ Read the header of an encoded array.
+
+    Returns
+    -------
+    dtype : np.dtype
+    shape : Tuple[int, ...]
+    offset : int
+        Where the array data starts in the buffer.
+    """
+    ndim, dtype_length = buffer[0], buffer[1]
+    dtype = np.dtype(bytes(buffer[2:2 + dtype_length]).decode())
+    shape = tuple(np.frombuffer(buffer, dtype="<u4", count=ndim, offset=2 + dtype_length).tolist())
+    length = 2 + dtype_length + 4 * ndim
+    return dtype, shape, length + (-length % _HEADER_ALIGNMENT)
+
+
+class ObservationSchema:
+    """ Names, shapes, and dtypes of every array in an observation.
+
+    Parameters
+    ----------
+    shapes : Dict[str, tuple]
+        Maps each observation name to its numpy shape.
+    dtypes : Dict[str, np.dtype]
+        Maps each observation name to its numpy dtype.
+    """
+
+    def __init__(self, shapes: Dict[str, tuple], dtypes: Dict[str, np.dtype]):
+        if shapes.keys() != dtypes.keys():
+            raise ValueError("Observation shapes and dtypes must be given for the same names, got {} and {}."
+                             .format(sorted(shapes.keys()), sorted(dtypes.keys())))
+
+        self.shapes: Dict[str, Tuple[int, ...]] = {name: tuple(int(size) for size in shape)
+                                                   for name, shape in shapes.items()}
+        self.dtypes: Dict[str, np.dtype] = {name: np.dtype(dtype) for name, dtype in dtypes.items()}
+
+        self._headers: Dict[str, bytes] = {name: encode_header(self.dtypes[name], self.shapes[name])
+                                           for name in self.shapes}
+
+    @staticmethod
+    def from_environment(env: BaseEnvironment) -> Optional["ObservationSchema"]:
+        """ Schema declared by an environment, or None if it does not declare observation dtypes. """
+        dtypes = env.observation_dtypes
+        if dtypes is None:
+            return None
+
+        return ObservationSchema(env.observation_shape, dtypes)
+
+    def __eq__(self, other):
+        return isinstance(other, ObservationSchema) and self.shapes == other.shapes and self.dtypes == other.dtypes
+
+    @property
+    def names(self):
+        return self.shapes.keys()
+
+    def to_string(self) -> str:
+        """ JSON description of the schema, used to announce it to the clients. """
+        return json.dumps({name: [self.dtypes[name].str, list(self.shapes[name])] for name in self.shapes})
+
+    @staticmethod
+    def from_string(string: str) -> "ObservationSchema":
+        description = json.loads(string)
+        return ObservationSchema({name: shape for name, (_, shape) in description.items()},
+                                 {name: dtype for name, (dtype, _) in description.items()})
+
+    def encode(self, observation: Dict[str, np.ndarray]) -> Dict[str, bytes]:
+        """ Encode every array of an observation into a buffer with a header.
+
+        Raises
+        ------
+        ValueError
+            If an array does not have the declared shape or cannot be safely cast to the declared dtype.
+        """
+        encoded = {}
+        for name, value in observation.items():
+            value = np.asarray(value)
+            shape, dtype = self.shapes[name], self.dtypes[name]
+
+            if value.shape != shape:
+                raise ValueError("Observation {} should have shape {}, got {}.".format(name, shape, value.shape))
+            if not np.can_cast(value.dtype, dtype, casting="safe"):
+                raise ValueError("Observation {} should have dtype {}, got {}.".format(name, dtype, value.dtype))
+
+            encoded[name] = self._headers[name] + np.ascontiguousarray(value, dtype=dtype).tobytes()
+
+        return encoded
+
+    def decode(self, encoded: Dict[str, bytes]) -> Dict[str, np.ndarray]:
+        """ Read-only views of the arrays in encoded observation buffers. The headers are not checked,
+        see :py:meth:`validate`. """
+        return {name: np.frombuffer(buffer, dtype=self.dtypes[name], offset=len(self._headers[name]))
+                .reshape(self.shapes[name])
+                for name, buffer in encoded.items()}
+
+    def validate(self, encoded: Dict[str, bytes]):
+        """ Check that the headers and sizes of encoded observation buffers match the schema.
+
+        Raises
+        ------
+        ValueError
+            Describing the first mismatch.
+        """
+        for name, buffer in encoded.items():
+            if name not in self.shapes:
+                raise ValueError("Observation {} is not part of the schema.".format(name))
+
+            dtype, shape, offset = decode_header(buffer)
+            if dtype != self.dtypes[name] or shape != self.shapes[name]:
+                raise ValueError("Observation {} should be {} {}, got {} {}."
+                                 .format(name, self.shapes[name], self.dtypes[name], shape, dtype))
+
+            if len(buffer) - offset != dtype.itemsize * int(np.prod(shape)):
+                raise ValueError("Observation {} has {} bytes of data, expected {}."
+                                 .format(name, len(buffer) - offset, dtype.itemsize * int(np.prod(shape))))
@@ -0,0 +1,194 @@
+""" Shared memory observation transport for agents running on the same host as the match server.
+
+Each player's observation arrays live in one named shared memory segment instead of an observation dataframe.
+The segment starts with a sequence counter followed by a description of the array layout, so clients only
+need the segment name to attach. The counter works as a seqlock: the server makes it odd while it writes a new
+observation and even again once it is done. Clients copy the arrays out and start over if the counter was odd
+or has changed by the time the copy is done. """
+
+import json
+
+import numpy as np
+
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from threading import Lock
+from time import sleep, time
+from typing import Dict, Optional
+
+# Byte offset of the layout description, right after the uint64 sequence counter and its uint32 length
+_LAYOUT_OFFSET = 12
+
+# Arrays start at multiples of this many bytes
+_ALIGNMENT = 64
+
+# Held while the resource tracker is switched off for attaching, see _attach
+_tracker_lock = Lock()
+
+
+def _align(offset: int) -> int:
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def _attach(name: str) -> SharedMemory:
+    """ Attach to an existing segment without letting this process' resource tracker unlink it on exit. """
+    try:
+        return SharedMemory(name=name, track=False)
+    except TypeError:
+        pass
+
+    # Before Python 3.13, attaching always registers the segment with the resource tracker. Unregistering it
+    # afterwards is not an option, since processes forked from the server share its tracker.
+    with _tracker_lock:
+        register = resource_tracker.register
+        resource_tracker.register = lambda *args: None
+        try:
+            return SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+def _views(segment: SharedMemory, layout: Dict[str, list]) -> Dict[str, np.ndarray]:
+    return {name: np.ndarray(tuple(shape), dtype=np.dtype(dtype), buffer=segment.buf, offset=offset)
+            for name, (dtype, shape, offset) in layout.items()}
+
+
+class SharedObservationWriter:
+    """ Server side of a shared memory observation segment.
+
+    Parameters
+    ----------
+    observation : Dict[str, np.ndarray]
+        An example observation. Every later observation must have the same names, shapes, and dtypes.
+    """
+
+    def __init__(self, observation: Dict[str, np.ndarray]):
+        observation = {name: np.asarray(value) for name, value in observation.items()}
+
+        # The offsets depend on the length of the layout description, which in turn contains the offsets.
+        # Reserving a generous amount of room for the description up front avoids iterating on that.
+        layout_room = _align(_LAYOUT_OFFSET + 256 + 128 * len(observation))
+        layout = {}
+        offset = layout_room
+        for name, value in observation.items():
+            layout[name] = [value.dtype.str, list(value.shape), offset]
+            offset = _align(offset + value.nbytes)
+
+        encoded_layout = json.dumps(layout).encode()
+        if _LAYOUT_OFFSET + len(encoded_layout) > layout_room:
+            raise ValueError("Observation has too many arrays to describe in a shared memory segment.")
+
+        self.segment: SharedMemory = SharedMemory(create=True, size=max(offset, 1))
+        self.segment.buf[8:_LAYOUT_OFFSET] = np.uint32(len(encoded_layout)).tobytes()
+        self.segment.buf[_LAYOUT_OFFSET:_LAYOUT_OFFSET + len(encoded_layout)] = encoded_layout
+
+        self._sequence = np.ndarray((1,), dtype=np.uint64, buffer=self.segment.buf, offset=0)
+        self._sequence[0] = 0
+        self._arrays = _views(self.segment, layout)
+
+    @property
+    def name(self) -> str:
+        return self.segment.name
+
+    def set_observation(self, observation: Dict[str, np.ndarray]):
+        """ Copy a new observation into the segment. """
+        self._sequence[0] += 1
+        try:
+            for name, value in observation.items():
+                array = self._arrays[name]
+                value = np.asarray(value)
+                if value.shape != array.shape:
+                    raise ValueError("Observation {} changed shape from {} to {}.".format(name, array.shape, value.shape))
+                array[...] = value
+        finally:
+            self._sequence[0] += 1
+
+    def close(self):
+        """ Release and remove the segment. Clients that are still attached keep their mapping until they close. """
+        self._arrays = {}
+        self._sequence = None
+        try:
+            self.segment.close()
+        except BufferError:
+            pass
+        self.segment.unlink()
+
+
+class SharedObservationReader:
+    """ Client side of a shared memory observation segment.
+
+    Parameters
+    ----------
+    name : str
+        Name of the segment created by the server.
+    """
+
+    # How long to wait in between checks while the server is writing
+    _RetryInterval = 0.0001
+
+    def __init__(self, name: str):
+        self.segment: SharedMemory = _attach(name)
+
+        layout_length = int(np.frombuffer(self.segment.buf, dtype=np.uint32, count=1, offset=8)[0])
+        layout = json.loads(bytes(self.segment.buf[_LAYOUT_OFFSET:_LAYOUT_OFFSET + layout_length]))
+
+        self._sequence = np.ndarray((1,), dtype=np.uint64, buffer=self.segment.buf, offset=0)
+        self._arrays = _views(self.segment, layout)
+        for array in self._arrays.values():
+            array.flags.writeable = False
+
+    @property
+    def names(self):
+        return self._arrays.keys()
+
+    @property
+    def sequence(self) -> int:
+        """ Number of completed writes times two, odd while the server is in the middle of a write. """
+        return int(self._sequence[0])
+
+    def read(self, timeout: Optional[float] = 1.0) -> Dict[str, np.ndarray]:
+        """ Return a copy of the observation arrays that no write of the server overlapped with. """
+        start = time()
+        while True:
+            sequence = self._sequence[0]
+            if sequence % 2 == 0:
+                observation = {name: array.copy() for name, array in self._arrays.items()}
+                if self._sequence[0] == sequence:
+                    return observation
+
+            if timeout is not None and time() - start > timeout:
+                raise TimeoutError("Server did not finish writing the observation.")
+            sleep(self._RetryInterval)
+
+    def close(self):
+        self._arrays = {}
+        self._sequence = None
+        try:
+            self.segment.close()
+        except BufferError:  # Views into the segment are still alive, the mapping goes away with them
+            pass
+
+
+class SharedObservation:
+    """ Stand-in for a player's observation object in the match server that writes to shared memory.
+
+    The segment is created with the first observation, since that is when the array layout is known.
+    """
+
+    def __init__(self, pid: int):
+        self.pid: int = pid
+        self.writer: Optional[SharedObservationWriter] = None
+
+    @property
+    def segment_name(self) -> str:
+        return "" if self.writer is None else self.writer.name
+
+    def set_observation(self, observations: Dict[str, np.ndarray]):
+        if self.writer is None:
+            self.writer = SharedObservationWriter(observations)
+        self.writer.set_observation(observations)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
@@ -0,0 +1,110 @@
+""" Byte level deltas for the serialized game state.
+
+Instead of shipping the whole serialized state after every move, the server can send a full snapshot every
+once in a while and, in between, only the bytes that differ from that snapshot. Deltas are always taken
+against the last snapshot rather than the previous move, since spacetime only delivers the latest version
+of the server state and clients may never see some of the intermediate moves. """
+
+import numpy as np
+
+from typing import Optional
+
+# Changed bytes that are closer together than this are sent as one run, since every run costs 8 bytes of header.
+RUN_MERGE_GAP = 8
+
+_HEADER_TYPE = np.dtype("<u4")
+
+
+def encode_delta(base: bytes, target: bytes) -> Optional[bytes]:
+    """ Encode the bytes of target that differ from base.
+
+    Parameters
+    ----------
+    base : bytes
+        The snapshot the delta will be applied to.
+    target : bytes
+        The new serialized state.
+
+    Returns
+    -------
+    delta : Optional[bytes]
+        The run count, the run offsets, the run lengths, and then the new bytes of every run.
+        None if base and target have different lengths, in which case a new snapshot has to be sent.
+    """
+    if len(base) != len(target):
+        return None
+
+    changed = np.flatnonzero(np.frombuffer(base, dtype=np.uint8) != np.frombuffer(target, dtype=np.uint8))
+    if len(changed) == 0:
+        return b""
+
+    breaks = np.flatnonzero(np.diff(changed) > RUN_MERGE_GAP) + 1
+    starts = changed[np.concatenate(([0], breaks))]
+    ends = changed[np.concatenate((breaks - 1, [len(changed) - 1]))] + 1
+
+    header = np.concatenate(([len(starts)], starts, ends - starts)).astype(_HEADER_TYPE)
+    return header.tobytes() + b"".join(target[start:end] for start, end in zip(starts.tolist(), ends.tolist()))
+
+
+def apply_delta(base: bytes, delta: bytes) -> bytes:
+    """ Rebuild the serialized state that :py:func:`encode_delta` was given from its base and the delta. """
+    if len(delta) == 0:
+        return bytes(base)
+
+    num_runs = int(np.frombuffer(delta, dtype=_HEADER_TYPE, count=1)[0])
+    header = np.frombuffer(delta, dtype=_HEADER_TYPE, count=1 + 2 * num_runs)
+    starts, lengths = header[1:1 + num_runs].tolist(), header[1 + num_runs:].tolist()
+    payload = memoryview(delta)[header.nbytes:]
+
+    state = bytearray(base)
+    position = 0
+    for start, length in zip(starts, lengths):
+        state[start:start + length] = payload[position:position + length]
+        position += length
+
+    return bytes(state)
+
+
+class StateDeltaEncoder:
+    """ Server side bookkeeping for delta updates of the serialized state.
+
+    Parameters
+    ----------
+    snapshot_interval : int
+        A new full snapshot is sent at least every this many updates. A snapshot is also sent early whenever
+        the state changes length or the delta would be more than half the size of the full state.
+    """
+
+    def __init__(self, snapshot_interval: int):
+        if snapshot_interval < 1:
+            raise ValueError("snapshot_interval must be at least 1, got {}".format(snapshot_interval))
+
+        self.snapshot_interval: int = snapshot_interval
+        self.sequence: int = -1
+        self.snapshot_sequence: int = -1
+        self.snapshot: bytes = b""
+        self.delta: bytes = b""
+
+    def update(self, serialized_state: bytes) -> bool:
+        """ Record the next serialized state.
+
+        Returns
+        -------
+        new_snapshot : bool
+            Whether the snapshot was replaced. If so, both snapshot and delta have to be sent,
+            otherwise only the delta changed.
+        """
+        self.sequence += 1
+
+        delta = None
+        if self.sequence - self.snapshot_sequence < self.snapshot_interval:
+            delta = encode_delta(self.snapshot, serialized_state)
+
+        if delta is None or len(delta) > len(serialized_state) // 2:
+            self.snapshot = serialized_state
+            self.snapshot_sequence = self.sequence
+            self.delta = b""
+            return True
+
+        self.delta = delta
+        return False
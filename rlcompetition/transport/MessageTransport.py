@@ -0,0 +1,280 @@
+""" Shared logic for transports that mirror the players and the server state with explicit messages,
+instead of a synchronized object store like spacetime.
+
+Clients send their changes as updates tagged with an increasing sequence number. The server echoes the last
+sequence it has applied whenever it sends a player back, so that a client never overwrites its own newer
+changes with server data that was sent before the server saw them.
+
+Messages from the client to the server:
+    ("hello",)                               ask for the server state
+    ("join", pid, name, authentication_key)  add a player
+    ("update", sequence, {field: value})     change the fields in PLAYER_CLIENT_FIELDS
+    ("leave",)                               remove the player
+
+Messages from the server to a client:
+    ("update", {server state field: value}, sequence, {player field: value}, {name: array} or None)
+    ("rejected",)
+
+Every commit sends a single update to each player. Transports may leave out the fields that did not change
+since the last update they sent to that player.
+"""
+
+import numpy as np
+
+from abc import abstractmethod
+from time import time
+from typing import Any, Dict, Optional, Tuple
+
+from ..data_model import Player, ServerState
+from .Transport import ServerTransport, ClientTransport
+
+# Player fields that belong to the client. The server only ever resets ready_for_action_to_be_taken.
+PLAYER_CLIENT_FIELDS = ("action", "ready_for_action_to_be_taken", "ready_for_start", "acknowledges_game_over")
+
+# Player fields the server sends back
+PLAYER_FIELDS = ("number", "observation_port", "observation_segment", "action", "reward_from_last_turn", "turn",
+                 "ready_for_start", "ready_for_action_to_be_taken", "winner", "acknowledges_game_over")
+
+# Server state fields the server sends. The oid is left out, it is the primary key of the rtypes object and
+# setting it on the client moves the object in its table.
+SERVER_STATE_FIELDS = ("env_class_name", "env_config", "env_dimensions", "observation_schema", "terminal",
+                       "server_no_longer_joinable", "winners", "serialized_state", "wakeup_port", "notify_port",
+                       "state_sequence", "snapshot_sequence", "state_snapshot", "state_delta")
+
+
+def get_fields(obj, fields) -> Dict[str, Any]:
+    return {field: getattr(obj, field) for field in fields}
+
+
+def set_fields(obj, values: Dict[str, Any]):
+    for field, value in values.items():
+        setattr(obj, field, value)
+
+
+class MessageServerTransport(ServerTransport):
+    """ Server side of a message based transport. Subclasses only have to deliver the messages. """
+
+    def __init__(self):
+        self.server_state: Optional[ServerState] = None
+
+        self._players: Dict[int, Player] = {}
+        self._addresses: Dict[int, Any] = {}
+        self._pids: Dict[Any, int] = {}
+        self._sequences: Dict[int, int] = {}
+        self._observations: Dict[int, Dict[str, np.ndarray]] = {}
+
+    @property
+    def event_driven(self) -> bool:
+        return True
+
+    @abstractmethod
+    def _send(self, address, message: Tuple):
+        raise NotImplementedError
+
+    @abstractmethod
+    def _receive(self, timeout: float) -> Optional[Tuple[Any, Tuple]]:
+        """ Next (address, message) from any client, or None if nothing arrives within the timeout. """
+        raise NotImplementedError
+
+    def _handle(self, address, message: Tuple):
+        kind = message[0]
+
+        if kind == "hello":
+            self._send(address, ("update", get_fields(self.server_state, SERVER_STATE_FIELDS), 0, {}, None))
+
+        elif kind == "join":
+            _, _, name, authentication_key = message
+            if address in self._pids:
+                return
+
+            # The player keeps a pid of its own. Objects with the same pid share their rtypes row, and the client
+            # may well live in this same process.
+            player = Player(name=name, auth_key=authentication_key)
+            pid = player.pid
+            self._players[pid] = player
+            self._addresses[pid] = address
+            self._pids[address] = pid
+            self._sequences[pid] = 0
+
+        elif kind == "update":
+            _, sequence, values = message
+            pid = self._pids.get(address)
+            if pid is None or sequence <= self._sequences[pid]:
+                return
+
+            set_fields(self._players[pid], {field: values[field] for field in PLAYER_CLIENT_FIELDS if field in values})
+            self._sequences[pid] = sequence
+
+        elif kind == "leave":
+            pid = self._pids.get(address)
+            if pid is not None:
+                self._drop(pid)
+
+    def _drop(self, pid: int):
+        del self._pids[self._addresses.pop(pid)]
+        del self._players[pid]
+        del self._sequences[pid]
+        self._observations.pop(pid, None)
+
+    def start(self, server_state: ServerState):
+        self.server_state = server_state
+
+    def receive(self):
+        while True:
+            received = self._receive(0)
+            if received is None:
+                return
+            self._handle(*received)
+
+    def players(self) -> Dict[int, Player]:
+        return dict(self._players)
+
+    def reject_player(self, pid: int):
+        self._send(self._addresses[pid], ("rejected",))
+        self._drop(pid)
+
+    def add_observation(self, player: Player):
+        pass
+
+    def remove_observation(self, pid: int):
+        self._observations.pop(pid, None)
+
+    def set_observation(self, pid: int, observation: Dict[str, np.ndarray]):
+        self._observations[pid] = observation
+
+    def finalize_player(self, player: Player, number: int):
+        player.finalize_player(number=number, observation_port=-1)
+
+    def _send_update(self, pid: int, server_state: Dict[str, Any], player: Dict[str, Any],
+                     observation: Optional[Dict[str, np.ndarray]]):
+        self._send(self._addresses[pid], ("update", server_state, self._sequences[pid], player, observation))
+
+    def commit(self):
+        server_state = get_fields(self.server_state, SERVER_STATE_FIELDS)
+
+        for pid, player in self._players.items():
+            self._send_update(pid, server_state, get_fields(player, PLAYER_FIELDS), self._observations.pop(pid, None))
+
+    def wait(self, timeout: float) -> bool:
+        received = self._receive(timeout)
+        if received is None:
+            return False
+
+        self._handle(*received)
+        return True
+
+
+class MessageClientTransport(ClientTransport):
+    """ Client side of a message based transport. Subclasses only have to deliver the messages.
+
+    Subclasses have to call :py:meth:`_request_server_state` once they can send messages.
+    """
+
+    # How long to wait for the server to answer our first message
+    _ConnectTimeout = 30.0
+
+    def __init__(self):
+        self.pull_count = 0
+
+        self._server_state: ServerState = ServerState("", "", ())
+        self._player: Optional[Player] = None
+        self._rejected: bool = False
+        self._sequence: int = 0
+        self._observation: Optional[Dict[str, np.ndarray]] = None
+        self._connected_observations: bool = False
+
+    @abstractmethod
+    def _send(self, message: Tuple):
+        raise NotImplementedError
+
+    @abstractmethod
+    def _receive(self, timeout: float) -> Optional[Tuple]:
+        """ Next message from the server, or None if nothing arrives within the timeout. """
+        raise NotImplementedError
+
+    def _request_server_state(self):
+        self._send(("hello",))
+
+        start = time()
+        while not self._server_state.env_class_name:
+            remaining = self._ConnectTimeout - (time() - start)
+            message = self._receive(remaining) if remaining > 0 else None
+            if message is None:
+                raise ConnectionError("Server did not answer.")
+            self._handle(message)
+
+            if self._rejected:
+                raise ConnectionError("Server does not know this match.")
+
+    def _handle(self, message: Tuple):
+        kind = message[0]
+
+        if kind == "update":
+            _, server_state, sequence, values, observation = message
+            set_fields(self._server_state, server_state)
+
+            if observation is not None:
+                self._observation = observation
+
+            if self._player is not None:
+                # Fields we own are only taken from the server once it has seen our latest update
+                if sequence < self._sequence:
+                    values = {field: value for field, value in values.items() if field not in PLAYER_CLIENT_FIELDS}
+                set_fields(self._player, values)
+
+        elif kind == "rejected":
+            self._rejected = True
+
+    def _drain(self):
+        while True:
+            message = self._receive(0)
+            if message is None:
+                return
+            self._handle(message)
+
+    @property
+    def server_state(self) -> ServerState:
+        return self._server_state
+
+    @property
+    def event_driven(self) -> bool:
+        return True
+
+    def join(self, player: Player):
+        self._player = player
+        self._send(("join", player.pid, player.name, player.authentication_key))
+
+    @property
+    def player(self) -> Optional[Player]:
+        return None if self._rejected else self._player
+
+    def connect_observations(self):
+        # Observations arrive along with our player, so the first one is already here.
+        # The server sends plain arrays and announces no schema, so there is nothing to check them against.
+        self._connected_observations = True
+
+    def observation(self) -> Optional[Dict[str, np.ndarray]]:
+        return self._observation if self._connected_observations else None
+
+    def pull_players(self):
+        self._drain()
+        self.pull_count += 1
+
+    def pull_observations(self):
+        pass
+
+    def push(self):
+        self._sequence += 1
+        self._send(("update", self._sequence, get_fields(self._player, PLAYER_CLIENT_FIELDS)))
+
+    def wait(self, timeout: float) -> bool:
+        message = self._receive(timeout)
+        if message is None:
+            return False
+
+        self._handle(message)
+        return True
+
+    def close(self):
+        if self._player is not None and not self._rejected:
+            self._send(("leave",))
@@ -0,0 +1,58 @@
+""" In-process transport for running the match server and its clients as threads of the same process.
+Messages are Python objects passed through queues, so observations are handed over without any copies. """
+
+from itertools import count
+from queue import Queue, Empty
+from typing import Any, Dict, Optional, Tuple
+
+from .MessageTransport import MessageServerTransport, MessageClientTransport
+
+
+def _get(queue: Queue, timeout: float):
+    try:
+        if timeout > 0:
+            return queue.get(timeout=timeout)
+        return queue.get_nowait()
+    except Empty:
+        return None
+
+
+class QueueServerTransport(MessageServerTransport):
+    """ Server side of the in-process transport. Clients are created with :py:meth:`connect`. """
+
+    def __init__(self):
+        super().__init__()
+        self._inbox: Queue = Queue()
+        self._outboxes: Dict[int, Queue] = {}
+        self._next_address = count()
+
+    def connect(self) -> "QueueClientTransport":
+        """ Create a new client. The server has to be running its game loop, since the client
+        immediately asks for the server state. """
+        address = next(self._next_address)
+        outbox = Queue()
+        self._outboxes[address] = outbox
+        return QueueClientTransport(self._inbox, address, outbox)
+
+    def _send(self, address, message: Tuple):
+        self._outboxes[address].put(message)
+
+    def _receive(self, timeout: float) -> Optional[Tuple[Any, Tuple]]:
+        return _get(self._inbox, timeout)
+
+
+class QueueClientTransport(MessageClientTransport):
+    """ Client side of the in-process transport, see :py:meth:`QueueServerTransport.connect`. """
+
+    def __init__(self, server_inbox: Queue, address: int, inbox: Queue):
+        super().__init__()
+        self._server_inbox: Queue = server_inbox
+        self._address: int = address
+        self._inbox: Queue = inbox
+        self._request_server_state()
+
+    def _send(self, message: Tuple):
+        self._server_inbox.put((self._address, message))
+
+    def _receive(self, timeout: float) -> Optional[Tuple]:
+        return _get(self._inbox, timeout)
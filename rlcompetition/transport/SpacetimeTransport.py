@@ -0,0 +1,253 @@
+""" Transport on top of spacetime dataframes. The server node holds the server state and the players, every
+player gets their own observation dataframe, and the optional ZeroMQ side-channels from notifications.py
+wake up the other end in event driven mode. Observations can also be placed in shared memory instead. """
+
+import numpy as np
+
+from typing import Dict, Optional, Type
+
+from spacetime import Dataframe
+
+from ..data_model import Player, ServerState, _Observation
+from ..notifications import WakeupListener, TurnPublisher, WakeupSender, TurnSubscriber
+from ..observation_schema import ObservationSchema
+from ..shared_observations import SharedObservation, SharedObservationReader
+from .Transport import ServerTransport, ClientTransport
+
+
+class SpacetimeServerTransport(ServerTransport):
+    """ Server side of the spacetime transport.
+
+    Parameters
+    ----------
+    dataframe : Dataframe
+        The dataframe of the server node.
+    observation_type : Type[_Observation]
+        Observation class created by data_model.Observation.
+    event_driven : bool
+        Open the wakeup and turn notification side-channels.
+    shared_memory_observations : bool
+        Write observations to shared memory instead of observation dataframes.
+        Only works if all agents run on the same host.
+    """
+
+    def __init__(self,
+                 dataframe: Dataframe,
+                 observation_type: Type[_Observation],
+                 event_driven: bool = False,
+                 shared_memory_observations: bool = False):
+        self.dataframe: Dataframe = dataframe
+        self.observation_type: Type[_Observation] = observation_type
+        self.shared_memory_observations: bool = shared_memory_observations
+
+        # Keep track of each player's observations
+        self.observation_dataframes: Dict[int, Dataframe] = {}
+        self.observations: Dict[int, _Observation] = {}
+
+        self.wakeup: Optional[WakeupListener] = None
+        self.turn_publisher: Optional[TurnPublisher] = None
+        if event_driven:
+            self.wakeup = WakeupListener()
+            self.turn_publisher = TurnPublisher()
+
+    @property
+    def event_driven(self) -> bool:
+        return self.wakeup is not None
+
+    def start(self, server_state: ServerState):
+        schema: Optional[ObservationSchema] = getattr(self.observation_type, "schema", None)
+        if schema is not None and not self.shared_memory_observations:
+            server_state.observation_schema = schema.to_string()
+
+        if self.wakeup is not None:
+            server_state.wakeup_port = self.wakeup.port
+            server_state.notify_port = self.turn_publisher.port
+
+        self.dataframe.add_one(ServerState, server_state)
+        self.dataframe.commit()
+
+    def receive(self):
+        self.dataframe.checkout()
+
+    def players(self) -> Dict[int, Player]:
+        return dict((p.pid, p) for p in self.dataframe.read_all(Player))
+
+    def reject_player(self, pid: int):
+        self.dataframe.delete_one(Player, pid)
+
+    def add_observation(self, player: Player):
+        # Shared memory segments are created once the first observation is set, since that is when
+        # the array layout is known
+        if self.shared_memory_observations:
+            self.observations[player.pid] = SharedObservation(player.pid)
+            return
+
+        obs_df = Dataframe("{}_observation".format(player.name), [self.observation_type])
+        obs = self.observation_type(player.pid)
+        obs_df.add_one(self.observation_type, obs)
+
+        self.observation_dataframes[player.pid] = obs_df
+        self.observations[player.pid] = obs
+
+    def remove_observation(self, pid: int):
+        if self.shared_memory_observations:
+            self.observations[pid].close()
+        else:
+            del self.observation_dataframes[pid]
+        del self.observations[pid]
+
+    def set_observation(self, pid: int, observation: Dict[str, np.ndarray]):
+        self.observations[pid].set_observation(observation)
+
+    def finalize_player(self, player: Player, number: int):
+        if self.shared_memory_observations:
+            player.finalize_player(number=number, observation_port=-1,
+                                   observation_segment=self.observations[player.pid].segment_name)
+        else:
+            player.finalize_player(number=number, observation_port=self.observation_dataframes[player.pid].details[1])
+
+    def commit(self):
+        for df in self.observation_dataframes.values():
+            df.commit()
+        self.dataframe.commit()
+
+    def flush(self):
+        self.dataframe.push()
+
+    def wait(self, timeout: float) -> bool:
+        return self.wakeup.wait(timeout)
+
+    def notify(self, pids):
+        if self.turn_publisher is not None:
+            self.turn_publisher.notify(pids)
+
+    def close(self):
+        if self.shared_memory_observations:
+            for obs in self.observations.values():
+                obs.close()
+
+        if self.wakeup is not None:
+            self.wakeup.close()
+            self.turn_publisher.close()
+
+
+class SpacetimeClientTransport(ClientTransport):
+    """ Client side of the spacetime transport.
+
+    Parameters
+    ----------
+    dataframe : Dataframe
+        The dataframe of the client node, connected to the server node.
+    observation_class : Type[_Observation]
+        Observation class created by data_model.Observation, with the schema announced by the server.
+    host : str
+        Host of the server, used to connect to the observation dataframe and the side-channels.
+    """
+
+    def __init__(self, dataframe: Dataframe, observation_class: Type[_Observation], host: str):
+        self.dataframe: Dataframe = dataframe
+        self.observation_df: Optional[Dataframe] = None
+        self.observation_class: Type[_Observation] = observation_class
+        self.host: str = host
+        self.pull_count = 0
+
+        self._server_state: ServerState = self.dataframe.read_all(ServerState)[0]
+        self._player: Optional[Player] = None
+        self._observation: Optional[_Observation] = None
+        self._shared_observation: Optional[SharedObservationReader] = None
+        self._schema: Optional[ObservationSchema] = getattr(observation_class, "schema", None)
+
+        # Event driven servers want to be told whenever we push new data
+        self._wakeup: Optional[WakeupSender] = None
+        if self._server_state.wakeup_port > 0:
+            self._wakeup = WakeupSender(host, self._server_state.wakeup_port)
+
+        # They also tell us when our turn has come
+        self._turn_notifications: Optional[TurnSubscriber] = None
+        if self._server_state.notify_port > 0:
+            self._turn_notifications = TurnSubscriber(host, self._server_state.notify_port)
+
+    @property
+    def server_state(self) -> ServerState:
+        return self._server_state
+
+    @property
+    def event_driven(self) -> bool:
+        return self._turn_notifications is not None
+
+    def join(self, player: Player):
+        self._player = player
+        self.dataframe.add_one(Player, player)
+        if self._turn_notifications is not None:
+            self._turn_notifications.subscribe(player.pid)
+        self.push()
+
+    @property
+    def player(self) -> Optional[Player]:
+        if self._player is None or self.dataframe.read_one(Player, self._player.pid) is None:
+            return None
+        return self._player
+
+    def connect_observations(self):
+        if self._player.observation_segment:
+            # The server shares our observations through shared memory, which already holds the first one
+            self._shared_observation = SharedObservationReader(self._player.observation_segment)
+            return
+
+        if self._player.observation_port <= 0:
+            raise ConnectionError("Server failed to create an observation dataframe.")
+
+        self.observation_df = Dataframe("{}_observation_df".format(self._player.name),
+                                        [self.observation_class],
+                                        details=(self.host, self._player.observation_port))
+        self.pull_observations()
+        self._observation = self.observation_df.read_all(self.observation_class)[0]
+
+        # Typed observations keep their shapes and dtypes for the whole game, so we only check them once
+        if self._schema is not None:
+            self._schema.validate({name: getattr(self._observation, name) for name in self._schema.names})
+
+    def observation(self) -> Optional[Dict[str, np.ndarray]]:
+        # Shared memory observations are copied out of the segment, so later writes of the server cannot tear them
+        if self._shared_observation is not None:
+            return self._shared_observation.read()
+
+        if self._observation is None:
+            return None
+
+        names = self._server_state.env_dimensions
+        observation = {name: getattr(self._observation, name) for name in names if hasattr(self._observation, name)}
+        if self._schema is not None:
+            # Buffers were checked against the schema when we connected, these are read-only views into them
+            observation = self._schema.decode(observation)
+
+        return observation
+
+    def pull_players(self):
+        self.dataframe.pull()
+        self.dataframe.checkout()
+        self.pull_count += 1
+
+    def pull_observations(self):
+        if self.observation_df is not None:
+            self.observation_df.pull()
+            self.observation_df.checkout()
+            self.pull_count += 1
+
+    def push(self):
+        self.dataframe.commit()
+        self.dataframe.push()
+
+        if self._wakeup is not None:
+            self._wakeup.notify()
+
+    def wait(self, timeout: float) -> bool:
+        return self._turn_notifications.wait(timeout)
+
+    def close(self):
+        if self._shared_observation is not None:
+            self._shared_observation.close()
+        if self._wakeup is not None:
+            self._wakeup.close()
+        if self._turn_notifications is not None:
+            self._turn_notifications.close()
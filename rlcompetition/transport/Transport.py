@@ -0,0 +1,176 @@
+""" Abstract transports that carry players, observations, and the server state between the match server and
+its clients. The game loop in match_server.py and ClientEnvironment only talk to these interfaces, so that
+the same logic can run on top of spacetime, in-process queues, or ZeroMQ sockets. """
+
+import numpy as np
+
+from abc import ABC, abstractmethod
+from typing import Dict, Optional
+
+from ..data_model import Player, ServerState
+from ..observation_schema import ObservationSchema
+
+
+class ServerTransport(ABC):
+    """ Server side of a transport.
+
+    The server owns a ServerState and a Player object for every client and changes them in place.
+    Nothing reaches the clients until :py:meth:`commit` is called, and nothing from the clients
+    shows up in those objects until :py:meth:`receive` is called.
+    """
+
+    @property
+    def event_driven(self) -> bool:
+        """ Whether :py:meth:`wait` returns as soon as a client sends new data. Otherwise the server polls. """
+        return False
+
+    @abstractmethod
+    def start(self, server_state: ServerState):
+        """ Publish the server state. The transport keeps the object and sends its latest values on every commit. """
+        raise NotImplementedError
+
+    @abstractmethod
+    def receive(self):
+        """ Bring in every change the clients have sent since the last call. """
+        raise NotImplementedError
+
+    @abstractmethod
+    def players(self) -> Dict[int, Player]:
+        """ Every player that has joined and has not left or been rejected, by player id. """
+        raise NotImplementedError
+
+    @abstractmethod
+    def reject_player(self, pid: int):
+        """ Remove a player that has just joined. The client finds out on its next pull. """
+        raise NotImplementedError
+
+    @abstractmethod
+    def add_observation(self, player: Player):
+        """ Create the storage for a player's observations. """
+        raise NotImplementedError
+
+    @abstractmethod
+    def remove_observation(self, pid: int):
+        """ Release the storage for a player's observations after they have left. """
+        raise NotImplementedError
+
+    @abstractmethod
+    def set_observation(self, pid: int, observation: Dict[str, np.ndarray]):
+        """ Replace a player's observation. It is sent with the next commit. """
+        raise NotImplementedError
+
+    @abstractmethod
+    def finalize_player(self, player: Player, number: int):
+        """ Give a player their number, along with whatever they need to receive observations. """
+        raise NotImplementedError
+
+    @abstractmethod
+    def commit(self):
+        """ Send the current server state, players, and observations to the clients. """
+        raise NotImplementedError
+
+    def flush(self):
+        """ Block until everything committed so far has been handed off to the clients. """
+        pass
+
+    def wait(self, timeout: float) -> bool:
+        """ Block until a client sends new data or the timeout expires.
+
+        Returns
+        -------
+        bool: Whether or not a client sent something.
+        """
+        raise NotImplementedError
+
+    def notify(self, pids):
+        """ Tell the given players that there is new data for them. Call this after committing. """
+        pass
+
+    def close(self):
+        """ Release every resource the transport holds. """
+        pass
+
+
+class ClientTransport(ABC):
+    """ Client side of a transport.
+
+    The client keeps its own Player object, which the transport adds to the game in :py:meth:`join` and keeps
+    up to date with the server on every pull. The client changes its own fields and sends them with :py:meth:`push`.
+    """
+
+    # Number of pulls made so far, for instrumentation
+    pull_count: int = 0
+
+    @property
+    @abstractmethod
+    def server_state(self) -> ServerState:
+        """ Latest server state we have pulled. The same object is updated in place on every pull. """
+        raise NotImplementedError
+
+    @property
+    def event_driven(self) -> bool:
+        """ Whether :py:meth:`wait` returns as soon as the server tells us that there is new data for us. """
+        return False
+
+    @property
+    def observation_schema(self) -> Optional[ObservationSchema]:
+        """ Schema announced by the server if observations are typed. """
+        if self.server_state.observation_schema:
+            return ObservationSchema.from_string(self.server_state.observation_schema)
+        return None
+
+    @abstractmethod
+    def join(self, player: Player):
+        """ Add our player to the game and push it to the server. """
+        raise NotImplementedError
+
+    @property
+    @abstractmethod
+    def player(self) -> Optional[Player]:
+        """ Our player, or None if the server has rejected or removed it. """
+        raise NotImplementedError
+
+    @abstractmethod
+    def connect_observations(self):
+        """ Start receiving observations once the server has finalized our player, and pull the first one.
+
+        Raises
+        ------
+        ValueError
+            If the server announced an :py:attr:`observation_schema` and the first observation does not match it.
+            Transports whose servers never announce a schema do not check the observation.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def observation(self) -> Optional[Dict[str, np.ndarray]]:
+        """ Latest observation we have pulled, None before :py:meth:`connect_observations`. """
+        raise NotImplementedError
+
+    @abstractmethod
+    def pull_players(self):
+        """ Pull the latest server state and player data. """
+        raise NotImplementedError
+
+    @abstractmethod
+    def pull_observations(self):
+        """ Pull the latest observation. """
+        raise NotImplementedError
+
+    @abstractmethod
+    def push(self):
+        """ Send the changes we made to our player to the server. """
+        raise NotImplementedError
+
+    def wait(self, timeout: float) -> bool:
+        """ Block until the server tells us that there is new data for us or the timeout expires.
+
+        Returns
+        -------
+        bool: Whether or not the server notified us.
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """ Leave the game and release every resource the transport holds. """
+        pass
@@ -0,0 +1,150 @@
+""" Host many matches in a single process behind a single port.
+
+Every match gets a HostedMatchTransport and runs match_server.run_match in its own thread. The host owns the
+only ROUTER socket, which is not safe to share between threads, so it routes the messages in both directions:
+
+    client -> host      [match id, payload] over the ROUTER socket, handed to the match through a queue
+    match  -> client    [address, frames...] over one inproc PUSH socket shared by all matches, forwarded
+                        by the host to the ROUTER socket without copying the frames
+
+A match only holds its players, the queue of incoming messages, and what it last sent to every player. """
+
+import zmq
+
+from itertools import count
+from queue import Queue, Empty
+from threading import Thread, Lock
+from typing import Any, Dict, List, Optional, Tuple
+
+from .ZmqTransport import ZmqUpdateTransport, _REJECTED
+
+
+class HostedMatchTransport(ZmqUpdateTransport):
+    """ Server side of a match running on a :py:class:`ZmqMatchHost`, see :py:meth:`ZmqMatchHost.create_match`.
+
+    Clients connect with ``ZmqClientTransport(host, port, match_id)``.
+    """
+
+    def __init__(self, host: "ZmqMatchHost", match_id: str):
+        super().__init__()
+        self.host: ZmqMatchHost = host
+        self.match_id: str = match_id
+        self._inbox: Queue = Queue()
+
+    def deliver(self, address: bytes, payload: bytes):
+        """ Called by the host thread with every message for this match. """
+        self._inbox.put((address, payload))
+
+    def _send_frames(self, frames: List):
+        self.host.send(frames)
+
+    def _receive_payload(self, timeout: float) -> Optional[Tuple[Any, bytes]]:
+        try:
+            if timeout > 0:
+                return self._inbox.get(timeout=timeout)
+            return self._inbox.get_nowait()
+        except Empty:
+            return None
+
+    def close(self):
+        self.host.remove_match(self.match_id)
+
+
+class ZmqMatchHost(Thread):
+    """ Thread that routes the messages of every match hosted in this process through one port.
+
+    Parameters
+    ----------
+    port : int
+        Port to bind to. With 0, a random free port is chosen, see :py:attr:`port`.
+    """
+
+    # How long the host waits for messages before checking whether it has been closed, in milliseconds
+    _PollInterval = 100
+
+    def __init__(self, port: int = 0):
+        super().__init__()
+        self.daemon = True
+
+        context = zmq.Context.instance()
+        self.socket = context.socket(zmq.ROUTER)
+        self.socket.setsockopt(zmq.LINGER, 0)
+
+        if port == 0:
+            self.port: int = self.socket.bind_to_random_port("tcp://*")
+        else:
+            self.socket.bind("tcp://*:{}".format(port))
+            self.port: int = port
+
+        # Outgoing messages of all matches. The sending end is shared, so it is guarded by a lock.
+        outbox_address = "inproc://match_host_{}".format(id(self))
+        self._outbox = context.socket(zmq.PULL)
+        self._outbox.bind(outbox_address)
+        self._outbox_sender = context.socket(zmq.PUSH)
+        self._outbox_sender.setsockopt(zmq.LINGER, 0)
+        self._outbox_sender.connect(outbox_address)
+        self._outbox_lock = Lock()
+
+        self._matches: Dict[str, HostedMatchTransport] = {}
+        self._match_ids = count()
+        self._running = True
+
+    @property
+    def num_matches(self) -> int:
+        return len(self._matches)
+
+    def create_match(self) -> HostedMatchTransport:
+        """ Create the transport for a new match. The match is removed from the host once the transport is closed. """
+        match_id = "{:x}".format(next(self._match_ids))
+        match = HostedMatchTransport(self, match_id)
+        self._matches[match_id] = match
+        return match
+
+    def remove_match(self, match_id: str):
+        self._matches.pop(match_id, None)
+
+    def send(self, frames: List):
+        """ Send a message to a client from any thread. """
+        with self._outbox_lock:
+            self._outbox_sender.send_multipart(frames, copy=False)
+
+    def _route(self, frames: List[bytes]):
+        if len(frames) != 3:
+            # Clients without a match id expect a single match server, tell them right away instead of letting
+            # them time out
+            if frames:
+                self.socket.send_multipart([frames[0], _REJECTED])
+            return
+
+        address, match_id, payload = frames
+        match = self._matches.get(match_id.decode(errors="replace"))
+        if match is None:
+            self.socket.send_multipart([address, _REJECTED])
+            return
+
+        match.deliver(address, payload)
+
+    def run(self):
+        poller = zmq.Poller()
+        poller.register(self.socket, zmq.POLLIN)
+        poller.register(self._outbox, zmq.POLLIN)
+
+        while self._running:
+            events = dict(poller.poll(self._PollInterval))
+
+            if self._outbox in events:
+                while self._outbox.poll(0):
+                    self.socket.send_multipart(self._outbox.recv_multipart(copy=False), copy=False)
+
+            if self.socket in events:
+                while self.socket.poll(0):
+                    self._route(self.socket.recv_multipart())
+
+        self.socket.close()
+        self._outbox.close()
+        self._outbox_sender.close()
+
+    def close(self):
+        """ Stop routing messages. Matches that are still running will no longer reach their clients. """
+        self._running = False
+        self.join()
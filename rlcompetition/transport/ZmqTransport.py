@@ -0,0 +1,241 @@
+""" Transport over ZeroMQ sockets. The server binds a ROUTER socket and every client connects a DEALER socket.
+
+Turn based games boil down to a request and a reply per move: the server sends a player their turn along
+with their observation, and the player answers with their action. Every update the server sends is a single
+multipart message whose first frame is a JSON header holding the fields that changed since the last update
+to that player. The observation arrays and any bytes fields of the server state follow as raw frames, so
+nothing is pickled in either direction and observations are read straight out of the received frames.
+
+Clients only ever send plain player fields as JSON. Clients of a match that runs on a ZmqMatchHost put the
+match id in an extra frame in front of every message, see ZmqMatchHost.py. """
+
+import json
+
+import numpy as np
+import zmq
+
+from abc import abstractmethod
+from time import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .MessageTransport import (MessageServerTransport, MessageClientTransport, get_fields, PLAYER_CLIENT_FIELDS,
+                               SERVER_STATE_FIELDS)
+from ..rl_logging import get_logger
+
+logger = get_logger()
+
+_UPDATE = b"update"
+_REJECTED = b"rejected"
+
+
+def _encode_update(message: Tuple) -> List:
+    """ Frames for a ("update", server_state, sequence, player, observation) message. """
+    _, server_state, sequence, player, observation = message
+
+    header = {"sequence": sequence, "player": player, "server_state": {}, "blobs": [], "observation": []}
+    frames = []
+
+    for field, value in server_state.items():
+        if isinstance(value, bytes):
+            header["blobs"].append(field)
+            frames.append(value)
+        else:
+            header["server_state"][field] = value
+
+    if observation is not None:
+        for name, value in observation.items():
+            value = np.ascontiguousarray(value)
+            header["observation"].append((name, value.dtype.str, value.shape))
+            frames.append(value)
+
+    return [_UPDATE, json.dumps(header).encode()] + frames
+
+
+def _decode_update(frames: List[zmq.Frame]) -> Tuple:
+    header = json.loads(frames[1].bytes)
+    payload = iter(frames[2:])
+
+    server_state: Dict[str, Any] = header["server_state"]
+    if "env_dimensions" in server_state:
+        server_state["env_dimensions"] = tuple(server_state["env_dimensions"])
+    for field in header["blobs"]:
+        server_state[field] = next(payload).bytes
+
+    observation = None
+    if header["observation"]:
+        # Read-only views into the received frames, no copies
+        observation = {name: np.frombuffer(next(payload).buffer, dtype=np.dtype(dtype)).reshape(shape)
+                       for name, dtype, shape in header["observation"]}
+
+    return "update", server_state, header["sequence"], header["player"], observation
+
+
+class ZmqUpdateTransport(MessageServerTransport):
+    """ Encodes the messages of a server for ZeroMQ clients and only sends them what has changed.
+    Subclasses deliver the frames. """
+
+    def __init__(self):
+        super().__init__()
+
+        # Last values sent to every player, so that updates only carry what has changed
+        self._sent_server_state: Dict[int, Dict[str, Any]] = {}
+        self._sent_player: Dict[int, Dict[str, Any]] = {}
+        self._sent_sequence: Dict[int, int] = {}
+
+        # Server state sent to clients that asked for it but have not joined yet
+        self._greeted: Dict[Any, Dict[str, Any]] = {}
+
+    @abstractmethod
+    def _send_frames(self, frames: List):
+        """ Send a multipart message whose first frame is the address of the client. """
+        raise NotImplementedError
+
+    @abstractmethod
+    def _receive_payload(self, timeout: float) -> Optional[Tuple[Any, Optional[bytes]]]:
+        """ Next (address, payload) from any client, or None if nothing arrives within the timeout.
+        The payload is None for a message that the transport has already answered itself. """
+        raise NotImplementedError
+
+    def _send(self, address, message: Tuple):
+        frames = [_REJECTED] if message[0] == "rejected" else _encode_update(message)
+        self._send_frames([address] + frames)
+
+    def _send_update(self, pid: int, server_state: Dict[str, Any], player: Dict[str, Any],
+                     observation: Optional[Dict[str, np.ndarray]]):
+        sent_server_state = self._sent_server_state.setdefault(pid, {})
+        sent_player = self._sent_player.setdefault(pid, {})
+
+        changed_server_state = {field: value for field, value in server_state.items()
+                                if field not in sent_server_state or sent_server_state[field] != value}
+        changed_player = {field: value for field, value in player.items()
+                          if field not in sent_player or sent_player[field] != value}
+
+        # Once the client has pushed, it may have dropped the values we sent for its own fields as stale,
+        # so those are always sent again along with the new sequence echo
+        sequence = self._sequences[pid]
+        if self._sent_sequence.get(pid) != sequence:
+            changed_player.update((field, player[field]) for field in PLAYER_CLIENT_FIELDS)
+        elif not changed_server_state and not changed_player and observation is None:
+            return
+
+        sent_server_state.update(changed_server_state)
+        sent_player.update(changed_player)
+        self._sent_sequence[pid] = sequence
+
+        super()._send_update(pid, changed_server_state, changed_player, observation)
+
+    def _handle(self, address, message: Tuple):
+        super()._handle(address, message)
+
+        # Players start out with the server state from their hello reply
+        if message[0] == "hello":
+            self._greeted[address] = get_fields(self.server_state, SERVER_STATE_FIELDS)
+        elif message[0] == "join":
+            pid = self._pids.get(address)
+            if pid is not None:
+                self._sent_server_state.setdefault(pid, self._greeted.pop(address, {}))
+        elif message[0] == "leave":
+            self._greeted.pop(address, None)
+
+    def _drop(self, pid: int):
+        super()._drop(pid)
+        self._sent_server_state.pop(pid, None)
+        self._sent_player.pop(pid, None)
+        self._sent_sequence.pop(pid, None)
+
+    def _receive(self, timeout: float) -> Optional[Tuple[Any, Tuple]]:
+        # Messages we cannot use are skipped, since returning None would look like there are no more messages
+        deadline = time() + timeout
+        while True:
+            received = self._receive_payload(max(deadline - time(), 0.0))
+            if received is None:
+                return None
+
+            address, payload = received
+            if payload is None:
+                continue
+
+            try:
+                return address, tuple(json.loads(payload))
+            except ValueError:
+                logger.warning("Dropped a malformed message from client {!r}.".format(address))
+
+
+class ZmqServerTransport(ZmqUpdateTransport):
+    """ Server side of the ZeroMQ transport.
+
+    Parameters
+    ----------
+    port : int
+        Port to bind to. With 0, a random free port is chosen, see :py:attr:`port`.
+    """
+
+    def __init__(self, port: int = 0):
+        super().__init__()
+        self.socket = zmq.Context.instance().socket(zmq.ROUTER)
+        self.socket.setsockopt(zmq.LINGER, 0)
+
+        if port == 0:
+            self.port: int = self.socket.bind_to_random_port("tcp://*")
+        else:
+            self.socket.bind("tcp://*:{}".format(port))
+            self.port: int = port
+
+    def _send_frames(self, frames: List):
+        self.socket.send_multipart(frames, copy=False)
+
+    def _receive_payload(self, timeout: float) -> Optional[Tuple[Any, Optional[bytes]]]:
+        if not self.socket.poll(timeout=int(max(timeout, 0.0) * 1000)):
+            return None
+
+        frames = self.socket.recv_multipart()
+        if len(frames) != 2:
+            # Only clients of a ZmqMatchHost send a match id, and this server hosts a single match
+            self.socket.send_multipart([frames[0], _REJECTED])
+            return frames[0], None
+        return frames[0], frames[1]
+
+    def close(self):
+        self.socket.close()
+
+
+class ZmqClientTransport(MessageClientTransport):
+    """ Client side of the ZeroMQ transport.
+
+    Parameters
+    ----------
+    host : str
+        Host of the match server.
+    port : int
+        Port of the match server.
+    match_id : str
+        Id of the match to join if the server is a ZmqMatchHost.
+    """
+
+    def __init__(self, host: str, port: int, match_id: str = ""):
+        super().__init__()
+        self.match_id: str = match_id
+        self.socket = zmq.Context.instance().socket(zmq.DEALER)
+        self.socket.setsockopt(zmq.LINGER, 1000)
+        self.socket.connect("tcp://{}:{}".format(host, port))
+        self._request_server_state()
+
+    def _send(self, message: Tuple):
+        payload = json.dumps(message).encode()
+        if self.match_id:
+            self.socket.send_multipart([self.match_id.encode(), payload])
+        else:
+            self.socket.send(payload)
+
+    def _receive(self, timeout: float) -> Optional[Tuple]:
+        if not self.socket.poll(timeout=int(max(timeout, 0.0) * 1000)):
+            return None
+
+        frames = self.socket.recv_multipart(copy=False)
+        if frames[0].bytes == _REJECTED:
+            return "rejected",
+        return _decode_update(frames)
+
+    def close(self):
+        super().close()
+        self.socket.close()
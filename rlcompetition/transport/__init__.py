@@ -0,0 +1,5 @@
+from .Transport import ServerTransport, ClientTransport
+from .SpacetimeTransport import SpacetimeServerTransport, SpacetimeClientTransport
+from .QueueTransport import QueueServerTransport, QueueClientTransport
+from .ZmqTransport import ZmqUpdateTransport, ZmqServerTransport, ZmqClientTransport
+from .ZmqMatchHost import ZmqMatchHost, HostedMatchTransport